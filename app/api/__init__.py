@@ -1,3 +1,3 @@
-from app.api.routes import authors_router, books_router, users_router, loans_router
+from app.api.routes import authors_router, books_router, users_router, loans_router, imports_router
 
-__all__ = ["authors_router", "books_router", "users_router", "loans_router"] 
\ No newline at end of file
+__all__ = ["authors_router", "books_router", "users_router", "loans_router", "imports_router"] 
\ No newline at end of file
@@ -1 +1,10 @@
-from app.db.session import get_session 
\ No newline at end of file
+from typing import Union
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
+from app.db.session import get_async_session, get_session
+
+# Session handed to the routes: async or sync depending on settings.DB_ASYNC
+DBSession = Union[Session, AsyncSession]
+
+get_db = get_async_session if settings.DB_ASYNC else get_session
@@ -2,5 +2,6 @@ from app.api.routes.authors import router as authors_router
 from app.api.routes.books import router as books_router
 from app.api.routes.users import router as users_router
 from app.api.routes.loans import router as loans_router
+from app.api.routes.imports import router as imports_router
 
-__all__ = ["authors_router", "books_router", "users_router", "loans_router"] 
\ No newline at end of file
+__all__ = ["authors_router", "books_router", "users_router", "loans_router", "imports_router"] 
\ No newline at end of file
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+
+from app.db.instrumentation import query_budget
+from app.services.suggest_index import suggest_index
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+@router.get("/suggest-index")
+@query_budget(0)
+async def get_suggest_index():
+    """
+    Entry counts and approximate memory footprint (bytes) of the suggest index
+    """
+    return await run_in_threadpool(suggest_index.memory_usage)
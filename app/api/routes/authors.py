@@ -1,84 +1,158 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from app.api.dependencies import get_session
-from app.schemas.author import Author, AuthorCreate, AuthorUpdate, AuthorWithBooks
-from app.services.author_service import author_service
+from app.api.dependencies import DBSession, get_db
+from app.core.conditional import conditional_response
+from app.core.pagination import set_next_cursor
+from app.core.responses import RowSerializer
+from app.db.instrumentation import query_budget
+from app.schemas.author import Author, AuthorCreate, AuthorUpdate, AuthorWithBooks, AuthorWithIncludes
+from app.services.author_service import async_author_service, author_service
+from app.services.export_service import export_service
 
 router = APIRouter(prefix="/authors", tags=["Authors"])
 
-@router.get("/", response_model=List[Author])
-def get_authors(
+# Maximum number of ids accepted by /authors/stats
+AUTHOR_STATS_MAX_IDS = 500
+
+# Renders the author listings without validating each row into AuthorWithIncludes
+author_list = RowSerializer(AuthorWithIncludes)
+
+@router.get("/", response_model=List[AuthorWithIncludes], response_model_exclude_unset=True)
+@query_budget(2)
+async def get_authors(
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get all authors with pagination
     """
-    return author_service.get_all(db, skip=skip, limit=limit)
+    results = await async_author_service.get_all(db, skip=skip, limit=limit, cursor=cursor, include=include)
+    set_next_cursor(response, results, limit)
+    return conditional_response(request, response, results, author_list)
+
+@router.get("/stats")
+@query_budget(2)
+async def get_authors_stats(
+    response: Response, 
+    ids: Optional[str] = None, 
+    skip: int = 0, 
+    limit: int = 100, 
+    cursor: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
+):
+    """
+    Get the book statistics of many authors
+    `ids` is a comma separated list of author ids (unknown ones are left out);
+    without it, a page of all the authors is returned
+    """
+    if ids is None:
+        authors, stats = await async_author_service.get_authors_stats(db, skip=skip, limit=limit, cursor=cursor)
+        set_next_cursor(response, authors, limit)
+        return stats
+    
+    try:
+        author_ids = [UUID(id.strip()) for id in ids.split(",") if id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma separated list of author ids")
+    if len(author_ids) > AUTHOR_STATS_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {AUTHOR_STATS_MAX_IDS} author ids can be requested at once")
+    _, stats = await async_author_service.get_authors_stats(db, author_ids)
+    return stats
+
+# No query budget: the rows are read while the body streams, after the
+# X-DB-Queries header is sent, so only the completion log line counts them
+@router.get("/export")
+async def export_authors(
+    request: Request, 
+    format: str = "ndjson", 
+    updated_since: Optional[datetime] = None
+):
+    """
+    Export all authors as NDJSON or CSV
+    Rows are streamed as they are read, gzip encoded if the client accepts it;
+    `updated_since` keeps the authors created or updated since then
+    """
+    return export_service.export_response(author_service.model, format, updated_since, request.headers.get("accept-encoding"))
 
 @router.get("/{author_id}", response_model=Author)
-def get_author(
+@query_budget(1)
+async def get_author(
     author_id: UUID, 
-    db: Session = Depends(get_session)
+    request: Request, 
+    response: Response, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get an author by ID
     """
-    return author_service.get_by_id(db, author_id)
+    result = await async_author_service.get_by_id(db, author_id)
+    return conditional_response(request, response, result)
 
 @router.get("/{author_id}/books", response_model=AuthorWithBooks)
-def get_author_with_books(
+@query_budget(2)
+async def get_author_with_books(
     author_id: UUID, 
-    db: Session = Depends(get_session)
+    request: Request, 
+    response: Response, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get an author with all their books
     """
-    return author_service.get_author_with_books(db, author_id)
+    result = await async_author_service.get_author_with_books(db, author_id)
+    return conditional_response(request, response, result)
 
 @router.get("/{author_id}/stats")
-def get_author_with_stats(
+@query_budget(2)
+async def get_author_with_stats(
     author_id: UUID, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Get an author with additional book statistics
     This demonstrates business transformation of data
     """
-    return author_service.get_author_with_book_stats(db, author_id)
+    return await async_author_service.get_author_with_book_stats(db, author_id)
 
 @router.post("/", response_model=Author, status_code=status.HTTP_201_CREATED)
-def create_author(
+@query_budget(2)
+async def create_author(
     author_in: AuthorCreate, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Create a new author
     """
-    return author_service.create(db, obj_in=author_in)
+    return await async_author_service.create(db, obj_in=author_in)
 
 @router.patch("/{author_id}", response_model=Author)
-def update_author(
+@query_budget(3)
+async def update_author(
     author_id: UUID, 
     author_in: AuthorUpdate, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Update an author
     """
-    db_obj = author_service.get_by_id(db, author_id)
-    return author_service.update(db, db_obj=db_obj, obj_in=author_in)
+    db_obj = await async_author_service.get_by_id(db, author_id)
+    return await async_author_service.update(db, db_obj=db_obj, obj_in=author_in)
 
 @router.delete("/{author_id}", response_model=Author)
-def delete_author(
+@query_budget(4)
+async def delete_author(
     author_id: UUID, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Delete an author
     """
-    return author_service.delete(db, id=author_id) 
\ No newline at end of file
+    return await async_author_service.delete(db, id=author_id) 
\ No newline at end of file
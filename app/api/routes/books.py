@@ -1,119 +1,216 @@
 from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlmodel import Session
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from app.api.dependencies import get_session
-from app.schemas.book import Book, BookCreate, BookUpdate, BookWithAuthor
-from app.services.book_service import book_service
+from app.api.dependencies import DBSession, get_db
+from app.core.conditional import conditional_response
+from app.core.filtering import query_filters
+from app.core.pagination import NEXT_CURSOR_HEADER, set_next_cursor
+from app.core.responses import DefaultResponse, RowSerializer
+from app.db.instrumentation import query_budget
+from app.schemas.book import Book, BookCreate, BookUpdate, BookWithAuthor, BookWithIncludes
+from app.services.book_service import async_book_service, book_service
+from app.services.export_service import export_service
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
-@router.get("/", response_model=List[Book])
-def get_books(
+# Renders the book listings without validating each row into BookWithIncludes
+book_list = RowSerializer(BookWithIncludes)
+
+@router.get("/", response_model=List[BookWithIncludes], response_model_exclude_unset=True)
+@query_budget(3)
+async def get_books(
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    sort: Optional[str] = None, 
+    explain: bool = False, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get all books with pagination
-    """
-    return book_service.get_all(db, skip=skip, limit=limit)
+    Filter with ?field=value or ?field[op]=value on genre (eq, ne), author_id,
+    publication_year (eq, gt, gte, lt, lte) and available (true/false);
+    sort with ?sort=publication_year or ?sort=-publication_year (books without
+    one are left out) or ?sort=-created_at. Combinations no index serves are
+    rejected; ?explain=true returns the SQL and query plan instead of the books
+    """
+    filters = query_filters(request)
+    if explain:
+        plan = await async_book_service.explain_listing(db, filters, sort=sort, skip=skip, limit=limit, cursor=cursor)
+        return DefaultResponse(plan)
+    results = await async_book_service.get_all(db, skip=skip, limit=limit, cursor=cursor, include=include, filters=filters, sort=sort)
+    set_next_cursor(response, results, limit, book_service.sort_keys(sort))
+    return conditional_response(request, response, results, book_list)
 
-@router.get("/available", response_model=List[Book])
-def get_available_books(
+@router.get("/available", response_model=List[BookWithIncludes], response_model_exclude_unset=True)
+@query_budget(2)
+async def get_available_books(
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get available books (copies > 0)
     This demonstrates business logic filtering
     """
-    return book_service.get_available_books(db, skip=skip, limit=limit)
+    results = await async_book_service.get_available_books(db, skip=skip, limit=limit, cursor=cursor, include=include)
+    set_next_cursor(response, results, limit)
+    return conditional_response(request, response, results, book_list)
 
-@router.get("/by-author/{author_id}", response_model=List[Book])
-def get_books_by_author(
+@router.get("/by-author/{author_id}", response_model=List[BookWithIncludes], response_model_exclude_unset=True)
+@query_budget(2)
+async def get_books_by_author(
     author_id: UUID, 
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get all books by a specific author
     """
-    return book_service.get_books_by_author(db, author_id, skip=skip, limit=limit)
+    results = await async_book_service.get_books_by_author(db, author_id, skip=skip, limit=limit, cursor=cursor, include=include)
+    set_next_cursor(response, results, limit)
+    return conditional_response(request, response, results, book_list)
 
-@router.get("/by-genre/{genre}", response_model=List[Book])
-def get_books_by_genre(
+@router.get("/by-genre/{genre}", response_model=List[BookWithIncludes], response_model_exclude_unset=True)
+@query_budget(2)
+async def get_books_by_genre(
     genre: str, 
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get all books in a specific genre
     """
-    return book_service.get_books_by_genre(db, genre, skip=skip, limit=limit)
+    results = await async_book_service.get_books_by_genre(db, genre, skip=skip, limit=limit, cursor=cursor, include=include)
+    set_next_cursor(response, results, limit)
+    return conditional_response(request, response, results, book_list)
+
+@router.get("/search", response_model=List[BookWithIncludes], response_model_exclude_unset=True)
+@query_budget(2)
+async def search_books(
+    request: Request, 
+    response: Response, 
+    q: str = Query(..., min_length=1, max_length=200), 
+    limit: int = 20, 
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
+):
+    """
+    Search books by title, description and author name
+    Books must contain every word of `q` (`word*` for a prefix) and come best match first
+    """
+    results, next_page = await async_book_service.search(db, q, limit=limit, cursor=cursor, include=include)
+    if next_page:
+        response.headers[NEXT_CURSOR_HEADER] = next_page
+    return conditional_response(request, response, results, book_list)
 
 @router.get("/availability-summary")
-def get_book_availability_summary(
-    db: Session = Depends(get_session)
+@query_budget(2)
+async def get_book_availability_summary(
+    include_books: bool = False, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get a summary of book availability by genre
     This demonstrates business transformation of data
+    Set `include_books=true` to also list the books of every genre
+    """
+    return await async_book_service.get_book_availability_summary(db, include_books=include_books)
+
+# No query budget: the rows are read while the body streams, after the
+# X-DB-Queries header is sent, so only the completion log line counts them
+@router.get("/export")
+async def export_books(
+    request: Request, 
+    format: str = "ndjson", 
+    updated_since: Optional[datetime] = None
+):
+    """
+    Export all books as NDJSON or CSV
+    Rows are streamed as they are read, gzip encoded if the client accepts it;
+    `updated_since` keeps the books created or updated since then
     """
-    return book_service.get_book_availability_summary(db)
+    return export_service.export_response(book_service.model, format, updated_since, request.headers.get("accept-encoding"))
 
 @router.get("/{book_id}", response_model=Book)
-def get_book(
+@query_budget(1)
+async def get_book(
     book_id: UUID, 
-    db: Session = Depends(get_session)
+    request: Request, 
+    response: Response, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get a book by ID
     """
-    return book_service.get_by_id(db, book_id)
+    result = await async_book_service.get_by_id(db, book_id)
+    return conditional_response(request, response, result)
 
 @router.get("/{book_id}/with-author", response_model=BookWithAuthor)
-def get_book_with_author(
+@query_budget(1)
+async def get_book_with_author(
     book_id: UUID, 
-    db: Session = Depends(get_session)
+    request: Request, 
+    response: Response, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get a book with its author details
     """
-    return book_service.get_book_with_author(db, book_id)
+    result = await async_book_service.get_book_with_author(db, book_id)
+    return conditional_response(request, response, result)
 
 @router.post("/", response_model=Book, status_code=status.HTTP_201_CREATED)
-def create_book(
+@query_budget(3)
+async def create_book(
     book_in: BookCreate, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Create a new book
     """
-    return book_service.create(db, obj_in=book_in)
+    return await async_book_service.create(db, obj_in=book_in)
 
 @router.patch("/{book_id}", response_model=Book)
-def update_book(
+@query_budget(4)
+async def update_book(
     book_id: UUID, 
     book_in: BookUpdate, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Update a book
     """
-    db_obj = book_service.get_by_id(db, book_id)
-    return book_service.update(db, db_obj=db_obj, obj_in=book_in)
+    db_obj = await async_book_service.get_by_id(db, book_id)
+    return await async_book_service.update(db, db_obj=db_obj, obj_in=book_in)
 
 @router.delete("/{book_id}", response_model=Book)
-def delete_book(
+@query_budget(3)
+async def delete_book(
     book_id: UUID, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Delete a book
     """
-    return book_service.delete(db, id=book_id) 
\ No newline at end of file
+    return await async_book_service.delete(db, id=book_id) 
\ No newline at end of file
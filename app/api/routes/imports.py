@@ -0,0 +1,25 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, File, UploadFile
+
+from app.api.dependencies import DBSession, get_db
+from app.services.import_service import async_import_service
+
+router = APIRouter(prefix="/import", tags=["Import"])
+
+@router.post("/catalog")
+async def import_catalog(
+    file: UploadFile = File(...), 
+    format: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
+):
+    """
+    Import authors and books from a CSV or NDJSON catalog file
+    The file is streamed in chunks; ISBN conflicts and invalid rows are
+    reported without aborting the import
+    """
+    if format is None:
+        filename = (file.filename or "").lower()
+        format = "ndjson" if filename.endswith((".ndjson", ".jsonl")) else "csv"
+    
+    # The upload is decoded lazily instead of being read into memory
+    return await async_import_service.import_file(db, file.file, format)
@@ -1,71 +1,130 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from app.api.dependencies import get_session
-from app.schemas.loan import Loan, LoanCreate, LoanUpdate, LoanDetail
-from app.services.loan_service import loan_service
+from app.api.dependencies import DBSession, get_db
+from app.core.conditional import conditional_response
+from app.core.filtering import query_filters
+from app.core.pagination import set_next_cursor
+from app.core.responses import DefaultResponse, RowSerializer
+from app.db.instrumentation import query_budget
+from app.schemas.loan import Loan, LoanCreate, LoanUpdate, LoanDetail, LoanBulkCreate, LoanBulkReturn, LoanBulkResult, LoanWithIncludes
+from app.services.loan_service import async_loan_service, loan_service
+from app.services.export_service import export_service
 
 router = APIRouter(prefix="/loans", tags=["Loans"])
 
-@router.get("/", response_model=List[Loan])
-def get_loans(
+# Renders the loan listings without validating each row into LoanWithIncludes
+loan_list = RowSerializer(LoanWithIncludes)
+
+@router.get("/", response_model=List[LoanWithIncludes], response_model_exclude_unset=True)
+@query_budget(4)
+async def get_loans(
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    sort: Optional[str] = None, 
+    explain: bool = False, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get all loans with pagination
-    """
-    return loan_service.get_all(db, skip=skip, limit=limit)
+    Filter with ?is_returned=true or false, sort with ?sort=-created_at;
+    ?explain=true returns the SQL and query plan instead of the loans
+    """
+    filters = query_filters(request)
+    if explain:
+        plan = await async_loan_service.explain_listing(db, filters, sort=sort, skip=skip, limit=limit, cursor=cursor)
+        return DefaultResponse(plan)
+    results = await async_loan_service.get_all(db, skip=skip, limit=limit, cursor=cursor, include=include, filters=filters, sort=sort)
+    set_next_cursor(response, results, limit, loan_service.sort_keys(sort))
+    return conditional_response(request, response, results, loan_list)
 
-@router.get("/overdue", response_model=List[Loan])
-def get_overdue_loans(
+@router.get("/overdue", response_model=List[LoanWithIncludes], response_model_exclude_unset=True)
+@query_budget(3)
+async def get_overdue_loans(
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get overdue loans (due date is before today and not returned)
     This demonstrates business logic filtering
     """
-    return loan_service.get_overdue_loans(db, skip=skip, limit=limit)
+    results = await async_loan_service.get_overdue_loans(db, skip=skip, limit=limit, cursor=cursor, include=include)
+    set_next_cursor(response, results, limit)
+    return conditional_response(request, response, results, loan_list)
 
 @router.get("/statistics")
-def get_loan_statistics(
-    db: Session = Depends(get_session)
+@query_budget(1)
+async def get_loan_statistics(
+    from_date: Optional[date] = Query(None, alias="from"), 
+    to_date: Optional[date] = Query(None, alias="to"), 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get statistics about loans
     This demonstrates business transformation of data
+    Use `from`/`to` to only consider loans made within that date window
+    """
+    return await async_loan_service.get_loan_statistics(db, from_date=from_date, to_date=to_date)
+
+# No query budget: the rows are read while the body streams, after the
+# X-DB-Queries header is sent, so only the completion log line counts them
+@router.get("/export")
+async def export_loans(
+    request: Request, 
+    format: str = "ndjson", 
+    updated_since: Optional[datetime] = None
+):
+    """
+    Export all loans as NDJSON or CSV
+    Rows are streamed as they are read, gzip encoded if the client accepts it;
+    `updated_since` keeps the loans created or updated since then
     """
-    return loan_service.get_loan_statistics(db)
+    return export_service.export_response(loan_service.model, format, updated_since, request.headers.get("accept-encoding"))
 
 @router.get("/{loan_id}", response_model=Loan)
-def get_loan(
+@query_budget(1)
+async def get_loan(
     loan_id: UUID, 
-    db: Session = Depends(get_session)
+    request: Request, 
+    response: Response, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get a loan by ID
     """
-    return loan_service.get_by_id(db, loan_id)
+    result = await async_loan_service.get_by_id(db, loan_id)
+    return conditional_response(request, response, result)
 
 @router.get("/{loan_id}/details", response_model=LoanDetail)
-def get_loan_with_details(
+@query_budget(1)
+async def get_loan_with_details(
     loan_id: UUID, 
-    db: Session = Depends(get_session)
+    request: Request, 
+    response: Response, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get a loan with book and user details
     """
-    return loan_service.get_loan_with_details(db, loan_id)
+    result = await async_loan_service.get_loan_with_details(db, loan_id)
+    return conditional_response(request, response, result)
 
 @router.post("/", response_model=Loan, status_code=status.HTTP_201_CREATED)
-def create_loan(
+@query_budget(3)
+async def create_loan(
     loan_in: LoanCreate, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Create a new loan
@@ -74,12 +133,41 @@ def create_loan(
     - Sets default loan date to today if not provided
     - Updates book availability
     """
-    return loan_service.create(db, obj_in=loan_in)
+    return await async_loan_service.create(db, obj_in=loan_in)
+
+@router.post("/bulk", response_model=LoanBulkResult)
+async def create_loans_bulk(
+    bulk_in: LoanBulkCreate, 
+    db: DBSession = Depends(get_db)
+):
+    """
+    Create many loans in one transaction
+    Business logic:
+    - Validates all books with a single query
+    - Updates book availability once per book
+    - Reports the outcome of every item; failed items do not abort the others
+    """
+    return await async_loan_service.bulk_create(db, items=bulk_in.items)
+
+@router.post("/bulk-return", response_model=LoanBulkResult)
+async def return_books_bulk(
+    bulk_in: LoanBulkReturn, 
+    db: DBSession = Depends(get_db)
+):
+    """
+    Return many loans in one transaction
+    Business logic:
+    - Marks every returnable loan as returned with today's date
+    - Increases book available copies once per book
+    - Reports the outcome of every item; failed items do not abort the others
+    """
+    return await async_loan_service.bulk_return(db, loan_ids=bulk_in.loan_ids)
 
 @router.post("/{loan_id}/return", response_model=Loan)
-def return_book(
+@query_budget(4)
+async def return_book(
     loan_id: UUID, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Return a book
@@ -88,26 +176,28 @@ def return_book(
     - Sets return date to today
     - Increases book available copies
     """
-    return loan_service.return_book(db, loan_id)
+    return await async_loan_service.return_book(db, loan_id)
 
 @router.patch("/{loan_id}", response_model=Loan)
-def update_loan(
+@query_budget(3)
+async def update_loan(
     loan_id: UUID, 
     loan_in: LoanUpdate, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Update a loan
     """
-    db_obj = loan_service.get_by_id(db, loan_id)
-    return loan_service.update(db, db_obj=db_obj, obj_in=loan_in)
+    db_obj = await async_loan_service.get_by_id(db, loan_id)
+    return await async_loan_service.update(db, db_obj=db_obj, obj_in=loan_in)
 
 @router.delete("/{loan_id}", response_model=Loan)
-def delete_loan(
+@query_budget(2)
+async def delete_loan(
     loan_id: UUID, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Delete a loan
     """
-    return loan_service.delete(db, id=loan_id) 
\ No newline at end of file
+    return await async_loan_service.delete(db, id=loan_id) 
\ No newline at end of file
@@ -0,0 +1,22 @@
+from typing import List
+from fastapi import APIRouter, HTTPException, Query
+
+from app.db.instrumentation import query_budget
+from app.schemas.suggest import Suggestion
+from app.services.suggest_index import SUGGEST_MAX_LIMIT, suggest_index
+
+router = APIRouter(prefix="/suggest", tags=["Suggest"])
+
+@router.get("", response_model=List[Suggestion])
+@query_budget(0)
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100), 
+    limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT)
+):
+    """
+    Book titles and author names matching what was typed so far, most loaned first
+    Every word of `prefix` must start a word of the suggestion; served from memory
+    """
+    if not suggest_index.ready:
+        raise HTTPException(status_code=503, detail="Suggestions are not available")
+    return suggest_index.suggest(prefix, limit)
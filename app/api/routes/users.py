@@ -1,96 +1,145 @@
-from typing import List
+from typing import List, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from app.api.dependencies import get_session
-from app.schemas.user import User, UserCreate, UserUpdate, UserWithLoans
-from app.services.user_service import user_service
+from app.api.dependencies import DBSession, get_db
+from app.core.conditional import conditional_response
+from app.core.pagination import set_next_cursor
+from app.core.responses import RowSerializer
+from app.db.instrumentation import query_budget
+from app.schemas.user import User, UserCreate, UserUpdate, UserWithLoans, UserWithIncludes
+from app.services.user_service import async_user_service, user_service
+from app.services.export_service import export_service
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-@router.get("/", response_model=List[User])
-def get_users(
+# Renders the user listings without validating each row into UserWithIncludes
+user_list = RowSerializer(UserWithIncludes)
+
+@router.get("/", response_model=List[UserWithIncludes], response_model_exclude_unset=True)
+@query_budget(2)
+async def get_users(
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get all users with pagination
     """
-    return user_service.get_all(db, skip=skip, limit=limit)
+    results = await async_user_service.get_all(db, skip=skip, limit=limit, cursor=cursor, include=include)
+    set_next_cursor(response, results, limit)
+    return conditional_response(request, response, results, user_list)
 
-@router.get("/with-active-loans", response_model=List[User])
-def get_users_with_active_loans(
+@router.get("/with-active-loans", response_model=List[UserWithIncludes], response_model_exclude_unset=True)
+@query_budget(2)
+async def get_users_with_active_loans(
+    request: Request, 
+    response: Response, 
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_session)
+    cursor: Optional[str] = None, 
+    include: Optional[str] = None, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get users who currently have active loans
     This demonstrates business logic filtering across relationships
     """
-    return user_service.get_users_with_active_loans(db, skip=skip, limit=limit)
+    results = await async_user_service.get_users_with_active_loans(db, skip=skip, limit=limit, cursor=cursor, include=include)
+    set_next_cursor(response, results, limit)
+    return conditional_response(request, response, results, user_list)
+
+# No query budget: the rows are read while the body streams, after the
+# X-DB-Queries header is sent, so only the completion log line counts them
+@router.get("/export")
+async def export_users(
+    request: Request, 
+    format: str = "ndjson", 
+    updated_since: Optional[datetime] = None
+):
+    """
+    Export all users as NDJSON or CSV
+    Rows are streamed as they are read, gzip encoded if the client accepts it;
+    `updated_since` keeps the users created or updated since then
+    """
+    return export_service.export_response(user_service.model, format, updated_since, request.headers.get("accept-encoding"))
 
 @router.get("/{user_id}", response_model=User)
-def get_user(
+@query_budget(1)
+async def get_user(
     user_id: UUID, 
-    db: Session = Depends(get_session)
+    request: Request, 
+    response: Response, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get a user by ID
     """
-    return user_service.get_by_id(db, user_id)
+    result = await async_user_service.get_by_id(db, user_id)
+    return conditional_response(request, response, result)
 
 @router.get("/{user_id}/loans", response_model=UserWithLoans)
-def get_user_with_loans(
+@query_budget(2)
+async def get_user_with_loans(
     user_id: UUID, 
-    db: Session = Depends(get_session)
+    request: Request, 
+    response: Response, 
+    db: DBSession = Depends(get_db)
 ):
     """
     Get a user with their loan history
     """
-    return user_service.get_user_with_loans(db, user_id)
+    result = await async_user_service.get_user_with_loans(db, user_id)
+    return conditional_response(request, response, result)
 
 @router.get("/{user_id}/activity")
-def get_user_activity_summary(
+@query_budget(2)
+async def get_user_activity_summary(
     user_id: UUID, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Get a summary of a user's library activity
     This demonstrates business transformation of data
     """
-    return user_service.get_user_activity_summary(db, user_id)
+    return await async_user_service.get_user_activity_summary(db, user_id)
 
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-def create_user(
+@query_budget(2)
+async def create_user(
     user_in: UserCreate, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Create a new user
     """
-    return user_service.create(db, obj_in=user_in)
+    return await async_user_service.create(db, obj_in=user_in)
 
 @router.patch("/{user_id}", response_model=User)
-def update_user(
+@query_budget(3)
+async def update_user(
     user_id: UUID, 
     user_in: UserUpdate, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Update a user
     """
-    db_obj = user_service.get_by_id(db, user_id)
-    return user_service.update(db, db_obj=db_obj, obj_in=user_in)
+    db_obj = await async_user_service.get_by_id(db, user_id)
+    return await async_user_service.update(db, db_obj=db_obj, obj_in=user_in)
 
 @router.delete("/{user_id}", response_model=User)
-def delete_user(
+@query_budget(3)
+async def delete_user(
     user_id: UUID, 
-    db: Session = Depends(get_session)
+    db: DBSession = Depends(get_db)
 ):
     """
     Delete a user
     """
-    return user_service.delete(db, id=user_id) 
\ No newline at end of file
+    return await async_user_service.delete(db, id=user_id) 
\ No newline at end of file
@@ -4,6 +4,9 @@ from app.api.routes.authors import router as authors_router
 from app.api.routes.books import router as books_router
 from app.api.routes.users import router as users_router
 from app.api.routes.loans import router as loans_router
+from app.api.routes.imports import router as imports_router
+from app.api.routes.suggest import router as suggest_router
+from app.api.routes.admin import router as admin_router
 
 # Create v1 router
 v1_router = APIRouter()
@@ -13,5 +16,8 @@ v1_router.include_router(authors_router)
 v1_router.include_router(books_router)
 v1_router.include_router(users_router)
 v1_router.include_router(loans_router)
+v1_router.include_router(imports_router)
+v1_router.include_router(suggest_router)
+v1_router.include_router(admin_router)
 
 __all__ = ["v1_router"] 
\ No newline at end of file
@@ -0,0 +1,112 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import entity_cache_entries
+
+# Returned by CacheBackend.get for keys that are not cached (None is a valid value)
+MISSING = object()
+
+
+class CacheBackend:
+    """
+    Interface of the caches used by the services
+
+    Values are plain data (dicts of column values, None for "not found"), so
+    a shared backend (e.g. Redis) can serialize them. Implementations must be
+    safe to call from several threads.
+    """
+    def get(self, key: Hashable) -> Any:
+        """
+        Cached value of `key`, or MISSING
+        """
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """
+        Cache `value` for `ttl` seconds
+        """
+        raise NotImplementedError
+
+    def delete(self, *keys: Hashable) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """
+    In-process cache bounded in size (least recently used entries are
+    evicted first) and in time (entries expire after their TTL)
+
+    Each worker process has its own: writes made through another worker are
+    only seen once the entry expires.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys: Hashable) -> None:
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class TableVersions:
+    """
+    Version counter of each table, bumped after committing writes to it
+
+    Cached results record the versions of the tables they were computed from,
+    and are stale as soon as one of them moves. Counters are per process.
+    """
+    def __init__(self):
+        self.versions: Dict[str, int] = {}
+        self.lock = Lock()
+
+    def bump(self, *tables: str) -> None:
+        with self.lock:
+            for table in tables:
+                self.versions[table] = self.versions.get(table, 0) + 1
+
+    def get(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self.versions.get(table, 0) for table in tables)
+
+
+table_versions = TableVersions()
+
+# Cache of the entities read by BaseService.get_by_id
+entity_cache: Optional[CacheBackend] = None
+if settings.ENTITY_CACHE_SIZE > 0:
+    entity_cache = LRUCache(settings.ENTITY_CACHE_SIZE)
+    entity_cache_entries.set_function(entity_cache.__len__)
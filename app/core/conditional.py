@@ -0,0 +1,119 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import inspect
+from sqlalchemy.exc import NoInspectionAvailable
+from app.core.responses import RowSerializer
+
+# Validators are computed from the version of the rows (updated_at, or
+# created_at for rows never updated), so they are known as soon as the rows
+# are loaded: a 304 is answered without serializing the response body.
+
+
+def _row_version(obj: Any) -> Tuple[Any, Optional[datetime]]:
+    """
+    (id, version) of an ORM object, read from its loaded state (never lazy loads)
+    """
+    values = inspect(obj).dict
+    return values.get("id"), values.get("updated_at") or values.get("created_at")
+
+
+def _versions(obj: Any) -> Iterable[Tuple[Any, Optional[datetime]]]:
+    """
+    Version of an object and of the related objects loaded with it (?include=,
+    detail routes), which are part of the response too
+    """
+    yield _row_version(obj)
+    state = inspect(obj)
+    unloaded = state.unloaded
+    for relationship in state.mapper.relationships:
+        if relationship.key in unloaded:
+            continue
+        related = state.dict.get(relationship.key)
+        if related is None:
+            continue
+        for item in related if isinstance(related, list) else [related]:
+            yield _row_version(item)
+
+
+def get_validators(data: Any) -> Optional[Tuple[str, Optional[datetime]]]:
+    """
+    Weak ETag and Last-Modified date of a resource or a page of resources
+
+    The ETag hashes the id and version of every row in the response, so it
+    changes when a row is updated, added or removed. Pages get no Last-Modified
+    date: the latest version of their rows does not change when one is removed.
+    Returns None for data that are not ORM objects.
+    """
+    items = data if isinstance(data, list) else [data]
+    digest = hashlib.blake2b(digest_size=16)
+    last_modified = None
+    try:
+        for item in items:
+            for id, version in _versions(item):
+                digest.update(f"{id}:{version.isoformat() if version else ''};".encode())
+                if version and (last_modified is None or version > last_modified):
+                    last_modified = version
+    except NoInspectionAvailable:
+        return None
+    if isinstance(data, list):
+        last_modified = None
+    return f'W/"{digest.hexdigest()}"', last_modified
+
+
+def _http_date(value: datetime) -> str:
+    # Timestamps are stored as naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Whether the client's cached copy is current (If-None-Match, or else If-Modified-Since)
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request, response: Response, data: Any, serializer: Optional[RowSerializer] = None
+) -> Any:
+    """
+    Return `data` with its ETag and Last-Modified headers, or an empty 304
+    response if the client already has this version
+
+    With a `serializer`, `data` is rendered by it instead of going through
+    the route's response_model.
+    """
+    validators = get_validators(data)
+    if validators is None:
+        return serializer.response(data, response) if serializer else data
+    etag, last_modified = validators
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+
+    if is_not_modified(request, etag, last_modified):
+        # Keep the headers already set by the route (e.g. the next page cursor)
+        not_modified = Response(status_code=304, headers=headers)
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                not_modified.headers.setdefault(name, value)
+        return not_modified
+    response.headers.update(headers)
+    return serializer.response(data, response) if serializer else data
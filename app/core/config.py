@@ -1,3 +1,4 @@
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 import os
 
@@ -12,9 +13,105 @@ class Settings(BaseSettings):
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     
+    # Logging. Records are handed to a background thread through a queue of
+    # LOG_QUEUE_SIZE records (dropped when full, never blocking a request).
+    # Log files are written to LOG_DIR (empty to disable), rotated at midnight
+    # and kept for LOG_FILE_BACKUP_COUNT days.
+    LOG_DIR: str = "logs"
+    LOG_QUEUE_SIZE: int = 10_000
+    LOG_FILE_BACKUP_COUNT: int = 7
+    
+    # "text" or "json" (one object per line, request fields as keys)
+    LOG_FORMAT: str = "text"
+    
+    # Fraction of successful requests whose INFO logs are kept, decided when
+    # the request starts. LOG_REQUEST_SAMPLE_RATES overrides it per route
+    # template, e.g. '{"/health": 0, "/api/v1/books/{book_id}": 0.05}'.
+    # Failed requests (5xx) and requests slower than LOG_SLOW_REQUEST_MS are
+    # always logged, as warnings.
+    LOG_REQUEST_SAMPLE_RATE: float = 1.0
+    LOG_REQUEST_SAMPLE_RATES: Dict[str, float] = {}
+    LOG_SLOW_REQUEST_MS: float = 1000.0
+    
     # Database configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./library.db")
     
+    # Serve the routes with an asyncio session (e.g. aiosqlite) instead of the
+    # sync session in the threadpool. The async URL defaults to DATABASE_URL
+    # with its asyncio driver.
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+    
+    # SQLite pragmas applied to every new connection (empty to keep SQLite's default).
+    # WAL lets readers run alongside the writer; NORMAL sync is durable in WAL mode.
+    # cache_size is in pages, or KiB when negative; busy_timeout is in milliseconds.
+    SQLITE_JOURNAL_MODE: Optional[str] = "WAL"
+    SQLITE_SYNCHRONOUS: Optional[str] = "NORMAL"
+    SQLITE_CACHE_SIZE: Optional[int] = -64000
+    SQLITE_MMAP_SIZE: Optional[int] = 256 * 1024 * 1024
+    SQLITE_TEMP_STORE: Optional[str] = "MEMORY"
+    SQLITE_BUSY_TIMEOUT: Optional[int] = 5000
+
+    # Connection pool (not used for in-memory SQLite databases)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_PRE_PING: bool = True
+
+    # Retries of service writes failing with "database is locked", with
+    # exponential backoff starting at DB_LOCK_RETRY_BACKOFF seconds
+    DB_LOCK_RETRIES: int = 3
+    DB_LOCK_RETRY_BACKOFF: float = 0.05
+
+    # SQL statement logging (replaces the engine's echo). Defaults to on in
+    # development only. SQL_LOG_SAMPLE_RATE logs a fraction of the statements;
+    # with SQL_LOG_SLOW_MS set, every statement at least that slow is logged
+    # (whatever the sample rate) and the others are not.
+    SQL_LOG_STATEMENTS: bool = os.getenv("ENVIRONMENT", "development") == "development"
+    SQL_LOG_SAMPLE_RATE: float = 1.0
+    SQL_LOG_SLOW_MS: Optional[float] = None
+
+    # Fail requests running more statements than the query budget declared on
+    # their endpoint (always logged). On by default when testing.
+    QUERY_BUDGET_ENFORCE: bool = os.getenv("ENVIRONMENT", "development") == "testing"
+
+    # Metrics exposed at /metrics. With several workers, point
+    # METRICS_MULTIPROC_DIR at a directory shared by them: each worker writes a
+    # snapshot there every METRICS_SNAPSHOT_INTERVAL seconds and /metrics
+    # reports their sum.
+    METRICS_MULTIPROC_DIR: Optional[str] = None
+    METRICS_SNAPSHOT_INTERVAL: float = 5.0
+
+    # Entities read by id are cached in process for ENTITY_CACHE_TTL seconds
+    # (ENTITY_CACHE_SIZE entries at most, 0 disables the cache). Writes made
+    # by this process invalidate its entries; with several workers, an update
+    # or delete made through another one shows once the entry expires, so
+    # keep it short. Ids that were not found are never cached.
+    ENTITY_CACHE_SIZE: int = 10_000
+    ENTITY_CACHE_TTL: float = 2.0
+    
+    # Results of the aggregate endpoints (availability summary, statistics)
+    # are cached until a write to a table they read from is committed by this
+    # process, or for RESULT_CACHE_TTL seconds at most: with several workers,
+    # a write made through another one (e.g. a checkout) shows after that
+    # long, so keep it short. RESULT_CACHE_SIZE bounds the number of entries,
+    # 0 disables the cache. With RESULT_CACHE_STALE_WHILE_REVALIDATE, a stale
+    # result is returned while a background thread computes the new one.
+    RESULT_CACHE_SIZE: int = 1_000
+    RESULT_CACHE_TTL: float = 5.0
+    RESULT_CACHE_STALE_WHILE_REVALIDATE: bool = False
+    
+    # Build the in-memory prefix index of /suggest at startup (every book
+    # title and author name, with their loan counts); /suggest answers 503
+    # when it is off
+    SUGGEST_INDEX: bool = True
+    
+    # Report hot queries that fall back to full scans at startup
+    QUERY_PLAN_CHECK: bool = True
+    
+    # Let the filtered listings answer ?explain=true with their SQL and query
+    # plan instead of their rows. On in development only.
+    QUERY_EXPLAIN: bool = os.getenv("ENVIRONMENT", "development") == "development"
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,138 @@
+import operator
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+from fastapi import HTTPException, Request
+from sqlalchemy import not_
+from sqlalchemy.orm import QueryableAttribute
+
+# Query parameters of the listings that are not filters
+LISTING_PARAMS = ("skip", "limit", "cursor", "include", "sort", "explain")
+
+# Comparisons of ?field[op]=value (?field=value is eq)
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda column, values: column.in_(values),
+}
+
+# Values of ?field[in]= are comma separated, at most this many
+MAX_IN_VALUES = 100
+
+_PARAM = re.compile(r"(\w+)(?:\[(\w+)\])?")
+
+
+class Filter:
+    """
+    A field listings can be filtered on, with the operators it accepts
+
+    The expression is a column, or a condition (e.g. `available_copies > 0`)
+    which `field=true` keeps and `field=false` negates. Only whitelist fields
+    an index can serve: the query plan of every combination is checked anyway.
+    """
+    __slots__ = ("expression", "operators", "condition", "python_type")
+
+    def __init__(self, expression: Any, *operators: str):
+        self.expression = expression
+        self.operators = operators or ("eq",)
+        self.condition = not isinstance(expression, QueryableAttribute)
+        try:
+            self.python_type = expression.type.python_type
+        except NotImplementedError:
+            # sqlmodel's AutoString does not declare one
+            self.python_type = str
+
+
+def query_filters(request: Request) -> List[Tuple[str, str]]:
+    """
+    The (name, value) query parameters of a listing request that are filters
+    """
+    return [(name, value) for name, value in request.query_params.multi_items() if name not in LISTING_PARAMS]
+
+
+def _parse_value(value: str, python_type: type) -> Any:
+    if python_type is bool:
+        if value.lower() in ("true", "1"):
+            return True
+        if value.lower() in ("false", "0"):
+            return False
+        raise ValueError(value)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    return python_type(value)
+
+
+def build_filters(params: Sequence[Tuple[str, str]], filterable: Dict[str, Filter]) -> List[Tuple[Tuple[str, str], Any]]:
+    """
+    Turn ?field=value and ?field[op]=value parameters into WHERE clauses
+
+    Returns ((field, op), clause) pairs sorted by field and operator. Raises a
+    400 error for unknown fields or operators, repeated filters and values
+    that do not parse as the type of the field.
+    """
+    clauses = {}
+    for param, raw in params:
+        match = _PARAM.fullmatch(param)
+        name, op = (match.group(1), match.group(2) or "eq") if match else (param, "eq")
+        field = filterable.get(name)
+        if field is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot filter on {param}, expected one of: {', '.join(filterable) or 'nothing'}"
+            )
+        if op not in field.operators:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot filter {name} with {op}, expected one of: {', '.join(field.operators)}"
+            )
+        if (name, op) in clauses:
+            raise HTTPException(status_code=400, detail=f"Filter {param} is given more than once")
+
+        try:
+            if op == "in":
+                values = [_parse_value(value, field.python_type) for value in raw.split(",")]
+                if len(values) > MAX_IN_VALUES:
+                    raise HTTPException(status_code=400, detail=f"Filter {param} takes at most {MAX_IN_VALUES} values")
+            else:
+                value = _parse_value(raw, field.python_type)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid value for {param}: {raw!r}")
+
+        if field.condition:
+            # Compared with == the condition would hide it from the partial indexes
+            clauses[name, op] = field.expression if value else not_(field.expression)
+        elif op == "in":
+            clauses[name, op] = OPERATORS[op](field.expression, values)
+        else:
+            clauses[name, op] = OPERATORS[op](field.expression, value)
+    return sorted(clauses.items(), key=operator.itemgetter(0))
+
+
+def parse_sort(sort: Optional[str], sortable: Sequence[str]) -> Tuple[Optional[str], bool]:
+    """
+    Split ?sort=field (or -field, descending) into the field and its direction
+
+    Returns (None, descending) for the default created_at order. Raises a 400
+    error for fields that are not in `sortable`.
+    """
+    if not sort:
+        return None, False
+    descending = sort.startswith("-")
+    name = sort[1:] if descending else sort
+    if name == "created_at":
+        return None, descending
+    if name not in sortable:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by {name}, expected one of: {', '.join(('created_at',) + tuple(sortable))}"
+        )
+    return name, descending
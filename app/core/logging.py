@@ -1,33 +1,152 @@
+import atexit
+import json
 import logging
+import queue
 import sys
-import os
-from datetime import datetime
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from threading import Lock
+from datetime import datetime, timezone
+from typing import List, Optional
 from app.core.config import settings
 
-# Crear directorio de logs si no existe
-log_dir = Path("logs")
-log_dir.mkdir(exist_ok=True)
-
-# Nombre del archivo de log con la fecha actual
-log_file = log_dir / f"app_{datetime.now().strftime('%Y-%m-%d')}.log"
-
 # Configuración del formato de los logs
 formatter = logging.Formatter(
     "[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s",
     "%Y-%m-%d %H:%M:%S"
 )
 
-# Handler para la consola
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(formatter)
+# Atributos estándar de un LogRecord, el resto vienen de `extra`
+RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formato JSON, un objeto por línea
+
+    Los campos pasados en `extra` (correlation_id, route, status...) se
+    añaden como claves del objeto; los que valen None se omiten.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def get_formatter() -> logging.Formatter:
+    return JsonFormatter() if settings.LOG_FORMAT.lower() == "json" else formatter
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler que nunca bloquea: si la cola está llena el registro se descarta
+
+    Los registros descartados se cuentan, y se avisa de ellos con un WARNING en
+    cuanto vuelve a haber sitio en la cola.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.dropped:
+            self.report_dropped()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def report_dropped(self) -> None:
+        warning = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Log queue full, %d records dropped", (self.dropped,), None
+        )
+        try:
+            self.queue.put_nowait(self.prepare(warning))
+        except queue.Full:
+            return
+        self.dropped = 0
+
+
+class LogListener(QueueListener):
+    """
+    QueueListener que espera a que haya sitio en la cola para encolar la marca
+    de parada, así los registros pendientes se escriben antes de terminar
+    """
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+# Cola acotada entre los loggers y el hilo que escribe los registros
+log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+queue_handler = DroppingQueueHandler(log_queue)
+
+_listener: Optional[LogListener] = None
+_listener_lock = Lock()
+
+
+def get_handlers() -> List[logging.Handler]:
+    """
+    Handlers usados por el hilo de escritura: consola y archivo de log
+
+    El archivo (LOG_DIR/app.log) se abre con la primera escritura y rota cada
+    medianoche, así que un proceso de larga duración no queda fijado a un día.
+    """
+    # Handler para la consola
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(get_formatter())
+    handlers: List[logging.Handler] = [console_handler]
+
+    if settings.LOG_DIR:
+        # Crear directorio de logs si no existe
+        log_dir = Path(settings.LOG_DIR)
+        log_dir.mkdir(parents=True, exist_ok=True)
+
+        # Handler para el archivo de log con rotación diaria
+        file_handler = TimedRotatingFileHandler(
+            log_dir / "app.log", when="midnight", backupCount=settings.LOG_FILE_BACKUP_COUNT, delay=True
+        )
+        file_handler.setFormatter(get_formatter())
+        handlers.append(file_handler)
+
+    return handlers
+
+
+def start_logging() -> None:
+    """
+    Arrancar el hilo que escribe los registros de la cola (una sola vez por proceso)
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        _listener = LogListener(log_queue, *get_handlers(), respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Escribir los registros pendientes y parar el hilo de escritura
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
-# Handler para el archivo de log con rotación (10MB por archivo, máximo 5 archivos)
-file_handler = RotatingFileHandler(
-    log_file, maxBytes=10 * 1024 * 1024, backupCount=5
-)
-file_handler.setFormatter(formatter)
 
 # Configuración del nivel de log según el entorno
 def get_log_level():
@@ -45,20 +164,23 @@ def get_log_level():
 def get_logger(name: str) -> logging.Logger:
     """
     Obtener un logger configurado para un módulo específico
-    
+
+    Los registros se encolan y los escribe un hilo en segundo plano, así que
+    registrar no hace escrituras a disco ni a la consola en el hilo que llama.
+
     Args:
         name: Nombre del módulo (normalmente se usa __name__)
-        
+
     Returns:
         Logger configurado
     """
     logger = logging.getLogger(name)
-    
+
     # Evitar duplicación de handlers
     if not logger.handlers:
+        start_logging()
         logger.setLevel(get_log_level())
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        logger.addHandler(queue_handler)
         logger.propagate = False
-    
-    return logger 
\ No newline at end of file
+
+    return logger
@@ -0,0 +1,367 @@
+import json
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+class Metric:
+    """
+    A named family of samples, one series per combination of label values
+
+    Recording takes the label values as a tuple, in the order of `labelnames`,
+    and costs a dict lookup and an addition: no locks and no allocations once
+    the series exists. Updates from the event loop are exact; concurrent
+    updates from several threads may rarely lose an increment.
+    """
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.series: Dict[Labels, object] = {}
+
+    def collect(self) -> List[list]:
+        """
+        Current series as [label values, value] pairs
+        """
+        return [[list(labels), value] for labels, value in self.series.items()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        series = self.series
+        series[labels] = series.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.functions: Dict[Labels, Callable[[], Optional[float]]] = {}
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self.series[labels] = value
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        series = self.series
+        series[labels] = series.get(labels, 0) + amount
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+    def set_function(self, function: Callable[[], Optional[float]], labels: Labels = ()) -> None:
+        """
+        Compute the value of a series when collecting (None skips it)
+        """
+        self.functions[labels] = function
+
+    def collect(self) -> List[list]:
+        samples = super().collect()
+        for labels, function in self.functions.items():
+            try:
+                value = function()
+            except Exception as e:
+                logger.debug("Cannot compute gauge %s%s: %s", self.name, labels, e)
+                continue
+            if value is not None:
+                samples.append([list(labels), value])
+        return samples
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        # A series holds the count of each bucket (not cumulative), the +Inf
+        # bucket and the sum of the observed values
+        try:
+            series = self.series[labels]
+        except KeyError:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> List[list]:
+        return [[list(labels), list(values)] for labels, values in self.series.items()]
+
+
+class MetricsRegistry:
+    """
+    In-process registry rendered in the Prometheus text format
+
+    With several worker processes, each one periodically writes a snapshot of
+    its metrics to `multiprocess_dir`, and the worker serving /metrics renders
+    the sum of every live snapshot.
+    """
+    def __init__(self, multiprocess_dir: Optional[str] = None):
+        self.metrics: Dict[str, Metric] = {}
+        self.multiprocess_dir = Path(multiprocess_dir) if multiprocess_dir else None
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        """
+        Serializable copy of the current samples of every metric
+        """
+        return {
+            name: {
+                "type": metric.type,
+                "help": metric.help,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": metric.collect(),
+            }
+            for name, metric in self.metrics.items()
+        }
+
+    # Multiprocess aggregation
+
+    def snapshot_path(self) -> Path:
+        return self.multiprocess_dir / f"metrics-{os.getpid()}.json"
+
+    def write_snapshot(self) -> None:
+        """
+        Publish this process' metrics for the other workers
+        """
+        self.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+        path = self.snapshot_path()
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+    def remove_snapshot(self) -> None:
+        if self.multiprocess_dir is not None:
+            self.snapshot_path().unlink(missing_ok=True)
+
+    def read_snapshots(self) -> Iterable[dict]:
+        """
+        Snapshots of the live workers, including this one
+
+        Snapshots that were not refreshed for a few intervals belong to
+        workers that died without cleaning up and are skipped.
+        """
+        own = self.snapshot_path()
+        max_age = settings.METRICS_SNAPSHOT_INTERVAL * 3
+        now = time.time()
+        yield self.snapshot()
+        for path in self.multiprocess_dir.glob("metrics-*.json"):
+            try:
+                if path == own or now - path.stat().st_mtime > max_age:
+                    continue
+                yield json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.debug("Skipping metrics snapshot %s: %s", path, e)
+
+    # Exposition
+
+    def render(self) -> str:
+        """
+        Render the metrics (of all workers in multiprocess mode) as Prometheus text
+        """
+        if self.multiprocess_dir is not None:
+            merged = merge_snapshots(self.read_snapshots())
+        else:
+            merged = self.snapshot()
+
+        lines = []
+        for name, metric in merged.items():
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = metric["labelnames"]
+            for labels, value in metric["samples"]:
+                if metric["type"] == "histogram":
+                    lines.extend(_render_histogram(name, labelnames, labels, metric["buckets"], value))
+                else:
+                    lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """
+    Sum the samples of several snapshots series by series
+    """
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif metric["type"] == "histogram":
+                    target["samples"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = current + value
+    for metric in merged.values():
+        metric["samples"] = [[list(labels), value] for labels, value in metric["samples"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labels: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _render_histogram(name: str, labelnames: Sequence[str], labels: Sequence[str], buckets: Sequence[float], values: list) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(buckets) + [float("inf")], values[:-1]):
+        cumulative += count
+        le = 'le="' + _format_value(float(bound)) + '"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(values[-1])}")
+    lines.append(f"{name}_count{_format_labels(labelnames, labels)} {cumulative}")
+    return lines
+
+
+# Application registry and metrics
+registry = MetricsRegistry(settings.METRICS_MULTIPROC_DIR)
+
+# Request counts are the _count series of the latency histogram
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds", ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests being served"
+)
+db_pool_checkouts_total = registry.counter(
+    "db_pool_checkouts_total", "Connections checked out of the database pool", ("engine",)
+)
+db_pool_checked_out = registry.gauge(
+    "db_pool_checked_out", "Database connections currently checked out", ("engine",)
+)
+db_pool_size = registry.gauge(
+    "db_pool_size", "Configured size of the database pool", ("engine",)
+)
+threadpool_threads_busy = registry.gauge(
+    "threadpool_threads_busy", "Worker threads running sync endpoints and dependencies"
+)
+threadpool_threads_limit = registry.gauge(
+    "threadpool_threads_limit", "Maximum number of worker threads"
+)
+threadpool_tasks_waiting = registry.gauge(
+    "threadpool_tasks_waiting", "Tasks waiting for a free worker thread"
+)
+entity_cache_hits_total = registry.counter(
+    "entity_cache_hits_total", "Entities read by id served from the cache", ("model",)
+)
+entity_cache_misses_total = registry.counter(
+    "entity_cache_misses_total", "Entities read by id loaded from the database", ("model",)
+)
+entity_cache_entries = registry.gauge(
+    "entity_cache_entries", "Entries in the in-process entity cache"
+)
+result_cache_requests_total = registry.counter(
+    "result_cache_requests_total", "Calls of cached aggregate methods by outcome (hit, stale, miss)", ("method", "result")
+)
+
+# Serializes the checkout counter, which is updated from the worker threads
+_pool_lock = Lock()
+
+
+def install_pool_metrics(engine, name: str) -> None:
+    """
+    Track checkouts and usage of an engine's connection pool
+    """
+    from sqlalchemy import event
+
+    labels = (name,)
+
+    @event.listens_for(engine, "checkout")
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        with _pool_lock:
+            db_pool_checkouts_total.inc(labels)
+
+    pool = engine.pool
+    # Pools without a fixed size (in-memory SQLite) do not track checkouts
+    if hasattr(pool, "checkedout") and hasattr(pool, "size"):
+        db_pool_checked_out.set_function(pool.checkedout, labels)
+        db_pool_size.set_function(pool.size, labels)
+
+
+def _thread_limiter():
+    """
+    AnyIO's default thread limiter, used by Starlette's run_in_threadpool
+
+    Only available from the event loop; None elsewhere (e.g. in a thread).
+    """
+    from anyio import to_thread
+    try:
+        return to_thread.current_default_thread_limiter()
+    except Exception:
+        return None
+
+
+def _limiter_stat(read: Callable) -> Callable[[], Optional[float]]:
+    def compute():
+        limiter = _thread_limiter()
+        return read(limiter) if limiter is not None else None
+    return compute
+
+
+threadpool_threads_busy.set_function(_limiter_stat(lambda limiter: limiter.borrowed_tokens))
+threadpool_threads_limit.set_function(_limiter_stat(lambda limiter: limiter.total_tokens))
+threadpool_tasks_waiting.set_function(_limiter_stat(lambda limiter: limiter.statistics().tasks_waiting))
+
+
+async def publish_snapshots() -> None:
+    """
+    Write this worker's snapshot every METRICS_SNAPSHOT_INTERVAL seconds
+
+    Runs on the event loop, so the threadpool gauges can be computed.
+    """
+    import asyncio
+
+    while True:
+        try:
+            registry.write_snapshot()
+        except OSError as e:
+            logger.warning("Cannot write metrics snapshot: %s", e)
+        await asyncio.sleep(settings.METRICS_SNAPSHOT_INTERVAL)
@@ -1,26 +1,67 @@
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-import uuid
+import logging
+import random
 import time
+import uuid
 from contextvars import ContextVar
-from app.core.logging import get_logger
+from fastapi import HTTPException, Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.errors import http_exception_handler
+from app.core.logging import get_logger, queue_handler
+from app.core.metrics import http_request_duration_seconds, http_requests_in_flight
+from app.db.instrumentation import (
+    DB_QUERIES_HEADER, DB_TIME_HEADER, QueryStats, get_query_budget, query_stats_ctx_var
+)
 
 # Context variable to store request ID for the current request context
 request_id_ctx_var: ContextVar[str] = ContextVar("request_id", default="")
 
+# Whether the INFO logs of the current request are kept (see LOG_REQUEST_SAMPLE_RATE)
+log_sampled_ctx_var: ContextVar[bool] = ContextVar("log_sampled", default=True)
+
 # Get the current request ID from the context variable
 def get_request_id() -> str:
     return request_id_ctx_var.get()
 
+
+class RequestLogFilter(logging.Filter):
+    """
+    Add the correlation ID to every log record, and drop the records below
+    WARNING of the requests left out of the log sample
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = request_id_ctx_var.get() or None
+        return record.levelno >= logging.WARNING or log_sampled_ctx_var.get()
+
+
 logger = get_logger(__name__)
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
+# Filters run in the thread logging the record, where the context is set
+queue_handler.addFilter(RequestLogFilter())
+
+# Route label of requests that did not match any route (keeps the label set bounded)
+UNMATCHED_ROUTE = "unmatched"
+
+PROCESS_TIME_HEADER = "X-Process-Time-Ms"
+
+class RequestContextMiddleware:
     """
-    Middleware that adds a correlation ID to each request.
+    Raw ASGI middleware setting up the context of each request in one pass.
+    
+    - Correlation ID: taken from the request headers (or generated), stored in
+      `request_id_ctx_var` and `request.state`, and returned in the response.
+    - Database usage: statements and time, returned in the response headers,
+      logged, and checked against the endpoint's query budget.
+    - Timing: the processing time header and the latency metrics, labeled by
+      route template, method and status.
+    - Request logging: start, completion and failure, with the request fields
+      as `extra` for the JSON log format. Whether the INFO logs of a request
+      are kept is decided when it starts, from the sample rate of its route;
+      failed and slow requests are always logged, as warnings.
     
-    This correlation ID can be used to track a request across multiple services
-    and is accessible throughout the request lifecycle.
+    Headers are added by wrapping `send`, so unlike BaseHTTPMiddleware the
+    response is passed through without extra tasks or memory streams.
     """
     
     def __init__(
@@ -30,70 +71,176 @@ class CorrelationIdMiddleware(BaseHTTPMiddleware):
         force_new_uuid: bool = False,
         validate_uuid: bool = True
     ):
-        super().__init__(app)
+        self.app = app
         self.header_name = header_name
+        self.header_key = header_name.lower().encode("latin-1")
         self.force_new_uuid = force_new_uuid
         self.validate_uuid = validate_uuid
+        # (path regex, sample rate) of every route, built on the first request
+        self.sampling_rules = None
     
-    async def dispatch(self, request: Request, call_next):
-        # Try to get the correlation ID from the request headers
-        correlation_id = request.headers.get(self.header_name)
-        
-        # Generate a new UUID if:
-        # - No correlation ID was passed
-        # - We're configured to always generate a new ID
-        # - The passed ID is not a valid UUID (if validation is enabled)
-        if (
-            correlation_id is None 
-            or self.force_new_uuid 
-            or (self.validate_uuid and not self._is_valid_uuid(correlation_id))
-        ):
-            correlation_id = str(uuid.uuid4())
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Store the correlation ID in the request state
-        request.state.correlation_id = correlation_id
+        start_time = time.perf_counter_ns()
+        method = scope["method"]
+        path = scope["path"]
+        correlation_id = self._get_correlation_id(scope)
         
-        # Store the correlation ID in the context variable
+        # Store the correlation ID in the request state and the context variable
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
         token = request_id_ctx_var.set(correlation_id)
         
-        # Log the request with correlation ID
-        logger.info(
-            f"Request started | Correlation ID: {correlation_id} | "
-            f"{request.method} {request.url.path}"
-        )
+        # Collect the database usage of the request
+        stats = QueryStats()
+        stats_token = query_stats_ctx_var.set(stats)
         
-        # Measure request processing time
-        start_time = time.time()
+        # Head-based sampling: keep or drop the request's INFO logs up front
+        sampled = random.random() < self._sample_rate(scope)
+        sampled_token = log_sampled_ctx_var.set(sampled)
+        
+        logger.debug("Request started | Correlation ID: %s | %s %s", correlation_id, method, path)
+        
+        http_requests_in_flight.inc()
+        status_code = 500
+        replaced = False
+        
+        async def send_with_context(message: Message) -> None:
+            nonlocal status_code, replaced
+            if message["type"] == "http.response.start":
+                # Fail requests going over the query budget of their endpoint
+                replacement = self._check_query_budget(scope, stats, correlation_id)
+                if replacement is not None:
+                    replaced = True
+                    message = {
+                        "type": "http.response.start",
+                        "status": replacement.status_code,
+                        "headers": list(replacement.raw_headers),
+                    }
+                    await self._send_start(send, message, correlation_id, stats, start_time)
+                    status_code = replacement.status_code
+                    await send({"type": "http.response.body", "body": replacement.body})
+                    return
+                status_code = message["status"]
+                await self._send_start(send, message, correlation_id, stats, start_time)
+            elif not replaced:
+                await send(message)
         
         try:
-            # Process the request
-            response = await call_next(request)
-            
-            # Add the correlation ID to the response headers
-            response.headers[self.header_name] = correlation_id
-            
-            # Calculate processing time
-            process_time = time.time() - start_time
-            
-            # Log the response with correlation ID
-            logger.info(
-                f"Request completed | Correlation ID: {correlation_id} | "
-                f"{request.method} {request.url.path} | "
-                f"Status: {response.status_code} | Time: {process_time:.3f}s"
-            )
-            
-            return response
+            await self.app(scope, receive, send_with_context)
         except Exception as e:
             # Log the exception with correlation ID
             logger.error(
-                f"Request failed | Correlation ID: {correlation_id} | "
-                f"{request.method} {request.url.path} | {str(e)}"
+                "Request failed | Correlation ID: %s | %s %s | %s", correlation_id, method, path, e,
+                extra={"method": method, "path": path, "error": repr(e)}
             )
             raise
         finally:
-            # Reset the context variable token
+            elapsed_ns = time.perf_counter_ns() - start_time
+            http_requests_in_flight.dec()
+            
+            # The route is known once the router has matched the request
+            route = scope.get("route")
+            route_path = route.path if route is not None else UNMATCHED_ROUTE
+            http_request_duration_seconds.observe(elapsed_ns / 1e9, (method, route_path, str(status_code)))
+            
+            # Failed and slow requests are logged whatever the sample
+            duration_ms = elapsed_ns / 1e6
+            if status_code >= 500 or duration_ms >= settings.LOG_SLOW_REQUEST_MS:
+                level = logging.WARNING
+            else:
+                level = logging.INFO if sampled else None
+            if level is not None and logger.isEnabledFor(level):
+                logger.log(
+                    level,
+                    "Request completed | Correlation ID: %s | %s %s | Status: %s | Time: %.3fs | "
+                    "DB: %d queries in %.1fms",
+                    correlation_id, method, path, status_code, elapsed_ns / 1e9, stats.queries, stats.time_ms,
+                    extra={
+                        "method": method,
+                        "path": path,
+                        "route": route_path,
+                        "status": status_code,
+                        "duration_ms": round(duration_ms, 3),
+                        "db_queries": stats.queries,
+                        "db_time_ms": round(stats.time_ms, 3),
+                    }
+                )
+            
+            # Reset the context variable tokens
+            log_sampled_ctx_var.reset(sampled_token)
+            query_stats_ctx_var.reset(stats_token)
             request_id_ctx_var.reset(token)
     
+    async def _send_start(self, send: Send, message: Message, correlation_id: str, stats: QueryStats, start_time: int) -> None:
+        """
+        Send the response start with the correlation ID, database usage and timing headers
+        """
+        headers = MutableHeaders(scope=message)
+        headers.append(self.header_name, correlation_id)
+        headers.append(DB_QUERIES_HEADER, str(stats.queries))
+        headers.append(DB_TIME_HEADER, f"{stats.time_ms:.1f}")
+        headers.append(PROCESS_TIME_HEADER, str((time.perf_counter_ns() - start_time) // 1_000_000))
+        await send(message)
+    
+    def _check_query_budget(self, scope: Scope, stats: QueryStats, correlation_id: str):
+        """
+        Log requests over their endpoint's query budget
+
+        Returns the error response replacing the original one when the
+        budget is enforced, None otherwise.
+        """
+        budget = get_query_budget(scope.get("endpoint"))
+        if budget is None or stats.queries <= budget:
+            return None
+        
+        message = f"Query budget exceeded: {stats.queries} queries, budget is {budget}"
+        logger.warning("%s | Correlation ID: %s | %s %s", message, correlation_id, scope["method"], scope["path"])
+        if not settings.QUERY_BUDGET_ENFORCE:
+            return None
+        return http_exception_handler(Request(scope), HTTPException(status_code=500, detail=message))
+    
+    def _sample_rate(self, scope: Scope) -> float:
+        """
+        Log sample rate of the route matching the request
+        
+        Routes are matched on their path like the router does (first match
+        wins), so the rate of a route template applies to all its requests.
+        """
+        if not settings.LOG_REQUEST_SAMPLE_RATES or "app" not in scope:
+            return settings.LOG_REQUEST_SAMPLE_RATE
+        if self.sampling_rules is None:
+            self.sampling_rules = [
+                (route.path_regex, settings.LOG_REQUEST_SAMPLE_RATES.get(route.path, settings.LOG_REQUEST_SAMPLE_RATE))
+                for route in scope["app"].routes
+                if hasattr(route, "path_regex")
+            ]
+        path = scope["path"]
+        for path_regex, rate in self.sampling_rules:
+            if path_regex.match(path):
+                return rate
+        return settings.LOG_REQUEST_SAMPLE_RATE
+    
+    def _get_correlation_id(self, scope: Scope) -> str:
+        """
+        Correlation ID passed in the request headers, or a new one
+        
+        A new UUID is generated if:
+        - No correlation ID was passed
+        - We're configured to always generate a new ID
+        - The passed ID is not a valid UUID (if validation is enabled)
+        """
+        if not self.force_new_uuid:
+            for key, value in scope["headers"]:
+                if key == self.header_key:
+                    correlation_id = value.decode("latin-1")
+                    if not self.validate_uuid or self._is_valid_uuid(correlation_id):
+                        return correlation_id
+                    break
+        return str(uuid.uuid4())
+    
     def _is_valid_uuid(self, uuid_str: str) -> bool:
         """
         Check if a string is a valid UUID
@@ -103,27 +250,3 @@ class CorrelationIdMiddleware(BaseHTTPMiddleware):
             return str(uuid_obj) == uuid_str
         except (ValueError, AttributeError):
             return False
-
-
-class TimingMiddleware(BaseHTTPMiddleware):
-    """
-    Middleware that adds timing information to each request.
-    
-    This middleware measures how long each request takes to process
-    and adds this information to response headers.
-    """
-    
-    async def dispatch(self, request: Request, call_next):
-        # Measure request processing time
-        start_time = time.time()
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Calculate processing time
-        process_time = time.time() - start_time
-        
-        # Add timing header (in milliseconds)
-        response.headers["X-Process-Time-Ms"] = str(int(process_time * 1000))
-        
-        return response 
\ No newline at end of file
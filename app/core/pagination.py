@@ -0,0 +1,93 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+from uuid import UUID
+from fastapi import HTTPException, Response
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Integer keys outside of this range cannot be bound as SQLite parameters
+SQL_INT_MIN, SQL_INT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _to_json(value: Any) -> Any:
+    """
+    Convert a key value into a JSON friendly representation
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return value.hex
+    return value
+
+
+def _from_json(value: Any, python_type: type) -> Any:
+    """
+    Convert a JSON value back into the python type of its key column
+
+    Raises ValueError for values of another JSON type than the one encoded
+    """
+    if value is None:
+        return None
+    if python_type in (datetime, date, UUID) and not isinstance(value, str):
+        raise ValueError(f"expected a string, got {value!r}")
+    if python_type is int and (not isinstance(value, int) or isinstance(value, bool) or not SQL_INT_MIN <= value <= SQL_INT_MAX):
+        raise ValueError(f"expected a 64-bit integer, got {value!r}")
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort key values of the last row of a page into an opaque cursor
+    """
+    payload = json.dumps([_to_json(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """
+    Decode an opaque cursor into the sort key values for the given columns
+
+    Raises a 400 error if the cursor is malformed or does not match the columns
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match the sort keys")
+        return [
+            _from_json(value, column.type.python_type)
+            for value, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def next_cursor(items: Sequence[Any], limit: int, keys: Sequence[str] = ("created_at", "id")) -> Optional[str]:
+    """
+    Build the cursor pointing after the last item of a full page
+
+    Returns None when the page is not full, meaning there are no more rows
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, key) for key in keys])
+
+
+def set_next_cursor(response: Response, items: Sequence[Any], limit: int, keys: Sequence[str] = ("created_at", "id")) -> None:
+    """
+    Expose the cursor for the next page through the response headers
+    """
+    cursor = next_cursor(items, limit, keys)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
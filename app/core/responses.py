@@ -0,0 +1,87 @@
+import typing
+from typing import Any, List, Optional, Sequence, Tuple, Type
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from app.schemas.includes import LoadedAttributesModel
+
+# Default response class of the app: orjson renders UUIDs, datetimes and
+# dates natively and is several times faster than the stdlib json module
+DefaultResponse = ORJSONResponse
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _nested_schema(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """
+    Schema of a nested model field (Optional[X], List[X]...) and whether it is a list
+    """
+    many = False
+    while True:
+        origin = typing.get_origin(annotation)
+        if origin is None:
+            break
+        if origin in (list, List):
+            many = True
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None, False
+        annotation = args[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, many
+    return None, False
+
+
+class RowSerializer:
+    """
+    Render ORM objects as the JSON of a response schema, without building
+    instances of the schema
+
+    The response_model path validates every row into a pydantic model, dumps
+    the models to python values and only then encodes them. Rows read from
+    the database already have the schema's types, so their attribute values
+    are encoded directly. Like LoadedAttributesModel, attributes that are not
+    loaded are left out for schemas based on it, and read (possibly lazy
+    loaded) for the others.
+
+    The fields of the schema are resolved once, when the serializer is created.
+    """
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.loaded_only = issubclass(schema, LoadedAttributesModel)
+        self.fields: List[Tuple[str, Optional["RowSerializer"], bool]] = []
+        for name, field in schema.model_fields.items():
+            nested, many = _nested_schema(field.annotation)
+            self.fields.append((name, RowSerializer(nested) if nested else None, many))
+
+    def to_dict(self, obj: Any) -> dict:
+        state = inspect(obj)
+        values = state.dict
+        unloaded = state.unloaded if self.loaded_only else ()
+        data = {}
+        for name, nested, many in self.fields:
+            if name in values:
+                value = values[name]
+            elif name in unloaded:
+                continue
+            else:
+                value = getattr(obj, name)
+            if nested is not None and value is not None:
+                value = [nested.to_dict(item) for item in value] if many else nested.to_dict(value)
+            data[name] = value
+        return data
+
+    def render(self, rows: Sequence[Any]) -> bytes:
+        return orjson.dumps([self.to_dict(row) for row in rows])
+
+    def response(self, rows: Sequence[Any], response: Response) -> Response:
+        """
+        JSON response for `rows`, with the headers and status set by the route on `response`
+        """
+        rendered = Response(self.render(rows), status_code=response.status_code or 200, media_type=JSON_MEDIA_TYPE)
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                rendered.headers.append(name, value)
+        return rendered
@@ -0,0 +1,33 @@
+import argparse
+import json
+from pathlib import Path
+from fastapi import HTTPException
+from sqlmodel import Session
+from app.db.session import engine, init_db
+from app.services.import_service import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, CatalogImportService
+
+
+def import_catalog(path: str, format: str = None, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """Import a CSV or NDJSON catalog file into the database"""
+    # Guess the format from the file extension when not given
+    if format is None:
+        format = "ndjson" if Path(path).suffix.lower() in (".ndjson", ".jsonl") else "csv"
+    
+    init_db()
+    
+    with open(path, "rb") as file, Session(engine) as db:
+        return CatalogImportService(chunk_size=chunk_size).import_file(db, file, format)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import authors and books from a CSV or NDJSON catalog")
+    parser.add_argument("path", help="Catalog file to import")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="File format (default: from the file extension)")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Rows inserted per batch")
+    args = parser.parse_args()
+    
+    try:
+        report = import_catalog(args.path, args.format, args.chunk_size)
+    except HTTPException as e:
+        parser.exit(1, f"{e.detail}\n")
+    print(json.dumps(report, indent=2))
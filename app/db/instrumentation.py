@@ -0,0 +1,79 @@
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional, TypeVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+F = TypeVar("F", bound=Callable)
+
+# Response headers carrying the database usage of a request
+DB_QUERIES_HEADER = "X-DB-Queries"
+DB_TIME_HEADER = "X-DB-Time-Ms"
+
+
+class QueryStats:
+    """
+    Statements executed and time spent in the database during one request
+    """
+    __slots__ = ("queries", "time_ms")
+
+    def __init__(self):
+        self.queries = 0
+        self.time_ms = 0.0
+
+
+# Stats of the current request. The object is shared (not copied) with the
+# threads and tasks serving the request, so their statements add up here.
+query_stats_ctx_var: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    return query_stats_ctx_var.get()
+
+
+def install_query_instrumentation(engine: Engine) -> None:
+    """
+    Count the statements run by the engine, and their time, for the current request
+
+    Statements run outside of a request (startup, CLI) are not recorded.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        if query_stats_ctx_var.get() is not None:
+            context._query_stats_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        stats = query_stats_ctx_var.get()
+        start = getattr(context, "_query_stats_start", None)
+        if stats is None or start is None:
+            return
+        stats.queries += 1
+        stats.time_ms += (time.perf_counter() - start) * 1000
+
+
+def query_budget(queries: int) -> Callable[[F], F]:
+    """
+    Declare the maximum number of statements an endpoint may run
+
+    Requests going over the budget are logged, and fail with a 500 error when
+    settings.QUERY_BUDGET_ENFORCE is on (the default in testing), so N+1
+    regressions are caught before they ship. Apply it below the route
+    decorator:
+
+        @router.get("/")
+        @query_budget(2)
+        async def get_books(...):
+
+    The budget is checked when the response starts, so it does not apply to
+    streaming responses whose body runs its own queries.
+    """
+    def decorator(endpoint: F) -> F:
+        endpoint.query_budget = queries
+        return endpoint
+
+    return decorator
+
+
+def get_query_budget(endpoint: Optional[Callable]) -> Optional[int]:
+    return getattr(endpoint, "query_budget", None)
@@ -0,0 +1,49 @@
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Revision matching the schema created by create_all before migrations existed
+BASELINE_REVISION = "0001"
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+def get_alembic_config() -> Config:
+    """
+    Build the Alembic configuration pointing at the bundled migrations
+    """
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Upgrade the database schema to the latest revision
+
+    Databases created with SQLModel.metadata.create_all before the project used
+    migrations have the tables but no `alembic_version` table. They are stamped
+    with the baseline revision first, so only the later migrations run on them.
+    """
+    config = get_alembic_config()
+
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            # Take the write lock before looking at the schema, so workers
+            # starting together migrate one after the other (the others wait
+            # up to the busy timeout, then find the schema up to date)
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        
+        if "alembic_version" not in tables and "books" in tables:
+            logger.info("Existing database without migration history, stamping revision %s", BASELINE_REVISION)
+            command.stamp(config, BASELINE_REVISION)
+        
+        command.upgrade(config, "head")
+        logger.info("Database schema is up to date")
@@ -0,0 +1,61 @@
+"""Indexes for the hot query predicates
+
+Composite indexes follow the service queries: the equality filter first,
+then the (created_at, id) keyset pagination order. Filters on a constant
+(available books, active loans) use SQLite partial indexes so they only
+cover the rows those queries can return.
+
+`if_not_exists` keeps the migration safe on databases where some of these
+indexes were already created by SQLModel.metadata.create_all.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-05-20 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    # Keyset pagination order of the plain listings
+    ("ix_authors_created_at_id", "authors", ["created_at", "id"], None),
+    ("ix_users_created_at_id", "users", ["created_at", "id"], None),
+    ("ix_books_created_at_id", "books", ["created_at", "id"], None),
+    ("ix_loans_created_at_id", "loans", ["created_at", "id"], None),
+    # Filtered book listings, author lookups and the availability summary
+    ("ix_books_genre_created_at_id", "books", ["genre", "created_at", "id"], None),
+    ("ix_books_author_id_created_at_id", "books", ["author_id", "created_at", "id"], None),
+    ("ix_books_available_created_at_id", "books", ["created_at", "id"], "available_copies > 0"),
+    ("ix_books_genre_available_copies", "books", ["genre", "available_copies"], None),
+    # Loans by user, by book, by date window and the active (not returned) subset
+    ("ix_loans_loan_date", "loans", ["loan_date"], None),
+    ("ix_loans_user_id_is_returned", "loans", ["user_id", "is_returned"], None),
+    ("ix_loans_book_id", "loans", ["book_id"], None),
+    ("ix_loans_active_created_at_id", "loans", ["created_at", "id"], "is_returned = 0"),
+    ("ix_loans_active_user_id", "loans", ["user_id"], "is_returned = 0"),
+    ("ix_loans_active_due_date", "loans", ["due_date"], "is_returned = 0"),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns, where in INDEXES:
+        op.create_index(
+            name, table, columns,
+            sqlite_where=sa.text(where) if where else None,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,81 @@
+"""Full-text search index of the books
+
+`books_fts` is an FTS5 table with the title, description and author name of
+every book, under the rowid of the book in `books`. Triggers on `books` and
+`authors` keep it in sync with every write, including the bulk inserts of the
+catalog import.
+
+FTS5 is SQLite specific, so the migration does nothing on other databases.
+The index can be rebuilt from the tables with `python -m app.db.search_index`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-06-10 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+AUTHOR_NAME = "(SELECT name FROM authors WHERE id = new.author_id)"
+
+STATEMENTS = [
+    # Prefix indexes make `term*` queries of 2 and 3 characters as cheap as full terms
+    """
+    CREATE VIRTUAL TABLE books_fts USING fts5(
+        title, description, author_name,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO books_fts (rowid, title, description, author_name)
+    SELECT books.rowid, books.title, books.description, authors.name
+    FROM books LEFT JOIN authors ON authors.id = books.author_id
+    """,
+    f"""
+    CREATE TRIGGER books_fts_insert AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts (rowid, title, description, author_name)
+        VALUES (new.rowid, new.title, new.description, {AUTHOR_NAME});
+    END
+    """,
+    """
+    CREATE TRIGGER books_fts_delete AFTER DELETE ON books BEGIN
+        DELETE FROM books_fts WHERE rowid = old.rowid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER books_fts_update AFTER UPDATE OF title, description, author_id ON books BEGIN
+        UPDATE books_fts
+        SET title = new.title, description = new.description, author_name = {AUTHOR_NAME}
+        WHERE rowid = old.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER books_fts_author_update AFTER UPDATE OF name ON authors BEGIN
+        UPDATE books_fts SET author_name = new.name
+        WHERE rowid IN (SELECT rowid FROM books WHERE author_id = new.id);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for statement in STATEMENTS:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("books_fts_author_update", "books_fts_update", "books_fts_delete", "books_fts_insert"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS books_fts")
@@ -0,0 +1,34 @@
+"""Index for the book listings filtered or sorted by publication year
+
+Serves ?publication_year[op]= filters and ?sort=publication_year (or
+-publication_year) in the (publication_year, created_at, id) keyset order.
+Sorted listings leave out the books without a publication year, so the index
+is partial and does not cover them.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-07-01 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_books_publication_year_created_at_id", "books", ["publication_year", "created_at", "id"],
+        sqlite_where=sa.text("publication_year IS NOT NULL"),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_publication_year_created_at_id", table_name="books", if_exists=True)
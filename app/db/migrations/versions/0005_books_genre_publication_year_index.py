@@ -0,0 +1,34 @@
+"""Index for the book listings of a genre sorted by publication year
+
+Serves ?genre=...&sort=publication_year (or -publication_year), with or
+without publication year filters, in the (publication_year, created_at, id)
+keyset order. Partial like ix_books_publication_year_created_at_id: sorted
+listings leave out the books without a publication year.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-07-08 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_books_genre_publication_year_created_at_id", "books", ["genre", "publication_year", "created_at", "id"],
+        sqlite_where=sa.text("publication_year IS NOT NULL"),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_books_genre_publication_year_created_at_id", table_name="books", if_exists=True)
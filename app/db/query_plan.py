@@ -0,0 +1,109 @@
+from datetime import date, datetime
+from typing import Dict, List
+from uuid import UUID
+from sqlalchemy import exists, func, literal_column
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import select
+from app.core.logging import get_logger
+from app.core.pagination import encode_cursor
+
+logger = get_logger(__name__)
+
+
+def get_hot_queries() -> Dict:
+    """
+    Statements mirroring the most frequent service queries, keyed by name
+
+    Listings are checked with a cursor, which is the path taken when clients
+    walk deep pages.
+    """
+    from app.models import Author, Book, Loan, User
+    from app.services import author_service, book_service, loan_service, user_service
+
+    cursor = encode_cursor([datetime(2000, 1, 1), UUID(int=0)])
+    some_id = UUID(int=0)
+    today = date.today()
+
+    return {
+        "authors.list": author_service.paginate(select(Author), cursor=cursor),
+        "users.list": user_service.paginate(select(User), cursor=cursor),
+        "books.list": book_service.paginate(select(Book), cursor=cursor),
+        "loans.list": loan_service.paginate(select(Loan), cursor=cursor),
+        "books.available": book_service.paginate(
+            select(Book).where(Book.available_copies > literal_column("0")), cursor=cursor
+        ),
+        "books.by_author": book_service.paginate(
+            select(Book).where(Book.author_id == some_id), cursor=cursor
+        ),
+        "books.by_genre": book_service.paginate(
+            select(Book).where(Book.genre == "Fantasy"), cursor=cursor
+        ),
+        "books.by_publication_year": book_service.paginate(
+            select(Book), cursor=encode_cursor([2000, datetime(2000, 1, 1), UUID(int=0)]), sort="-publication_year"
+        ),
+        "books.by_genre_publication_year": book_service.paginate(
+            select(Book).where(Book.genre == "Fantasy"), cursor=encode_cursor([2000, datetime(2000, 1, 1), UUID(int=0)]), sort="-publication_year"
+        ),
+        "books.availability_summary": select(
+            Book.genre, func.count(), func.sum(Book.available_copies)
+        ).group_by(Book.genre),
+        "loans.overdue": loan_service.paginate(
+            select(Loan).where((Loan.due_date < today) & (Loan.is_returned == False)), cursor=cursor
+        ),
+        "loans.statistics_window": select(func.count(Loan.id)).where(Loan.loan_date >= today),
+        "loans.by_user": select(Loan).where(Loan.user_id == some_id),
+        "loans.by_book": select(Loan).where(Loan.book_id == some_id),
+        "users.with_active_loans": user_service.paginate(
+            select(User).where(exists().where(Loan.user_id == User.id, Loan.is_returned == False)),
+            cursor=cursor
+        ),
+    }
+
+
+def is_full_scan(detail: str) -> bool:
+    """
+    A plan step reads a whole table, or sorts every matching row
+    """
+    if detail.startswith("SCAN ") and "INDEX" not in detail:
+        return True
+    return detail.startswith("USE TEMP B-TREE FOR ORDER BY")
+
+
+def explain(connection: Connection, statement) -> List[str]:
+    """
+    Return the EXPLAIN QUERY PLAN steps of a statement
+
+    Parameter values do not change the plan, so every parameter is bound to NULL
+    (IN lists keep their number of values).
+    """
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(None for _ in (compiled.positiontup or ()))
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    return [row[-1] for row in rows]
+
+
+def find_full_scans(engine: Engine) -> Dict[str, List[str]]:
+    """
+    Return the hot queries whose plan falls back to a full scan, with their plans
+    """
+    if engine.dialect.name != "sqlite":
+        return {}
+
+    full_scans = {}
+    with engine.connect() as connection:
+        for name, statement in get_hot_queries().items():
+            plan = explain(connection, statement)
+            if any(is_full_scan(detail) for detail in plan):
+                full_scans[name] = plan
+    return full_scans
+
+
+def report_full_scans(engine: Engine) -> None:
+    """
+    Log which hot queries are not served by an index
+    """
+    full_scans = find_full_scans(engine)
+    for name, plan in full_scans.items():
+        logger.warning("Hot query '%s' falls back to a full scan: %s", name, ' | '.join(plan))
+    if not full_scans:
+        logger.info("All hot queries are served by indexes")
@@ -0,0 +1,84 @@
+import asyncio
+import random
+import time
+from functools import wraps
+from typing import Callable, TypeVar
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+# Messages of the SQLite errors raised when another connection holds the lock
+LOCK_ERRORS = ("database is locked", "database table is locked", "database schema is locked")
+
+# Key in Session.info marking a session whose write is already being retried
+RETRY_MARKER = "retry_on_lock"
+
+
+def is_lock_error(error: Exception) -> bool:
+    """
+    Tell whether a database error was caused by a lock held by another writer
+    """
+    return isinstance(error, OperationalError) and any(
+        message in str(error.orig) for message in LOCK_ERRORS
+    )
+
+
+def lock_backoff(attempt: int) -> float:
+    """
+    Seconds to wait before retry number `attempt` (exponential, with jitter)
+    """
+    delay = settings.DB_LOCK_RETRY_BACKOFF * (2 ** attempt)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def _sleep(seconds: float) -> None:
+    # Inside AsyncSession.run_sync the service runs on the event loop, so
+    # yield to it instead of blocking every other request
+    if in_greenlet():
+        await_only(asyncio.sleep(seconds))
+    else:
+        time.sleep(seconds)
+
+
+def retry_on_lock(func: F) -> F:
+    """
+    Retry a service write when SQLite reports the database as locked
+
+    The busy timeout already waits for the lock, but SQLite gives up at once
+    when waiting could deadlock (two readers upgrading to writers), and the
+    timeout can expire under heavy write load. The transaction is rolled back
+    and the whole method runs again, up to settings.DB_LOCK_RETRIES times.
+    Nested calls (e.g. a service calling super().create) retry only once, at
+    the outermost level.
+    """
+    @wraps(func)
+    def wrapper(self, db, *args, **kwargs):
+        if db.info.get(RETRY_MARKER):
+            return func(self, db, *args, **kwargs)
+
+        db.info[RETRY_MARKER] = True
+        try:
+            attempt = 0
+            while True:
+                try:
+                    return func(self, db, *args, **kwargs)
+                except OperationalError as e:
+                    if not is_lock_error(e) or attempt >= settings.DB_LOCK_RETRIES:
+                        raise
+                    db.rollback()
+                    delay = lock_backoff(attempt)
+                    attempt += 1
+                    logger.warning(
+                        "%s: database is locked, retry %s/%s in %.3fs",
+                        func.__qualname__, attempt, settings.DB_LOCK_RETRIES, delay
+                    )
+                    _sleep(delay)
+        finally:
+            db.info.pop(RETRY_MARKER, None)
+
+    return wrapper
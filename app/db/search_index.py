@@ -0,0 +1,74 @@
+import argparse
+import re
+from typing import Optional
+from sqlalchemy import Float, Integer, column, func, literal_column, table
+from sqlalchemy.engine import Engine
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# FTS5 table kept in sync with the books by triggers (migration 0003)
+books_fts = table(
+    "books_fts",
+    column("rowid", Integer),
+    column("title"),
+    column("description"),
+    column("author_name"),
+)
+
+# bm25 weights of the title, description and author name columns
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+
+# Terms of a search: words, optionally followed by * for a prefix query
+_TERM = re.compile(r"(\w+)(\*?)")
+
+
+def search_rank():
+    """
+    bm25 rank of a match, lower is better (computed in the query matching books_fts)
+    """
+    return func.bm25(literal_column(books_fts.name), *SEARCH_WEIGHTS, type_=Float)
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """
+    Turn a user search into an FTS5 query matching books that contain every term
+
+    Each word is quoted, so characters with a meaning in the FTS5 syntax
+    (quotes, -, :, parentheses...) cannot make the query invalid; `term*`
+    keeps matching every word starting with `term`. Returns None when there
+    is no word to search for.
+    """
+    terms = [f'"{word}"{star}' for word, star in _TERM.findall(q)]
+    return " ".join(terms) if terms else None
+
+
+def rebuild_search_index(engine: Engine) -> int:
+    """
+    Re-create the full-text index of the books from the books and authors
+    tables, and merge it into a single segment; returns the number of books
+
+    Needed after writing to the tables with the triggers disabled, or after a
+    VACUUM, which may renumber the rowids the index refers to.
+    """
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DELETE FROM books_fts")
+        connection.exec_driver_sql(
+            "INSERT INTO books_fts (rowid, title, description, author_name) "
+            "SELECT books.rowid, books.title, books.description, authors.name "
+            "FROM books LEFT JOIN authors ON authors.id = books.author_id"
+        )
+        connection.exec_driver_sql("INSERT INTO books_fts (books_fts) VALUES ('optimize')")
+        count = connection.exec_driver_sql("SELECT count(*) FROM books_fts").scalar()
+    logger.info("Search index rebuilt with %s books", count)
+    return count
+
+
+if __name__ == "__main__":
+    from app.db.session import engine, init_db
+
+    parser = argparse.ArgumentParser(description="Rebuild the full-text search index of the books")
+    parser.parse_args()
+
+    init_db()
+    print(f"Indexed {rebuild_search_index(engine)} books")
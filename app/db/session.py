@@ -1,13 +1,89 @@
+from typing import Any, Dict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlmodel import Session, SQLModel, create_engine
 from app.core.config import settings
+from app.core.metrics import install_pool_metrics
+from app.db.instrumentation import install_query_instrumentation
+from app.db.sql_logging import install_sql_logging
 import os
 
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def is_memory_database(url: str) -> bool:
+    """
+    Tell whether the URL points at an in-memory SQLite database
+    """
+    return is_sqlite(url) and (url.rstrip("/").endswith(":") or ":memory:" in url or "mode=memory" in url)
+
+def get_engine_options(url: str) -> Dict[str, Any]:
+    """
+    Build the engine keyword arguments for a database URL from the settings
+    """
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+    # In-memory databases live in a single connection, so there is no pool to size
+    if not is_memory_database(url):
+        options["pool_size"] = settings.DB_POOL_SIZE
+        options["max_overflow"] = settings.DB_MAX_OVERFLOW
+    return options
+
+def get_sqlite_pragmas() -> Dict[str, Any]:
+    """
+    Pragmas applied to every new SQLite connection, from the settings
+    """
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT,
+    }
+    return {name: value for name, value in pragmas.items() if value not in (None, "")}
+
+def install_sqlite_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    """
+    Apply the given pragmas whenever the engine opens a new connection
+    """
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
 # Create the database engine
-engine = create_engine(
-    settings.DATABASE_URL, 
-    echo=settings.ENVIRONMENT == "development",
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
+engine = create_engine(settings.DATABASE_URL, **get_engine_options(settings.DATABASE_URL))
+if is_sqlite(settings.DATABASE_URL):
+    install_sqlite_pragmas(engine, get_sqlite_pragmas())
+install_sql_logging(engine)
+install_query_instrumentation(engine)
+install_pool_metrics(engine, "sync")
+
+def get_async_database_url(url: str) -> str:
+    """
+    Map a sync database URL to its asyncio driver (e.g. sqlite -> sqlite+aiosqlite)
+    """
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return url
+
+# Create the asyncio database engine only when the async path is enabled,
+# so the sync deployment does not need the asyncio driver installed
+async_engine = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine
+    
+    async_database_url = settings.ASYNC_DATABASE_URL or get_async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(async_database_url, **get_engine_options(async_database_url))
+    if is_sqlite(async_database_url):
+        install_sqlite_pragmas(async_engine.sync_engine, get_sqlite_pragmas())
+    install_sql_logging(async_engine.sync_engine)
+    install_query_instrumentation(async_engine.sync_engine)
+    install_pool_metrics(async_engine.sync_engine, "async")
 
 def get_session():
     """
@@ -16,12 +92,31 @@ def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    """
+    Dependency for getting a SQLModel asyncio session
+    """
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    
+    # Objects are used after commit (e.g. in the response), and reloading
+    # expired attributes is not possible outside of the session's greenlet
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
 def init_db():
     """
-    Initialize database tables
+    Initialize database tables by applying the Alembic migrations
     """
     # Import all models here to ensure they are registered with SQLModel
     from app.models import Author, Book, Loan, User
+    from app.db.migrate import run_migrations
     
-    # Create tables in database
-    SQLModel.metadata.create_all(engine) 
\ No newline at end of file
+    # Create or upgrade the tables and indexes in the database
+    run_migrations(engine)
+
+async def close_db():
+    """
+    Release the pooled connections of the asyncio engine
+    """
+    if async_engine is not None:
+        await async_engine.dispose()
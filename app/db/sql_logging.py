@@ -0,0 +1,59 @@
+import logging
+import random
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger("app.db.sql")
+
+# Longest parameter representation written to the log
+MAX_PARAMETERS_LENGTH = 200
+
+
+def sql_logging_enabled() -> bool:
+    return settings.SQL_LOG_STATEMENTS and (settings.SQL_LOG_SAMPLE_RATE > 0 or settings.SQL_LOG_SLOW_MS is not None)
+
+
+def install_sql_logging(engine: Engine) -> None:
+    """
+    Log the SQL statements run by the engine, as configured in the settings
+
+    A statement is logged when it is picked by sampling (SQL_LOG_SAMPLE_RATE).
+    When SQL_LOG_SLOW_MS is set, the statements taking at least that long are
+    logged instead, all of them (sampling would drop most), as warnings.
+
+    Nothing is registered when statement logging is disabled, so the engine
+    runs without any logging overhead.
+    """
+    if not sql_logging_enabled():
+        return
+
+    # Enabling SQL logging means the statements are wanted, whatever the
+    # level of the environment (e.g. WARNING in production)
+    logger.setLevel(logging.INFO)
+    sample_rate = settings.SQL_LOG_SAMPLE_RATE
+    slow_ms = settings.SQL_LOG_SLOW_MS
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        # Every statement is timed when looking for the slow ones
+        sampled = slow_ms is not None or sample_rate >= 1 or random.random() < sample_rate
+        context._sql_log_start = time.perf_counter() if sampled else None
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def log_statement(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_sql_log_start", None)
+        if start is None:
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if slow_ms is not None and elapsed_ms < slow_ms:
+            return
+
+        params = repr(parameters)
+        if len(params) > MAX_PARAMETERS_LENGTH:
+            params = params[:MAX_PARAMETERS_LENGTH] + "..."
+        level = logging.WARNING if slow_ms is not None else logging.INFO
+        logger.log(level, "SQL %.1f ms%s | %s | %s",
+                   elapsed_ms, " (executemany)" if executemany else "", " ".join(statement.split()), params)
@@ -1,14 +1,22 @@
 from fastapi import FastAPI, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
+import asyncio
 import time
 import uuid
+from sqlmodel import Session
 from app.core.config import settings
-from app.db.session import init_db
+from app.db.session import engine, init_db, close_db
+from app.db.query_plan import report_full_scans
 from app.api.v1 import v1_router
 from app.core.logging import get_logger
 from app.core.errors import http_exception_handler, validation_exception_handler, not_found_handler
-from app.core.middleware import CorrelationIdMiddleware, TimingMiddleware
+from app.core.middleware import PROCESS_TIME_HEADER, RequestContextMiddleware
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, publish_snapshots, registry as metrics_registry
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.responses import DefaultResponse
+from app.db.instrumentation import DB_QUERIES_HEADER, DB_TIME_HEADER
+from app.services.suggest_index import suggest_index
 
 # Configure logger
 logger = get_logger(__name__)
@@ -17,7 +25,8 @@ logger = get_logger(__name__)
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.API_VERSION,
-    description="FastAPI application for library management"
+    description="FastAPI application for library management",
+    default_response_class=DefaultResponse
 )
 
 # Register exception handlers
@@ -33,13 +42,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, DB_QUERIES_HEADER, DB_TIME_HEADER, PROCESS_TIME_HEADER, "X-Correlation-ID", "ETag"],
 )
 
-# Add correlation ID middleware
-app.add_middleware(CorrelationIdMiddleware)
-
-# Add timing middleware
-app.add_middleware(TimingMiddleware)
+# Add request context middleware (correlation ID, timing, metrics and request logging)
+app.add_middleware(RequestContextMiddleware)
 
 # Health check endpoint
 @app.get("/health", tags=["Health"])
@@ -59,21 +66,46 @@ def version():
     logger.debug("Version endpoint called")
     return {"version": settings.API_VERSION}
 
+# Metrics endpoint
+@app.get("/metrics", tags=["Health"])
+async def metrics():
+    """
+    Request, database pool and threadpool metrics in the Prometheus text format
+    """
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 # Include API routers with versioning
 app.include_router(v1_router, prefix="/api/v1")
 
 # Initialize database on startup
 @app.on_event("startup")
 def on_startup():
-    logger.info(f"Starting application in {settings.ENVIRONMENT} mode")
+    logger.info("Starting application in %s mode", settings.ENVIRONMENT)
     logger.info("Initializing database")
     init_db()
+    if settings.QUERY_PLAN_CHECK:
+        report_full_scans(engine)
+    if settings.SUGGEST_INDEX:
+        logger.info("Building suggest index")
+        with Session(engine) as db:
+            suggest_index.build(db)
     logger.info("Application startup complete")
 
+# Publish the metrics of this worker for the others
+@app.on_event("startup")
+async def start_metrics_publisher():
+    if metrics_registry.multiprocess_dir is not None:
+        app.state.metrics_publisher = asyncio.create_task(publish_snapshots())
+
 # Shutdown event handler
 @app.on_event("shutdown")
-def on_shutdown():
+async def on_shutdown():
     logger.info("Application shutting down")
+    publisher = getattr(app.state, "metrics_publisher", None)
+    if publisher is not None:
+        publisher.cancel()
+        metrics_registry.remove_snapshot()
+    await close_db()
 
 # Import and include API routes
 # We'll add these in later commits
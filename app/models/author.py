@@ -1,9 +1,14 @@
 from typing import List, Optional
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship
 from app.models.base import BaseModel
 
 class Author(BaseModel, table=True):
     __tablename__ = "authors"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_authors_created_at_id", "created_at", "id"),
+    )
     
     name: str = Field(index=True)
     biography: Optional[str] = Field(default=None)
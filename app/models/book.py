@@ -1,4 +1,5 @@
 from typing import List, Optional, TYPE_CHECKING
+from sqlalchemy import Index, text
 from sqlmodel import Field, Relationship, SQLModel
 from uuid import UUID
 from app.models.base import BaseModel
@@ -9,6 +10,27 @@ if TYPE_CHECKING:
 
 class Book(BaseModel, table=True):
     __tablename__ = "books"
+    __table_args__ = (
+        # Keyset pagination order for the plain and filtered listings
+        Index("ix_books_created_at_id", "created_at", "id"),
+        Index("ix_books_genre_created_at_id", "genre", "created_at", "id"),
+        Index("ix_books_author_id_created_at_id", "author_id", "created_at", "id"),
+        Index(
+            "ix_books_available_created_at_id", "created_at", "id",
+            sqlite_where=text("available_copies > 0")
+        ),
+        # Listings filtered or sorted by publication year (without the books lacking one)
+        Index(
+            "ix_books_publication_year_created_at_id", "publication_year", "created_at", "id",
+            sqlite_where=text("publication_year IS NOT NULL")
+        ),
+        Index(
+            "ix_books_genre_publication_year_created_at_id", "genre", "publication_year", "created_at", "id",
+            sqlite_where=text("publication_year IS NOT NULL")
+        ),
+        # Covering index for the per-genre availability summary
+        Index("ix_books_genre_available_copies", "genre", "available_copies"),
+    )
     
     title: str = Field(index=True)
     isbn: str = Field(unique=True, index=True)
@@ -1,5 +1,6 @@
 from datetime import date, datetime
 from typing import Optional, TYPE_CHECKING
+from sqlalchemy import Index, text
 from sqlmodel import Field, Relationship
 from uuid import UUID
 from app.models.base import BaseModel
@@ -10,6 +11,28 @@ if TYPE_CHECKING:
 
 class Loan(BaseModel, table=True):
     __tablename__ = "loans"
+    __table_args__ = (
+        # Keyset pagination order for the plain and overdue listings
+        Index("ix_loans_created_at_id", "created_at", "id"),
+        Index(
+            "ix_loans_active_created_at_id", "created_at", "id",
+            sqlite_where=text("is_returned = 0")
+        ),
+        # Date window of the loan statistics
+        Index("ix_loans_loan_date", "loan_date"),
+        # Loan history and activity of a user, loans of a book
+        Index("ix_loans_user_id_is_returned", "user_id", "is_returned"),
+        Index("ix_loans_book_id", "book_id"),
+        # Users with active loans and overdue checks only look at active loans
+        Index(
+            "ix_loans_active_user_id", "user_id",
+            sqlite_where=text("is_returned = 0")
+        ),
+        Index(
+            "ix_loans_active_due_date", "due_date",
+            sqlite_where=text("is_returned = 0")
+        ),
+    )
     
     loan_date: date = Field(default_factory=lambda: date.today())
     return_date: Optional[date] = Field(default=None)
@@ -1,9 +1,14 @@
 from typing import List, Optional
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship
 from app.models.base import BaseModel
 
 class User(BaseModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
     
     username: str = Field(unique=True, index=True)
     email: str = Field(unique=True, index=True)
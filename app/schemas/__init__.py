@@ -1,11 +1,15 @@
-from app.schemas.author import AuthorBase, AuthorCreate, AuthorUpdate, Author, AuthorWithBooks
-from app.schemas.book import BookBase, BookCreate, BookUpdate, Book, BookWithAuthor, BookBrief
-from app.schemas.user import UserBase, UserCreate, UserUpdate, User, UserWithLoans
-from app.schemas.loan import LoanBase, LoanCreate, LoanUpdate, Loan, LoanDetail, LoanBrief
+from app.schemas.author import AuthorBase, AuthorCreate, AuthorUpdate, Author, AuthorWithBooks, AuthorWithIncludes
+from app.schemas.book import BookBase, BookCreate, BookUpdate, Book, BookWithAuthor, BookBrief, BookWithIncludes
+from app.schemas.user import UserBase, UserCreate, UserUpdate, User, UserWithLoans, UserWithIncludes
+from app.schemas.loan import (
+    LoanBase, LoanCreate, LoanUpdate, Loan, LoanDetail, LoanBrief, LoanWithIncludes,
+    LoanBulkCreate, LoanBulkReturn, LoanBulkItemResult, LoanBulkResult
+)
 
 __all__ = [
-    "AuthorBase", "AuthorCreate", "AuthorUpdate", "Author", "AuthorWithBooks",
-    "BookBase", "BookCreate", "BookUpdate", "Book", "BookWithAuthor", "BookBrief",
-    "UserBase", "UserCreate", "UserUpdate", "User", "UserWithLoans",
-    "LoanBase", "LoanCreate", "LoanUpdate", "Loan", "LoanDetail", "LoanBrief"
+    "AuthorBase", "AuthorCreate", "AuthorUpdate", "Author", "AuthorWithBooks", "AuthorWithIncludes",
+    "BookBase", "BookCreate", "BookUpdate", "Book", "BookWithAuthor", "BookBrief", "BookWithIncludes",
+    "UserBase", "UserCreate", "UserUpdate", "User", "UserWithLoans", "UserWithIncludes",
+    "LoanBase", "LoanCreate", "LoanUpdate", "Loan", "LoanDetail", "LoanBrief", "LoanWithIncludes",
+    "LoanBulkCreate", "LoanBulkReturn", "LoanBulkItemResult", "LoanBulkResult"
 ] 
\ No newline at end of file
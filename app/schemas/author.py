@@ -2,6 +2,7 @@ from typing import List, Optional
 from uuid import UUID
 from pydantic import BaseModel, Field
 from datetime import datetime
+from app.schemas.includes import LoadedAttributesModel
 
 # Base schema with common attributes
 class AuthorBase(BaseModel):
@@ -32,6 +33,11 @@ class Author(AuthorBase):
 class AuthorWithBooks(Author):
     books: List["BookBrief"] = []
 
+# Schema for author listings, with the relationships requested through ?include=
+class AuthorWithIncludes(Author, LoadedAttributesModel):
+    books: Optional[List["BookBrief"]] = None
+
 # Import this at the end to avoid circular imports
 from app.schemas.book import BookBrief
-AuthorWithBooks.model_rebuild() 
\ No newline at end of file
+AuthorWithBooks.model_rebuild()
+AuthorWithIncludes.model_rebuild() 
\ No newline at end of file
@@ -2,6 +2,7 @@ from typing import List, Optional
 from uuid import UUID
 from pydantic import BaseModel, Field
 from datetime import datetime
+from app.schemas.includes import LoadedAttributesModel
 
 # Base schema with common attributes
 class BookBase(BaseModel):
@@ -50,6 +51,10 @@ class Book(BookBase):
 class BookWithAuthor(Book):
     author: "AuthorBrief"
 
+# Schema for book listings, with the relationships requested through ?include=
+class BookWithIncludes(Book, LoadedAttributesModel):
+    author: Optional["AuthorBrief"] = None
+
 # Brief author schema (used in BookWithAuthor to avoid circular references)
 class AuthorBrief(BaseModel):
     id: UUID
@@ -60,4 +65,5 @@ class AuthorBrief(BaseModel):
 
 # Import at the end to avoid circular imports
 from app.schemas.author import Author as AuthorSchema
-BookWithAuthor.model_rebuild() 
\ No newline at end of file
+BookWithAuthor.model_rebuild()
+BookWithIncludes.model_rebuild() 
\ No newline at end of file
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, model_validator
+from sqlalchemy import inspect
+from sqlalchemy.exc import NoInspectionAvailable
+
+
+class LoadedAttributesModel(BaseModel):
+    """
+    Response schema that only reads the attributes already loaded on an ORM object
+
+    Relationships that were not eager loaded are left unset instead of being
+    lazy loaded (one query per row, and impossible with an async session).
+    Routes using it set `response_model_exclude_unset=True`, so relationships
+    only appear in the response when requested through ?include=.
+    """
+    @model_validator(mode="before")
+    @classmethod
+    def read_loaded_attributes(cls, data):
+        try:
+            state = inspect(data)
+        except NoInspectionAvailable:
+            return data
+        unloaded = state.unloaded
+        return {
+            name: getattr(data, name)
+            for name in cls.model_fields
+            if name not in unloaded and hasattr(data, name)
+        }
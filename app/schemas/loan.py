@@ -1,7 +1,11 @@
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date, datetime
+from app.schemas.includes import LoadedAttributesModel
+
+# Maximum number of items accepted by the bulk endpoints
+BULK_MAX_ITEMS = 5000
 
 # Base schema with common attributes
 class LoanBase(BaseModel):
@@ -51,6 +55,32 @@ class LoanDetail(Loan):
     book: "BookBrief"
     user: "UserBrief"
 
+# Schema for loan listings, with the relationships requested through ?include=
+class LoanWithIncludes(Loan, LoadedAttributesModel):
+    book: Optional["BookBrief"] = None
+    user: Optional["UserBrief"] = None
+
+# Schema for creating many loans in one request
+class LoanBulkCreate(BaseModel):
+    items: List[LoanCreate] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+# Schema for returning many loans in one request
+class LoanBulkReturn(BaseModel):
+    loan_ids: List[UUID] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+# Outcome of a single item of a bulk operation
+class LoanBulkItemResult(BaseModel):
+    index: int
+    status: int
+    loan: Optional[Loan] = None
+    error: Optional[str] = None
+
+# Schema for bulk operation response with per-item results
+class LoanBulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[LoanBulkItemResult]
+
 # Brief book schema (used in LoanDetail to avoid circular references)
 class BookBrief(BaseModel):
     id: UUID
@@ -72,4 +102,5 @@ class UserBrief(BaseModel):
 # Import at the end to avoid circular imports
 from app.schemas.book import BookBrief as BookSchema
 from app.schemas.user import User as UserSchema
-LoanDetail.model_rebuild() 
\ No newline at end of file
+LoanDetail.model_rebuild()
+LoanWithIncludes.model_rebuild() 
\ No newline at end of file
@@ -0,0 +1,9 @@
+from uuid import UUID
+from pydantic import BaseModel
+
+# Schema for a typeahead suggestion (a book title or an author name)
+class Suggestion(BaseModel):
+    type: str
+    id: UUID
+    text: str
+    loan_count: int
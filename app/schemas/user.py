@@ -2,6 +2,7 @@ from typing import List, Optional
 from uuid import UUID
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+from app.schemas.includes import LoadedAttributesModel
 
 # Base schema with common attributes
 class UserBase(BaseModel):
@@ -34,6 +35,11 @@ class User(UserBase):
 class UserWithLoans(User):
     loans: List["LoanBrief"] = []
 
+# Schema for user listings, with the relationships requested through ?include=
+class UserWithIncludes(User, LoadedAttributesModel):
+    loans: Optional[List["LoanBrief"]] = None
+
 # Import at the end to avoid circular imports
 from app.schemas.loan import LoanBrief
-UserWithLoans.model_rebuild() 
\ No newline at end of file
+UserWithLoans.model_rebuild()
+UserWithIncludes.model_rebuild() 
\ No newline at end of file
@@ -1,6 +1,11 @@
-from app.services.author_service import author_service
-from app.services.book_service import book_service
-from app.services.user_service import user_service
-from app.services.loan_service import loan_service
+from app.services.author_service import author_service, async_author_service
+from app.services.book_service import book_service, async_book_service
+from app.services.user_service import user_service, async_user_service
+from app.services.loan_service import loan_service, async_loan_service
+from app.services.import_service import import_service, async_import_service
 
-__all__ = ["author_service", "book_service", "user_service", "loan_service"] 
\ No newline at end of file
+__all__ = [
+    "author_service", "book_service", "user_service", "loan_service", "import_service",
+    "async_author_service", "async_book_service", "async_user_service", "async_loan_service",
+    "async_import_service"
+] 
\ No newline at end of file
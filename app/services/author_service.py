@@ -1,108 +1,200 @@
-from typing import List, Optional
+from typing import List, Optional, Sequence, Tuple
 from uuid import UUID
+from sqlalchemy import func
 from sqlmodel import Session, select
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from app.db.retry import retry_on_lock
 from app.models.author import Author
 from app.models.book import Book
 from app.schemas.author import AuthorCreate, AuthorUpdate
-from app.services.base_service import BaseService
+from app.services.base_service import AsyncBaseService, BaseService
+from app.services.result_cache import cached_result
+from app.services.suggest_index import suggest_index
 from app.core.logging import get_logger
 
 class AuthorService(BaseService[Author, AuthorCreate, AuthorUpdate]):
     """
     Service for Author operations with custom business logic
     """
+    includable = ("books",)
+    
     def __init__(self):
         super().__init__(Author)
         self.logger = get_logger(__name__)
     
+    @retry_on_lock
+    def create(self, db: Session, *, obj_in: AuthorCreate) -> Author:
+        author = super().create(db, obj_in=obj_in)
+        suggest_index.put_author(author)
+        return author
+    
+    @retry_on_lock
+    def update(self, db: Session, *, db_obj: Author, obj_in: AuthorUpdate) -> Author:
+        author = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        suggest_index.put_author(author)
+        return author
+    
     # Business transformation - Get author with book stats (count and average publication year)
+    @cached_result("authors", "books")
     def get_author_with_book_stats(self, db: Session, author_id: UUID):
         """
         Get an author with additional statistics about their books.
         This is a business transformation that adds computed fields not present in the database.
         """
-        self.logger.info(f"Getting author stats for author_id: {author_id}")
+        self.logger.info("Getting author stats for author_id: %s", author_id)
         author = self.get_by_id(db, author_id)
+        stats = self.get_book_stats(db, [author])[0]
         
-        # Get all books by this author
-        statement = select(Book).where(Book.author_id == author_id)
-        books = db.exec(statement).all()
-        
-        # Calculate statistics
-        book_count = len(books)
-        pub_years = [book.publication_year for book in books if book.publication_year]
-        avg_pub_year = sum(pub_years) / len(pub_years) if pub_years else None
-        
-        self.logger.debug(f"Author {author_id} has {book_count} books with average publication year: {avg_pub_year}")
+        self.logger.debug(
+            "Author %s has %s books with average publication year: %s",
+            author_id, stats["book_count"], stats["average_publication_year"]
+        )
         
         # Convert author to dict and add the stats
         author_dict = author.model_dump()
-        author_dict["book_count"] = book_count
-        author_dict["average_publication_year"] = avg_pub_year
+        author_dict["book_count"] = stats["book_count"]
+        author_dict["average_publication_year"] = stats["average_publication_year"]
         
         return author_dict
     
+    # Business transformation - Book statistics of many authors at once
+    def get_book_stats(self, db: Session, authors: Sequence[Author]) -> List[dict]:
+        """
+        Book statistics of each author: count, average, first and last
+        publication year, and genres
+        
+        A single GROUP BY over the books of all the authors computes them; the
+        rows are per (author, genre), so the genres come out of the grouping too.
+        """
+        stats = {
+            author.id: {
+                "author_id": author.id,
+                "author_name": author.name,
+                "book_count": 0,
+                "average_publication_year": None,
+                "first_publication_year": None,
+                "last_publication_year": None,
+                "genres": [],
+            }
+            for author in authors
+        }
+        if not stats:
+            return []
+        
+        statement = select(
+            Book.author_id,
+            Book.genre,
+            func.count(),
+            func.count(Book.publication_year),
+            func.sum(Book.publication_year),
+            func.min(Book.publication_year),
+            func.max(Book.publication_year)
+        ).where(Book.author_id.in_(stats.keys())).group_by(Book.author_id, Book.genre)
+        
+        year_totals = {}
+        for author_id, genre, books, dated_books, year_sum, first_year, last_year in db.exec(statement):
+            author_stats = stats[author_id]
+            author_stats["book_count"] += books
+            if genre:
+                author_stats["genres"].append(genre)
+            if dated_books:
+                count, total = year_totals.get(author_id, (0, 0))
+                year_totals[author_id] = (count + dated_books, total + year_sum)
+                if author_stats["first_publication_year"] is None or first_year < author_stats["first_publication_year"]:
+                    author_stats["first_publication_year"] = first_year
+                if author_stats["last_publication_year"] is None or last_year > author_stats["last_publication_year"]:
+                    author_stats["last_publication_year"] = last_year
+        
+        for author_id, (count, total) in year_totals.items():
+            stats[author_id]["average_publication_year"] = total / count
+        for author_stats in stats.values():
+            author_stats["genres"].sort()
+        return list(stats.values())
+    
+    def get_authors_stats(
+        self,
+        db: Session,
+        ids: Optional[Sequence[UUID]] = None,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Author], List[dict]]:
+        """
+        Book statistics of the authors with the given ids (in that order,
+        unknown ids are left out), or of a page of all the authors
+        
+        Returns the authors too, for the pagination cursor.
+        """
+        if ids is not None:
+            ids = list(dict.fromkeys(ids))
+            self.logger.info("Getting book stats for %s authors", len(ids))
+            found = {author.id: author for author in db.exec(select(Author).where(Author.id.in_(ids)))} if ids else {}
+            authors = [found[id] for id in ids if id in found]
+        else:
+            self.logger.info("Getting book stats for all authors (skip=%s, limit=%s, cursor=%s)", skip, limit, cursor)
+            authors = db.exec(self.paginate(select(Author), skip=skip, limit=limit, cursor=cursor)).all()
+        return authors, self.get_book_stats(db, authors)
+    
     # Get author with all their books
     def get_author_with_books(self, db: Session, author_id: UUID):
         """
         Get an author with all their books
         """
-        self.logger.info(f"Getting author with books for author_id: {author_id}")
-        author = self.get_by_id(db, author_id)
+        self.logger.info("Getting author with books for author_id: %s", author_id)
+        author = self.get_by_id(db, author_id, options=[selectinload(Author.books)])
         book_count = len(author.books) if hasattr(author, "books") else 0
-        self.logger.debug(f"Author {author_id} has {book_count} books")
+        self.logger.debug("Author %s has %s books", author_id, book_count)
         return author
 
     def get_with_books(self, db: Session, id: UUID):
-        self.logger.info(f"Getting author with books for id: {id}")
+        self.logger.info("Getting author with books for id: %s", id)
         author = db.query(Author).filter(Author.id == id).first()
         if author:
-            self.logger.debug(f"Found author {id}")
+            self.logger.debug("Found author %s", id)
         else:
-            self.logger.warning(f"Author with id {id} not found")
+            self.logger.warning("Author with id %s not found", id)
         return author
     
+    @retry_on_lock
     def delete(self, db: Session, id: UUID):
         # Check if author has books
-        self.logger.info(f"Attempting to delete author with id: {id}")
+        self.logger.info("Attempting to delete author with id: %s", id)
         books_count = db.query(Book).filter(Book.author_id == id).count()
         
         if books_count > 0:
-            self.logger.warning(f"Cannot delete author {id}: Has {books_count} associated books")
+            self.logger.warning("Cannot delete author %s: Has %s associated books", id, books_count)
             raise HTTPException(
                 status_code=400,
                 detail=f"Cannot delete author with ID {id} because they have {books_count} books associated. Delete the books first or reassign them to another author."
             )
         
-        self.logger.info(f"Author {id} has no books, proceeding with deletion")
-        return super().delete(db, id=id)
+        self.logger.info("Author %s has no books, proceeding with deletion", id)
+        author = super().delete(db, id=id)
+        suggest_index.remove(id)
+        return author
     
     def get_author_stats(self, db: Session, id: UUID):
-        self.logger.info(f"Generating statistics for author with id: {id}")
-        author = db.query(Author).filter(Author.id == id).first()
-        if not author:
-            self.logger.warning(f"Author with id {id} not found")
-            raise HTTPException(status_code=404, detail="Author not found")
-        
-        books = db.query(Book).filter(Book.author_id == id).all()
+        self.logger.info("Generating statistics for author with id: %s", id)
+        author = self.get_by_id(db, id)
+        stats = self.get_book_stats(db, [author])[0]
         
-        total_books = len(books)
-        genres = set([book.genre for book in books if book.genre])
-        oldest_book = min(books, key=lambda x: x.publication_year).publication_year if books and any(b.publication_year for b in books) else None
-        newest_book = max(books, key=lambda x: x.publication_year).publication_year if books and any(b.publication_year for b in books) else None
+        total_books = stats["book_count"]
+        oldest_book = stats["first_publication_year"]
+        newest_book = stats["last_publication_year"]
         
-        self.logger.debug(f"Author {id} stats: {total_books} books, {len(genres)} genres, year range: {oldest_book}-{newest_book}")
+        self.logger.debug("Author %s stats: %s books, %s genres, year range: %s-%s", id, total_books, len(stats["genres"]), oldest_book, newest_book)
         
         return {
             "author_id": author.id,
             "author_name": author.name,
             "total_books": total_books,
-            "genres": list(genres),
+            "genres": stats["genres"],
             "publication_year_range": [oldest_book, newest_book] if oldest_book else None,
             "average_books_per_year": total_books / (newest_book - oldest_book + 1) if oldest_book and newest_book and oldest_book != newest_book else total_books
         }
 
 # Create a singleton instance
-author_service = AuthorService() 
\ No newline at end of file
+author_service = AuthorService()
+async_author_service = AsyncBaseService(author_service)
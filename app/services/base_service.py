@@ -1,10 +1,24 @@
-from typing import Generic, List, Optional, Type, TypeVar
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 from uuid import UUID
 from datetime import datetime
+from functools import wraps
+from types import MethodType
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.orm import make_transient_to_detached, selectinload
 from sqlmodel import Session, SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
+from app.db.query_plan import explain, is_full_scan
+from app.db.retry import retry_on_lock
 from app.models.base import BaseModel
+from app.core.cache import MISSING, CacheBackend, entity_cache, table_versions
+from app.core.config import settings
+from app.core.filtering import Filter, build_filters, parse_sort
 from app.core.logging import get_logger
+from app.core.metrics import entity_cache_hits_total, entity_cache_misses_total
+from app.core.pagination import decode_cursor
 
 # Define generic types for models
 ModelType = TypeVar("ModelType", bound=BaseModel)
@@ -15,54 +29,264 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
     Base class for services with common CRUD operations
     """
+    # Relationships that listings can load on request through ?include=
+    includable: Tuple[str, ...] = ()
+    
+    # Fields listings can be filtered on through ?field= and ?field[op]=
+    filterable: Dict[str, Filter] = {}
+    
+    # Fields listings can be sorted on through ?sort= besides created_at. Each
+    # needs an index on (field, created_at, id); rows where it is NULL are
+    # left out of the sorted listings.
+    sortable: Tuple[str, ...] = ()
+    
+    # Cache of the records read by get_by_id (None to always query)
+    cache: Optional[CacheBackend] = entity_cache
+    
     def __init__(self, model: Type[ModelType]):
         self.model = model
         self.logger = get_logger(f"{__name__}.{model.__name__}")
+        # Query plans of the filtered listings, by combination of filters and sort
+        self.plans: Dict[Tuple, List[str]] = {}
+    
+    def paginate(
+        self,
+        statement: SelectOfScalar,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include: Optional[str] = None,
+        sort: Optional[str] = None
+    ) -> SelectOfScalar:
+        """
+        Apply a stable (created_at, id) ordering and pagination to a statement
+
+        When a cursor is given the page starts right after the row it encodes
+        (keyset pagination), so deep pages cost the same as the first one.
+        Otherwise `skip` is applied as an offset for backward compatibility.
+        The relationships named in `include` are eager loaded. `sort` puts a
+        field of `sortable` before the (created_at, id) keys, `-field` (or
+        `-created_at`) sorts them all in descending order.
+        """
+        statement = statement.options(*self.include_options(include))
+        field, descending = parse_sort(sort, self.sortable)
+        keys = tuple(getattr(self.model, name) for name in self.sort_keys(sort))
+        if field:
+            statement = statement.where(getattr(self.model, field).is_not(None))
+        if cursor:
+            bound = tuple_(*decode_cursor(cursor, keys))
+            statement = statement.where(tuple_(*keys) < bound if descending else tuple_(*keys) > bound)
+        elif skip:
+            statement = statement.offset(skip)
+        return statement.order_by(*(key.desc() if descending else key for key in keys)).limit(limit)
+    
+    def sort_keys(self, sort: Optional[str] = None) -> Tuple[str, ...]:
+        """
+        Names of the columns a listing sorted by `sort` is keyed on
+        """
+        field, _ = parse_sort(sort, self.sortable)
+        return (field, "created_at", "id") if field else ("created_at", "id")
     
-    def get_all(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[ModelType]:
+    def filtered(
+        self,
+        db: Session,
+        filters: Sequence[Tuple[str, str]] = (),
+        *,
+        sort: Optional[str] = None,
+        check_plan: bool = True,
+        **page: Any
+    ) -> SelectOfScalar:
         """
-        Get all records with pagination
+        Build a listing with the (name, value) query parameters in `filters`
+        and the `sort` order, as a single statement
+
+        Filters are combined with AND. The first time a combination of
+        filters and sort is seen its query plan is read, and combinations
+        scanning the whole table or sorting every matching row are rejected
+        with a 400 error (SQLite only).
         """
-        self.logger.info(f"Getting all {self.model.__name__} records (skip={skip}, limit={limit})")
-        statement = select(self.model).offset(skip).limit(limit)
+        clauses = build_filters(filters, self.filterable)
+        statement = self.paginate(select(self.model).where(*(clause for _, clause in clauses)), sort=sort, **page)
+        if check_plan and (clauses or sort) and db.get_bind().dialect.name == "sqlite":
+            shape = (tuple(key for key, _ in clauses), sort, bool(page.get("cursor")))
+            plan = self.plans.get(shape)
+            if plan is None:
+                plan = self.plans[shape] = explain(db.connection(), statement)
+            if any(is_full_scan(detail) for detail in plan):
+                self.logger.warning("Rejected %s listing without an index: %s", self.model.__name__, " | ".join(plan))
+                names = ", ".join(dict.fromkeys(name for (name, _), _ in clauses))
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"No index serves {self.model.__tablename__}{f' filtered on {names}' if names else ''} "
+                           f"sorted by {sort or 'created_at'}, the query would read every matching row"
+                )
+        return statement
+    
+    def explain_listing(
+        self,
+        db: Session,
+        filters: Sequence[Tuple[str, str]] = (),
+        *,
+        sort: Optional[str] = None,
+        **page: Any
+    ) -> dict:
+        """
+        The SQL of a filtered listing, its parameters and its query plan,
+        without running it (debug mode, see settings.QUERY_EXPLAIN)
+        """
+        if not settings.QUERY_EXPLAIN:
+            raise HTTPException(status_code=400, detail="Query plans are not available on this server")
+        if db.get_bind().dialect.name != "sqlite":
+            raise HTTPException(status_code=501, detail="Query plans require SQLite")
+        statement = self.filtered(db, filters, sort=sort, check_plan=False, **page)
+        compiled = statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True})
+        plan = explain(db.connection(), statement)
+        return {
+            "sql": str(compiled),
+            "params": [compiled.params[name] for name in compiled.positiontup or ()],
+            "plan": plan,
+            "full_scan": any(is_full_scan(detail) for detail in plan),
+        }
+    
+    def include_options(self, include: Optional[str]) -> List[Any]:
+        """
+        Turn a comma separated ?include= value into eager loading options
+
+        Each relationship costs one extra SELECT ... IN query for the whole
+        page instead of one lazy load per row. Raises a 400 error for names
+        that are not in `includable`.
+        """
+        if not include:
+            return []
+        names = list(dict.fromkeys(name.strip() for name in include.split(",") if name.strip()))
+        unknown = [name for name in names if name not in self.includable]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot include {', '.join(unknown)}, expected one of: {', '.join(self.includable) or 'nothing'}"
+            )
+        return [selectinload(getattr(self.model, name)) for name in names]
+    
+    def get_all(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include: Optional[str] = None,
+        filters: Sequence[Tuple[str, str]] = (),
+        sort: Optional[str] = None
+    ) -> List[ModelType]:
+        """
+        Get all records with pagination, optionally filtered and sorted (see `filtered`)
+        """
+        self.logger.info("Getting all %s records (skip=%s, limit=%s, cursor=%s, filters=%s, sort=%s)", self.model.__name__, skip, limit, cursor, filters, sort)
+        statement = self.filtered(db, filters, sort=sort, skip=skip, limit=limit, cursor=cursor, include=include)
         results = db.exec(statement).all()
-        self.logger.debug(f"Retrieved {len(results)} {self.model.__name__} records")
+        self.logger.debug("Retrieved %s %s records", len(results), self.model.__name__)
         return results
     
-    def get_by_id(self, db: Session, id: UUID) -> Optional[ModelType]:
+    def get_by_id(self, db: Session, id: UUID, options: Sequence[Any] = ()) -> Optional[ModelType]:
         """
         Get a record by ID
+        
+        `options` are loader options (e.g. selectinload) for its relationships.
+        Without options the record is read through the entity cache.
         """
-        self.logger.info(f"Getting {self.model.__name__} by id: {id}")
-        statement = select(self.model).where(self.model.id == id)
-        result = db.exec(statement).first()
+        self.logger.info("Getting %s by id: %s", self.model.__name__, id)
+        if options or self.cache is None:
+            statement = select(self.model).options(*options).where(self.model.id == id)
+            result = db.exec(statement).first()
+        else:
+            result = self._get_cached(db, id)
         if not result:
-            self.logger.warning(f"{self.model.__name__} with id {id} not found")
+            self.logger.warning("%s with id %s not found", self.model.__name__, id)
             raise HTTPException(status_code=404, detail=f"{self.model.__name__} not found")
         return result
     
+    def _get_cached(self, db: Session, id: UUID) -> Optional[ModelType]:
+        """
+        Read a record through the entity cache
+        
+        Cached records are attached to the session as if a query had loaded
+        them, so they can be updated or deleted, and their relationships lazy
+        load as usual. Rows read while a write to the table was committed are
+        not cached, and neither are ids that do not exist: another worker may
+        be about to create them.
+        """
+        # Records already in the session are returned as they are, like Session.get does
+        identity_key = db.identity_key(self.model, id)
+        if identity_key in db.identity_map:
+            return db.identity_map[identity_key]
+        
+        labels = (self.model.__name__,)
+        key = self.cache_key(id)
+        values = self.cache.get(key)
+        if values is not MISSING:
+            entity_cache_hits_total.inc(labels)
+            result = self.model(**values)
+            make_transient_to_detached(result)
+            db.add(result)
+            return result
+        
+        entity_cache_misses_total.inc(labels)
+        # Read the version first: a write committed while querying makes the row stale
+        version = table_versions.get((self.model.__tablename__,))
+        result = db.exec(select(self.model).where(self.model.id == id)).first()
+        if result is None or table_versions.get((self.model.__tablename__,)) != version:
+            return result
+        if not (db.new or db.dirty or db.deleted):
+            # Never cache changes that are not committed yet
+            state = inspect(result)
+            columns = [attr.key for attr in state.mapper.column_attrs]
+            if all(column in state.dict for column in columns):
+                self.cache.set(key, {column: state.dict[column] for column in columns}, settings.ENTITY_CACHE_TTL)
+        return result
+    
+    def cache_key(self, id: UUID, model: Optional[Type[BaseModel]] = None) -> str:
+        return f"{(model or self.model).__name__}:{id}"
+    
+    def invalidate(self, *ids: UUID, model: Optional[Type[BaseModel]] = None) -> None:
+        """
+        Record a committed change to records of `model` (this service's model by default)
+        
+        The records are dropped from the entity cache, and the version of the
+        table is bumped so the cached results computed from it are stale.
+        Called after committing any change, including the UPDATE statements
+        that bypass the ORM; ids can be left out for new records.
+        """
+        model = model or self.model
+        table_versions.bump(model.__tablename__)
+        if self.cache is not None and ids:
+            self.cache.delete(*(self.cache_key(id, model) for id in ids))
+    
+    @retry_on_lock
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """
         Create a new record
         """
-        self.logger.info(f"Creating new {self.model.__name__}")
+        self.logger.info("Creating new %s", self.model.__name__)
         db_obj = self.model.model_validate(obj_in)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
-        self.logger.info(f"{self.model.__name__} created with id: {db_obj.id}")
+        self.invalidate(db_obj.id)
+        self.logger.info("%s created with id: %s", self.model.__name__, db_obj.id)
         return db_obj
     
+    @retry_on_lock
     def update(self, db: Session, *, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
         """
         Update a record
         """
-        self.logger.info(f"Updating {self.model.__name__} with id: {db_obj.id}")
+        self.logger.info("Updating %s with id: %s", self.model.__name__, db_obj.id)
         # First convert input object to dict
         obj_data = obj_in.model_dump(exclude_unset=True)
         
         # Log the fields being updated
-        self.logger.debug(f"Updating fields: {', '.join(obj_data.keys())}")
+        self.logger.debug("Updating fields: %s", ', '.join(obj_data.keys()))
         
         # Update the model instance with the new values
         for key, value in obj_data.items():
@@ -74,16 +298,55 @@ class BaseService(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
-        self.logger.info(f"{self.model.__name__} with id {db_obj.id} updated successfully")
+        self.invalidate(db_obj.id)
+        self.logger.info("%s with id %s updated successfully", self.model.__name__, db_obj.id)
         return db_obj
     
+    @retry_on_lock
     def delete(self, db: Session, *, id: UUID) -> ModelType:
         """
         Delete a record
         """
-        self.logger.info(f"Deleting {self.model.__name__} with id: {id}")
+        self.logger.info("Deleting %s with id: %s", self.model.__name__, id)
         obj = self.get_by_id(db, id)
         db.delete(obj)
         db.commit()
-        self.logger.info(f"{self.model.__name__} with id {id} deleted successfully")
-        return obj 
\ No newline at end of file
+        self.invalidate(id)
+        self.logger.info("%s with id %s deleted successfully", self.model.__name__, id)
+        return obj 
+
+
+class AsyncBaseService:
+    """
+    Awaitable variant of a service for `async def` routes
+    
+    Every method of the wrapped sync service is available as a coroutine
+    taking the same arguments. With an AsyncSession the calls run through
+    `AsyncSession.run_sync`, on the event loop while the asyncio driver awaits
+    the database; with a sync Session they run in the threadpool, as sync
+    routes do.
+    
+    The response is serialized on the event loop, so the methods must return
+    records with the relationships it reads already loaded: a lazy load there
+    would block the loop (or fail with an AsyncSession).
+    """
+    def __init__(self, service: Any):
+        self.service = service
+    
+    async def run(self, db: Union[Session, AsyncSession], func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a sync service method with the sync session behind `db`
+        """
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(func, *args, **kwargs)
+        return await run_in_threadpool(func, db, *args, **kwargs)
+    
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self.service, name)
+        if not isinstance(method, MethodType):
+            return method
+        
+        @wraps(method)
+        async def call(db: Union[Session, AsyncSession], *args, **kwargs) -> Any:
+            return await self.run(db, method, *args, **kwargs)
+        return call
@@ -1,21 +1,45 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.orm import joinedload
 from sqlmodel import Session, select
 from fastapi import HTTPException
+from app.core.filtering import Filter
+from app.core.pagination import decode_cursor, encode_cursor
+from app.db.retry import retry_on_lock
+from app.db.search_index import books_fts, build_match_query, search_rank
 from app.models.book import Book
 from app.models.author import Author
 from app.schemas.book import BookCreate, BookUpdate
-from app.services.base_service import BaseService
+from app.services.base_service import AsyncBaseService, BaseService
+from app.services.result_cache import cached_result
+from app.services.suggest_index import suggest_index
 from app.core.logging import get_logger
 
+# Rows fetched per round trip when streaming books for the availability summary
+SUMMARY_CHUNK_SIZE = 1000
+
 class BookService(BaseService[Book, BookCreate, BookUpdate]):
     """
     Service for Book operations with custom business logic
     """
+    includable = ("author",)
+    
+    filterable = {
+        "genre": Filter(Book.genre, "eq", "ne"),
+        "author_id": Filter(Book.author_id, "eq"),
+        "publication_year": Filter(Book.publication_year, "eq", "gt", "gte", "lt", "lte"),
+        # "+ 0" keeps SQLite from reading the (genre, available_copies) index and
+        # sorting the matches, instead of an index in the listing order
+        "available": Filter(Book.available_copies + literal_column("0") > literal_column("0")),
+    }
+    sortable = ("publication_year",)
+    
     def __init__(self):
         super().__init__(Book)
         self.logger = get_logger(__name__)
     
+    @retry_on_lock
     def create(self, db: Session, *, obj_in: BookCreate) -> Book:
         """
         Create a new book with validation that the author exists
@@ -24,21 +48,24 @@ class BookService(BaseService[Book, BookCreate, BookUpdate]):
         # Verify the author exists
         author = db.query(Author).filter(Author.id == obj_in.author_id).first()
         if not author:
-            self.logger.warning(f"Cannot create book: Author with ID {obj_in.author_id} not found")
+            self.logger.warning("Cannot create book: Author with ID %s not found", obj_in.author_id)
             raise HTTPException(
                 status_code=404,
                 detail=f"Cannot create book: Author with ID {obj_in.author_id} not found"
             )
         
-        self.logger.debug(f"Author {obj_in.author_id} found, proceeding with book creation")
+        self.logger.debug("Author %s found, proceeding with book creation", obj_in.author_id)
         # Proceed with book creation
-        return super().create(db, obj_in=obj_in)
+        book = super().create(db, obj_in=obj_in)
+        suggest_index.put_book(book)
+        return book
     
+    @retry_on_lock
     def update(self, db: Session, *, db_obj: Book, obj_in: BookUpdate) -> Book:
         """
         Update a book with validation that the author exists if author_id is being updated
         """
-        self.logger.info(f"Updating book with id: {db_obj.id}")
+        self.logger.info("Updating book with id: %s", db_obj.id)
         # Convert input object to dict
         update_data = obj_in.model_dump(exclude_unset=True)
         
@@ -46,90 +73,181 @@ class BookService(BaseService[Book, BookCreate, BookUpdate]):
         if "author_id" in update_data:
             author = db.query(Author).filter(Author.id == update_data["author_id"]).first()
             if not author:
-                self.logger.warning(f"Cannot update book: Author with ID {update_data['author_id']} not found")
+                self.logger.warning("Cannot update book: Author with ID %s not found", update_data['author_id'])
                 raise HTTPException(
                     status_code=404,
                     detail=f"Cannot update book: Author with ID {update_data['author_id']} not found"
                 )
-            self.logger.debug(f"New author {update_data['author_id']} found, proceeding with book update")
+            self.logger.debug("New author %s found, proceeding with book update", update_data['author_id'])
         
         # Proceed with book update
-        return super().update(db, db_obj=db_obj, obj_in=obj_in)
+        book = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        suggest_index.put_book(book)
+        return book
+    
+    @retry_on_lock
+    def delete(self, db: Session, *, id: UUID) -> Book:
+        book = super().delete(db, id=id)
+        suggest_index.remove(id)
+        return book
     
     # Book with author details
     def get_book_with_author(self, db: Session, book_id: UUID):
         """
         Get a book with its author details
         """
-        self.logger.info(f"Getting book with author details for book_id: {book_id}")
-        book = self.get_by_id(db, book_id)
+        self.logger.info("Getting book with author details for book_id: %s", book_id)
+        book = self.get_by_id(db, book_id, options=[joinedload(Book.author)])
         if hasattr(book, "author") and book.author:
-            self.logger.debug(f"Book {book_id} has author: {book.author.id}")
+            self.logger.debug("Book %s has author: %s", book_id, book.author.id)
         else:
-            self.logger.debug(f"Book {book_id} has no associated author")
+            self.logger.debug("Book %s has no associated author", book_id)
         return book
     
     # Get available books
-    def get_available_books(self, db: Session, skip: int = 0, limit: int = 100):
+    def get_available_books(self, db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include: Optional[str] = None):
         """
         Get books with available copies
         Business transformation: filter only available books
         """
-        self.logger.info(f"Getting available books (skip={skip}, limit={limit})")
-        statement = select(Book).where(Book.available_copies > 0).offset(skip).limit(limit)
+        self.logger.info("Getting available books (skip=%s, limit=%s, cursor=%s)", skip, limit, cursor)
+        # The literal 0 (instead of a bound parameter) lets SQLite match the
+        # partial index on available books
+        statement = self.paginate(
+            select(Book).where(Book.available_copies > literal_column("0")),
+            skip=skip, limit=limit, cursor=cursor, include=include
+        )
         results = db.exec(statement).all()
-        self.logger.debug(f"Found {len(results)} available books")
+        self.logger.debug("Found %s available books", len(results))
         return results
     
     # Get books by author
-    def get_books_by_author(self, db: Session, author_id: UUID, skip: int = 0, limit: int = 100):
+    def get_books_by_author(self, db: Session, author_id: UUID, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include: Optional[str] = None):
         """
         Get all books by a specific author
         """
-        self.logger.info(f"Getting books by author_id: {author_id} (skip={skip}, limit={limit})")
-        statement = select(Book).where(Book.author_id == author_id).offset(skip).limit(limit)
+        self.logger.info("Getting books by author_id: %s (skip=%s, limit=%s, cursor=%s)", author_id, skip, limit, cursor)
+        statement = self.paginate(
+            select(Book).where(Book.author_id == author_id),
+            skip=skip, limit=limit, cursor=cursor, include=include
+        )
         results = db.exec(statement).all()
-        self.logger.debug(f"Found {len(results)} books for author {author_id}")
+        self.logger.debug("Found %s books for author %s", len(results), author_id)
         return results
     
     # Get books by genre
-    def get_books_by_genre(self, db: Session, genre: str, skip: int = 0, limit: int = 100):
+    def get_books_by_genre(self, db: Session, genre: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include: Optional[str] = None):
         """
         Get all books in a specific genre
         """
-        self.logger.info(f"Getting books by genre: {genre} (skip={skip}, limit={limit})")
-        statement = select(Book).where(Book.genre == genre).offset(skip).limit(limit)
+        self.logger.info("Getting books by genre: %s (skip=%s, limit=%s, cursor=%s)", genre, skip, limit, cursor)
+        statement = self.paginate(
+            select(Book).where(Book.genre == genre),
+            skip=skip, limit=limit, cursor=cursor, include=include
+        )
         results = db.exec(statement).all()
-        self.logger.debug(f"Found {len(results)} books in genre '{genre}'")
+        self.logger.debug("Found %s books in genre '%s'", len(results), genre)
         return results
     
+    # Full-text search over titles, descriptions and author names
+    def search(
+        self,
+        db: Session,
+        q: str,
+        *,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        include: Optional[str] = None
+    ) -> Tuple[List[Book], Optional[str]]:
+        """
+        Books matching every word of `q`, best matches first (bm25 rank)
+        
+        A word ending with * matches every word starting with it. Pages are
+        keyed on (rank, rowid) of the last match; returns the books and the
+        cursor of the next page, None on the last page.
+        """
+        self.logger.info("Searching books: %r (limit=%s, cursor=%s)", q, limit, cursor)
+        if db.get_bind().dialect.name != "sqlite":
+            raise HTTPException(status_code=501, detail="Book search requires the SQLite full-text index")
+        match = build_match_query(q)
+        if match is None:
+            raise HTTPException(status_code=400, detail="The search must contain at least one word")
+        
+        matches = (
+            select(books_fts.c.rowid, search_rank().label("rank"))
+            .where(literal_column(books_fts.name).match(match))
+            .subquery()
+        )
+        keys = (matches.c.rank, matches.c.rowid)
+        statement = (
+            select(Book, *keys)
+            .join(matches, literal_column("books.rowid") == matches.c.rowid)
+            .options(*self.include_options(include))
+        )
+        if cursor:
+            statement = statement.where(tuple_(*keys) > tuple_(*decode_cursor(cursor, keys)))
+        rows = db.exec(statement.order_by(*keys).limit(limit)).all()
+        
+        self.logger.debug("Found %s books matching %r", len(rows), q)
+        next_page = encode_cursor(rows[-1][1:]) if rows and len(rows) == limit else None
+        return [row[0] for row in rows], next_page
+    
     # Business transformation - Create book availability summary
-    def get_book_availability_summary(self, db: Session):
+    @cached_result("books")
+    def get_book_availability_summary(self, db: Session, include_books: bool = False):
         """
         Get a summary of book availability by genre
         This is a business transformation that computes statistics across the database
+        
+        Totals are computed by the database with a single GROUP BY. The per-book
+        lists are only built when `include_books` is set, streaming the rows in
+        chunks instead of loading every book at once; the totals are then
+        counted from the same rows, so they always agree with the lists.
         """
-        self.logger.info("Generating book availability summary by genre")
-        statement = select(Book)
-        books = db.exec(statement).all()
+        self.logger.info("Generating book availability summary by genre (include_books=%s)", include_books)
+        if include_books:
+            return self._get_availability_with_books(db)
         
-        # Group books by genre and calculate availability
+        # Grouping on the bare column lets SQLite read the (genre, available_copies) covering index
+        statement = select(
+            Book.genre, func.count(), func.sum(Book.available_copies)
+        ).group_by(Book.genre)
+        
+        genres = {
+            genre or "Uncategorized": {"total": total, "available": available}
+            for genre, total, available in db.exec(statement)
+        }
+        
+        self.logger.debug("Generated availability summary for %s genres", len(genres))
+        return genres
+    
+    def _get_availability_with_books(self, db: Session) -> dict:
+        """
+        The availability summary with the books of every genre, from one query
+        
+        A second query for the totals would read another snapshot, which may
+        miss the genre of a book created in between.
+        """
         genres = {}
-        for book in books:
-            genre_name = book.genre or "Uncategorized"
-            if genre_name not in genres:
-                genres[genre_name] = {"total": 0, "available": 0, "books": []}
-            
-            genres[genre_name]["total"] += 1
-            genres[genre_name]["available"] += book.available_copies
-            genres[genre_name]["books"].append({
-                "id": str(book.id),
-                "title": book.title,
-                "available_copies": book.available_copies
+        statement = select(
+            Book.genre, Book.id, Book.title, Book.available_copies
+        ).execution_options(yield_per=SUMMARY_CHUNK_SIZE)
+        for genre, book_id, title, available_copies in db.exec(statement):
+            summary = genres.get(genre or "Uncategorized")
+            if summary is None:
+                summary = genres[genre or "Uncategorized"] = {"total": 0, "available": 0, "books": []}
+            summary["total"] += 1
+            summary["available"] += available_copies
+            summary["books"].append({
+                "id": str(book_id),
+                "title": title,
+                "available_copies": available_copies
             })
         
-        self.logger.debug(f"Generated availability summary for {len(genres)} genres")
-        return genres
+        self.logger.debug("Generated availability summary for %s genres", len(genres))
+        # In the order of the GROUP BY: books without a genre first
+        return dict(sorted(genres.items(), key=lambda item: (item[0] != "Uncategorized", item[0])))
 
 # Create a singleton instance
-book_service = BookService() 
\ No newline at end of file
+book_service = BookService()
+async_book_service = AsyncBaseService(book_service)
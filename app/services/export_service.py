@@ -0,0 +1,145 @@
+import csv
+import io
+import zlib
+from datetime import date, datetime, timezone
+from typing import Iterable, Iterator, Optional, Type
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, func, select
+from sqlmodel import SQLModel
+from app.core.logging import get_logger
+
+# Rows fetched from the database, encoded and sent per chunk
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """
+    Whether an Accept-Encoding header allows gzip (and does not refuse it with q=0)
+    """
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            q = params.strip().removeprefix("q=")
+            try:
+                return not params or float(q) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class ExportService:
+    """
+    Service for exporting whole tables as NDJSON or CSV
+
+    Rows are read with a single query whose results are fetched in batches
+    (yield_per) and encoded as they arrive, so memory use only depends on the
+    batch size, not the table size. No ORM objects are built: the export has
+    every column of the table, under its column name.
+    """
+    def __init__(self, batch_size: int = EXPORT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.logger = get_logger(__name__)
+
+    def export(
+        self,
+        model: Type[SQLModel],
+        format: str = "ndjson",
+        updated_since: Optional[datetime] = None,
+        gzip: bool = False
+    ) -> Iterator[bytes]:
+        """
+        Encoded chunks of the export of a model's table, in (created_at, id) order
+
+        `updated_since` keeps the rows created or updated at or after that
+        time. The query only runs once the iterator is consumed; it uses its
+        own connection, which is released when the iterator is exhausted or closed.
+        """
+        if format not in EXPORT_MEDIA_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported export format '{format}', expected one of: {', '.join(EXPORT_MEDIA_TYPES)}"
+            )
+        table = model.__table__
+        statement = select(table).order_by(table.c.created_at, table.c.id)
+        if updated_since is not None:
+            if updated_since.tzinfo is not None:
+                # Timestamps are stored as naive UTC
+                updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+            statement = statement.where(func.coalesce(table.c.updated_at, table.c.created_at) >= updated_since)
+
+        chunks = self._encode(statement, format, table.name)
+        return self._gzip(chunks) if gzip else chunks
+
+    def _encode(self, statement: Select, format: str, name: str) -> Iterator[bytes]:
+        from app.db.session import engine
+
+        self.logger.info("Exporting %s as %s", name, format)
+        rows = 0
+        with engine.connect() as connection:
+            result = connection.execution_options(yield_per=self.batch_size).execute(statement)
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(result.keys())
+                for batch in result.partitions():
+                    writer.writerows([_csv_value(value) for value in row] for row in batch)
+                    rows += len(batch)
+                    yield buffer.getvalue().encode()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if not rows:
+                    yield buffer.getvalue().encode()
+            else:
+                for batch in result.mappings().partitions():
+                    yield b"".join(orjson.dumps(dict(row), option=orjson.OPT_APPEND_NEWLINE) for row in batch)
+                    rows += len(batch)
+        self.logger.info("Exported %s %s rows", rows, name)
+
+    def _gzip(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def export_response(
+        self,
+        model: Type[SQLModel],
+        format: str = "ndjson",
+        updated_since: Optional[datetime] = None,
+        accept_encoding: Optional[str] = None
+    ) -> StreamingResponse:
+        """
+        Streaming response with the export of a model's table, gzip encoded if the client accepts it
+        """
+        gzip = accepts_gzip(accept_encoding)
+        chunks = self.export(model, format, updated_since, gzip)
+        headers = {
+            "Content-Disposition": f'attachment; filename="{model.__tablename__}.{format}"',
+            "Vary": "Accept-Encoding",
+        }
+        if gzip:
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
+# Create a singleton instance
+export_service = ExportService()
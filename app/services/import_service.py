@@ -0,0 +1,266 @@
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid4
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from app.core.cache import table_versions
+from app.models.author import Author
+from app.models.book import Book
+from app.services.base_service import AsyncBaseService
+from app.services.suggest_index import suggest_index
+from app.core.logging import get_logger
+
+# Rows inserted per batch (and per transaction)
+IMPORT_CHUNK_SIZE = 5000
+
+# Maximum number of rejected rows described in the report
+IMPORT_MAX_REPORTED_ISSUES = 100
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Bytes read at once when checking the encoding of an uploaded file
+IMPORT_READ_SIZE = 1024 * 1024
+
+
+class CatalogImportService:
+    """
+    Service for importing authors and books from publisher catalogs
+
+    Each record describes a book and its author by name:
+    author_name, author_biography, author_birth_year, title, isbn,
+    publication_year, genre, description and available_copies.
+    Records without a title and ISBN only register the author.
+
+    The input is streamed and processed in chunks, so memory use only depends
+    on the chunk size and the number of distinct authors, not the file size.
+    """
+    def __init__(self, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.logger = get_logger(__name__)
+
+    def import_catalog(self, db: Session, lines: Iterable[str], format: str = "csv") -> dict:
+        """
+        Import a catalog from an iterable of text lines (an open file works)
+
+        ISBN conflicts and invalid rows are reported without aborting the run.
+        """
+        if format not in IMPORT_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported import format '{format}', expected one of: {', '.join(IMPORT_FORMATS)}"
+            )
+
+        self.logger.info("Importing %s catalog (chunk_size=%s)", format, self.chunk_size)
+        report = {
+            "rows": 0,
+            "authors_created": 0,
+            "books_created": 0,
+            "conflicts": 0,
+            "invalid": 0,
+            "issues": []
+        }
+        authors: Dict[str, UUID] = {}
+
+        chunk = []
+        for line_number, record in self._read_records(lines, format, report):
+            report["rows"] += 1
+            chunk.append((line_number, record))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(db, chunk, authors, report)
+                chunk = []
+        if chunk:
+            self._import_chunk(db, chunk, authors, report)
+
+        self.logger.info(
+            "Catalog import finished: %s rows, %s authors and %s books created, %s ISBN conflicts, %s invalid rows",
+            report['rows'], report['authors_created'], report['books_created'], report['conflicts'], report['invalid']
+        )
+        return report
+
+    def import_file(self, db: Session, file: BinaryIO, format: str = "csv") -> dict:
+        """
+        Import a catalog from a binary file encoded in UTF-8
+
+        The whole file is checked first, since chunks are committed as they
+        are read: an encoding error halfway would leave a partial import.
+        """
+        self._check_encoding(file)
+        return self.import_catalog(db, codecs.iterdecode(file, "utf-8"), format)
+
+    @staticmethod
+    def _check_encoding(file: BinaryIO) -> None:
+        """
+        Raise a 400 error unless the file is valid UTF-8, then rewind it
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        offset, block = 0, b""
+        try:
+            for block in iter(lambda: file.read(IMPORT_READ_SIZE), b""):
+                decoder.decode(block)
+                offset += len(block)
+            block = b""
+            decoder.decode(block, final=True)
+        except UnicodeDecodeError as e:
+            # The error is located in the bytes held back by the decoder followed by the block
+            position = offset + len(block) - len(e.object) + e.start
+            raise HTTPException(status_code=400, detail=f"The catalog is not valid UTF-8 ({e.reason} at byte {position})")
+        finally:
+            file.seek(0)
+
+    def _read_records(self, lines: Iterable[str], format: str, report: dict) -> Iterator[Tuple[int, dict]]:
+        """
+        Lazily parse the input into (line number, record) pairs
+        """
+        if format == "csv":
+            reader = csv.DictReader(lines)
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                self._reject(report, "invalid", line_number, None, f"Invalid JSON: {e}")
+                continue
+            yield line_number, record
+
+    def _import_chunk(self, db: Session, chunk: List[Tuple[int, dict]], authors: Dict[str, UUID], report: dict) -> None:
+        """
+        Resolve the authors of a chunk and insert its books in batches
+        """
+        now = datetime.utcnow()
+
+        # Validate the records before touching the database
+        rows = []
+        for line_number, record in chunk:
+            try:
+                rows.append((line_number, self._parse_record(record)))
+            except ValueError as e:
+                isbn = record.get("isbn")
+                self._reject(report, "invalid", line_number, isbn if isinstance(isbn, str) else None, str(e))
+
+        # Resolve the authors by name: in-memory map first, then one IN query
+        unknown = {author["name"] for _, (author, _) in rows} - authors.keys()
+        if unknown:
+            statement = select(Author.id, Author.name).where(Author.name.in_(unknown))
+            for author_id, name in db.exec(statement):
+                authors.setdefault(name, author_id)
+
+        new_authors = {}
+        for _, (author, _) in rows:
+            if author["name"] not in authors and author["name"] not in new_authors:
+                new_authors[author["name"]] = {"id": uuid4(), "created_at": now, **author}
+        if new_authors:
+            db.connection().execute(insert(Author.__table__), list(new_authors.values()))
+            for name, author in new_authors.items():
+                authors[name] = author["id"]
+            report["authors_created"] += len(new_authors)
+
+        # Skip ISBNs already in the database or repeated within the chunk
+        book_rows = [(line_number, book) for line_number, (_, book) in rows if book]
+        isbns = {book["isbn"] for _, book in book_rows}
+        existing = set(db.exec(select(Book.isbn).where(Book.isbn.in_(isbns))).all()) if isbns else set()
+
+        books = []
+        for line_number, book in book_rows:
+            if book["isbn"] in existing:
+                self._reject(report, "conflicts", line_number, book["isbn"], "A book with this ISBN already exists")
+                continue
+            existing.add(book["isbn"])
+            books.append({
+                "id": uuid4(),
+                "created_at": now,
+                "author_id": authors[book.pop("author_name")],
+                **book
+            })
+
+        if books:
+            # OR IGNORE protects against ISBNs inserted concurrently by another writer
+            statement = insert(Book.__table__).prefix_with("OR IGNORE", dialect="sqlite")
+            result = db.connection().execute(statement, books)
+            inserted = result.rowcount if result.rowcount >= 0 else len(books)
+            report["books_created"] += inserted
+            report["conflicts"] += len(books) - inserted
+            if inserted < len(books):
+                # Keep only the books actually inserted for the suggest index
+                statement = select(Book.id).where(Book.id.in_([book["id"] for book in books]))
+                created = set(db.exec(statement).all())
+                books = [book for book in books if book["id"] in created]
+
+        db.commit()
+        table_versions.bump(Author.__tablename__, Book.__tablename__)
+        suggest_index.put_many(new_authors.values(), books)
+        self.logger.debug("Imported chunk of %s rows (%s books)", len(chunk), len(books))
+
+    @staticmethod
+    def _parse_record(record: dict) -> Tuple[dict, Optional[dict]]:
+        """
+        Split a record into its author and (optional) book columns
+
+        Raises ValueError with a human readable reason for invalid records.
+        """
+        def text(key):
+            value = record.get(key)
+            if value is None:
+                return None
+            # JSON numbers are accepted (e.g. ISBNs), lists and objects are not
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                raise ValueError(f"'{key}' must be a string")
+            return str(value).strip() or None
+
+        def integer(key):
+            value = text(key)
+            if value is None:
+                return None
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"'{key}' must be an integer")
+
+        author_name = text("author_name")
+        if not author_name:
+            raise ValueError("'author_name' is required")
+        author = {
+            "name": author_name,
+            "biography": text("author_biography"),
+            "birth_year": integer("author_birth_year")
+        }
+
+        title, isbn = text("title"), text("isbn")
+        if title is None and isbn is None:
+            return author, None
+        if title is None or isbn is None:
+            raise ValueError("'title' and 'isbn' are required for books")
+
+        copies = integer("available_copies")
+        if copies is not None and copies < 0:
+            raise ValueError("'available_copies' must not be negative")
+        book = {
+            "author_name": author_name,
+            "title": title,
+            "isbn": isbn,
+            "publication_year": integer("publication_year"),
+            "genre": text("genre"),
+            "description": text("description"),
+            "available_copies": 1 if copies is None else copies
+        }
+        return author, book
+
+    @staticmethod
+    def _reject(report: dict, counter: str, line_number: int, isbn: Optional[str], error: str) -> None:
+        report[counter] += 1
+        if len(report["issues"]) < IMPORT_MAX_REPORTED_ISSUES:
+            report["issues"].append({"line": line_number, "isbn": isbn, "error": error})
+
+# Create a singleton instance
+import_service = CatalogImportService()
+async_import_service = AsyncBaseService(import_service)
@@ -1,39 +1,62 @@
+from collections import Counter
 from typing import List, Optional
 from uuid import UUID
 from datetime import date, datetime, timedelta
-from sqlmodel import Session, select
+from sqlalchemy import case, func
+from sqlalchemy.orm import joinedload
+from sqlmodel import Session, select, update
 from fastapi import HTTPException
 
+from app.core.filtering import Filter
+from app.db.retry import retry_on_lock
 from app.models.loan import Loan
 from app.models.book import Book
 from app.schemas.loan import LoanCreate, LoanUpdate
-from app.services.base_service import BaseService
+from app.services.base_service import AsyncBaseService, BaseService
+from app.services.result_cache import cached_result
+from app.services.suggest_index import suggest_index
 
 class LoanService(BaseService[Loan, LoanCreate, LoanUpdate]):
     """
     Service for Loan operations with custom business logic
     """
+    includable = ("book", "user")
+    
+    filterable = {"is_returned": Filter(Loan.is_returned)}
+    
     def __init__(self):
         super().__init__(Loan)
     
+    @retry_on_lock
     def create(self, db: Session, *, obj_in: LoanCreate) -> Loan:
         """
         Create a new loan with business logic
         - Check if book exists and has available copies
         - Set default loan date to today if not provided
         - Calculate due date if not provided (14 days from loan date)
-        """
-        # Check if book exists and has available copies
-        statement = select(Book).where(Book.id == obj_in.book_id)
-        book = db.exec(statement).first()
         
-        if not book:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Book with id {obj_in.book_id} not found"
-            )
+        The copy is taken with a single conditional UPDATE, so concurrent
+        checkouts of the same book can never oversell it.
+        """
+        # Take a copy only if one is still available
+        statement = (
+            update(Book)
+            .where(Book.id == obj_in.book_id, Book.available_copies > 0)
+            .values(available_copies=Book.available_copies - 1, updated_at=datetime.utcnow())
+        )
+        result = db.exec(statement)
         
-        if book.available_copies <= 0:
+        if result.rowcount == 0:
+            # Nothing was updated: tell apart a missing book from a sold out one
+            book = db.exec(select(Book).where(Book.id == obj_in.book_id)).first()
+            db.rollback()
+            
+            if not book:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Book with id {obj_in.book_id} not found"
+                )
+            
             raise HTTPException(
                 status_code=400,
                 detail=f"Book '{book.title}' has no available copies"
@@ -52,22 +75,25 @@ class LoanService(BaseService[Loan, LoanCreate, LoanUpdate]):
         
         db_obj = self.model(**loan_data)
         
-        # Update book available copies
-        book.available_copies -= 1
-        
         db.add(db_obj)
-        db.add(book)
         db.commit()
         db.refresh(db_obj)
+        self.invalidate(db_obj.id)
+        self.invalidate(obj_in.book_id, model=Book)
+        suggest_index.add_loans({obj_in.book_id: 1})
         
         return db_obj
     
+    @retry_on_lock
     def return_book(self, db: Session, loan_id: UUID) -> Loan:
         """
         Return a book
         - Mark loan as returned
         - Set return date to today
         - Increase book available copies
+        
+        Both changes are conditional UPDATEs, so a loan returned twice at the
+        same time only gives its copy back once.
         """
         # Get the loan
         loan = self.get_by_id(db, loan_id)
@@ -78,40 +104,193 @@ class LoanService(BaseService[Loan, LoanCreate, LoanUpdate]):
                 detail="This book has already been returned"
             )
         
-        # Get the book
-        statement = select(Book).where(Book.id == loan.book_id)
-        book = db.exec(statement).first()
+        now = datetime.utcnow()
         
-        if not book:
+        # Mark the loan as returned unless someone else just did
+        statement = (
+            update(Loan)
+            .where(Loan.id == loan_id, Loan.is_returned == False)
+            .values(is_returned=True, return_date=date.today(), updated_at=now)
+        )
+        if db.exec(statement).rowcount == 0:
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail="This book has already been returned"
+            )
+        
+        # Give the copy back
+        statement = (
+            update(Book)
+            .where(Book.id == loan.book_id)
+            .values(available_copies=Book.available_copies + 1, updated_at=now)
+        )
+        if db.exec(statement).rowcount == 0:
+            db.rollback()
             raise HTTPException(
                 status_code=404,
                 detail=f"Book with id {loan.book_id} not found"
             )
         
-        # Update the loan
-        loan.is_returned = True
-        loan.return_date = date.today()
-        loan.updated_at = datetime.utcnow()
+        db.commit()
+        db.refresh(loan)
+        self.invalidate(loan_id)
+        self.invalidate(loan.book_id, model=Book)
         
-        # Update the book
-        book.available_copies += 1
+        return loan
+    
+    @retry_on_lock
+    def bulk_create(self, db: Session, *, items: List[LoanCreate]) -> dict:
+        """
+        Create many loans in a single transaction
+        - All books are validated with one IN query
+        - Copies are taken with one conditional UPDATE per distinct book
+        - Items that cannot be fulfilled are reported without failing the others
+        """
+        book_ids = {item.book_id for item in items}
+        statement = select(Book.id, Book.title, Book.available_copies).where(Book.id.in_(book_ids))
+        books = {book_id: (title, copies) for book_id, title, copies in db.exec(statement)}
+        
+        # Hand out the copies in request order
+        remaining = {book_id: copies for book_id, (_, copies) in books.items()}
+        results = [None] * len(items)
+        granted = {}
+        for index, item in enumerate(items):
+            if item.book_id not in books:
+                results[index] = self._bulk_error(index, 404, f"Book with id {item.book_id} not found")
+            elif remaining[item.book_id] <= 0:
+                title = books[item.book_id][0]
+                results[index] = self._bulk_error(index, 400, f"Book '{title}' has no available copies")
+            else:
+                remaining[item.book_id] -= 1
+                granted.setdefault(item.book_id, []).append(index)
+        
+        # Take the copies; a book changed by a concurrent request fails its items
+        now = datetime.utcnow()
+        loans = []
+        for book_id, indexes in granted.items():
+            statement = (
+                update(Book)
+                .where(Book.id == book_id, Book.available_copies >= len(indexes))
+                .values(available_copies=Book.available_copies - len(indexes), updated_at=now)
+            )
+            if db.exec(statement).rowcount == 0:
+                title = books[book_id][0]
+                for index in indexes:
+                    results[index] = self._bulk_error(index, 409, f"Book '{title}' no longer has enough available copies")
+                continue
+            
+            for index in indexes:
+                item = items[index]
+                loan = self.model(
+                    book_id=item.book_id,
+                    user_id=item.user_id,
+                    loan_date=item.loan_date or date.today(),
+                    due_date=item.due_date
+                )
+                loans.append((index, loan))
         
-        db.add(loan)
-        db.add(book)
+        db.add_all([loan for _, loan in loans])
+        # Snapshot the loans before the commit expires them
+        for index, loan in loans:
+            results[index] = {"index": index, "status": 201, "loan": loan.model_dump()}
         db.commit()
-        db.refresh(loan)
+        self.invalidate()
+        self.invalidate(*granted.keys(), model=Book)
+        suggest_index.add_loans(Counter(items[index].book_id for index, _ in loans))
+        
+        return self._bulk_result(results)
+    
+    @retry_on_lock
+    def bulk_return(self, db: Session, *, loan_ids: List[UUID]) -> dict:
+        """
+        Return many loans in a single transaction
+        - All loans are loaded with one IN query
+        - Loans are marked returned with one conditional UPDATE
+        - Copies are given back with one UPDATE per distinct book
+        - Loans that cannot be returned are reported without failing the others
+        """
+        statement = select(Loan.id, Loan.book_id, Loan.is_returned).where(Loan.id.in_(set(loan_ids)))
+        found = {loan_id: (book_id, is_returned) for loan_id, book_id, is_returned in db.exec(statement)}
+        
+        results = [None] * len(loan_ids)
+        pending = {}
+        for index, loan_id in enumerate(loan_ids):
+            if loan_id not in found:
+                results[index] = self._bulk_error(index, 404, f"Loan with id {loan_id} not found")
+            elif found[loan_id][1] or loan_id in pending:
+                results[index] = self._bulk_error(index, 400, "This book has already been returned")
+            else:
+                pending[loan_id] = index
         
+        returned = []
+        if pending:
+            now = datetime.utcnow()
+            statement = (
+                update(Loan)
+                .where(Loan.id.in_(pending.keys()), Loan.is_returned == False)
+                .values(is_returned=True, return_date=date.today(), updated_at=now)
+                .returning(Loan.id)
+            )
+            returned = db.exec(statement).scalars().all()
+            
+            # Give the copies back
+            copies = {}
+            for loan_id in returned:
+                book_id = found[loan_id][0]
+                copies[book_id] = copies.get(book_id, 0) + 1
+            for book_id, count in copies.items():
+                statement = (
+                    update(Book)
+                    .where(Book.id == book_id)
+                    .values(available_copies=Book.available_copies + count, updated_at=now)
+                )
+                db.exec(statement)
+            db.commit()
+            self.invalidate(*returned)
+            self.invalidate(*copies.keys(), model=Book)
+        
+        # Loans returned by a concurrent request in the meantime
+        for loan_id in pending.keys() - set(returned):
+            index = pending[loan_id]
+            results[index] = self._bulk_error(index, 400, "This book has already been returned")
+        
+        if returned:
+            for loan in db.exec(select(Loan).where(Loan.id.in_(returned))):
+                index = pending[loan.id]
+                results[index] = {"index": index, "status": 200, "loan": loan.model_dump()}
+        
+        return self._bulk_result(results)
+
+    @retry_on_lock
+    def delete(self, db: Session, *, id: UUID) -> Loan:
+        loan = super().delete(db, id=id)
+        suggest_index.add_loans({loan.book_id: -1})
         return loan
+
+    @staticmethod
+    def _bulk_error(index: int, status: int, error: str) -> dict:
+        return {"index": index, "status": status, "error": error}
     
-    def get_overdue_loans(self, db: Session, skip: int = 0, limit: int = 100):
+    @staticmethod
+    def _bulk_result(results: List[dict]) -> dict:
+        succeeded = sum(1 for result in results if "loan" in result)
+        return {
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results
+        }
+    
+    def get_overdue_loans(self, db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include: Optional[str] = None):
         """
         Get all overdue loans (due date is before today and not returned)
         Business transformation: filter by complex condition
         """
         today = date.today()
-        statement = select(Loan).where(
-            (Loan.due_date < today) & (Loan.is_returned == False)
-        ).offset(skip).limit(limit)
+        statement = self.paginate(
+            select(Loan).where((Loan.due_date < today) & (Loan.is_returned == False)),
+            skip=skip, limit=limit, cursor=cursor, include=include
+        )
         
         results = db.exec(statement).all()
         return results
@@ -120,34 +299,48 @@ class LoanService(BaseService[Loan, LoanCreate, LoanUpdate]):
         """
         Get a loan with book and user details
         """
-        loan = self.get_by_id(db, loan_id)
+        loan = self.get_by_id(db, loan_id, options=[joinedload(Loan.book), joinedload(Loan.user)])
         return loan
     
     # Business transformation - Get loan statistics
-    def get_loan_statistics(self, db: Session):
+    # The overdue count changes at midnight without any write to the loans
+    @cached_result("loans", key_extra=lambda: date.today())
+    def get_loan_statistics(self, db: Session, from_date: Optional[date] = None, to_date: Optional[date] = None):
         """
         Get statistics about loans
         This is a business transformation that computes various statistics
-        """
-        # Get all loans
-        statement = select(Loan)
-        loans = db.exec(statement).all()
         
-        # Calculate statistics
-        total_loans = len(loans)
-        active_loans = sum(1 for loan in loans if not loan.is_returned)
-        completed_loans = total_loans - active_loans
+        All figures are computed by the database in a single aggregate query.
+        `from_date`/`to_date` restrict the statistics to loans made in that window.
+        """
+        if from_date and to_date and from_date > to_date:
+            raise HTTPException(
+                status_code=400,
+                detail="The 'from' date must not be after the 'to' date"
+            )
         
         today = date.today()
-        overdue_loans = sum(1 for loan in loans if not loan.is_returned and loan.due_date < today)
+        is_active = Loan.is_returned == False
+        loan_days = func.julianday(Loan.return_date) - func.julianday(Loan.loan_date)
         
-        # Calculate average loan duration for completed loans
-        completed_loan_days = [
-            (loan.return_date - loan.loan_date).days
-            for loan in loans if loan.is_returned and loan.return_date
-        ]
+        statement = select(
+            func.count(Loan.id),
+            func.sum(case((is_active, 1), else_=0)),
+            func.sum(case((is_active & (Loan.due_date < today), 1), else_=0)),
+            func.avg(case(((Loan.is_returned == True) & Loan.return_date.is_not(None), loan_days)))
+        )
+        if from_date:
+            statement = statement.where(Loan.loan_date >= from_date)
+        if to_date:
+            statement = statement.where(Loan.loan_date <= to_date)
         
-        avg_loan_duration = sum(completed_loan_days) / len(completed_loan_days) if completed_loan_days else 0
+        total_loans, active_loans, overdue_loans, avg_loan_duration = db.exec(statement).one()
+        
+        # SUM and AVG are NULL when no loan matches
+        active_loans = active_loans or 0
+        overdue_loans = overdue_loans or 0
+        avg_loan_duration = avg_loan_duration or 0
+        completed_loans = total_loans - active_loans
         
         # Create statistics object
         stats = {
@@ -162,4 +355,5 @@ class LoanService(BaseService[Loan, LoanCreate, LoanUpdate]):
         return stats
 
 # Create a singleton instance
-loan_service = LoanService() 
\ No newline at end of file
+loan_service = LoanService()
+async_loan_service = AsyncBaseService(loan_service)
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional, Set, Tuple, TypeVar
+from sqlmodel import Session
+from app.core.cache import MISSING, CacheBackend, LRUCache, table_versions
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import result_cache_requests_total
+
+F = TypeVar("F", bound=Callable)
+
+logger = get_logger(__name__)
+
+# Results of the cached service methods, with the table versions they were computed from
+result_cache: Optional[CacheBackend] = LRUCache(settings.RESULT_CACHE_SIZE) if settings.RESULT_CACHE_SIZE > 0 else None
+
+# Background recomputation of stale results (stale-while-revalidate)
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="result-cache")
+_refreshing: Set[Hashable] = set()
+_refreshing_lock = Lock()
+
+
+def cached_result(*tables: str, key_extra: Optional[Callable[[], Hashable]] = None) -> Callable[[F], F]:
+    """
+    Cache the result of a read-only service method until one of `tables` changes
+
+    Results are keyed by the method and its arguments (the session aside),
+    and are shared between callers, which must not modify them. Errors (e.g.
+    a 404) are not cached. Results that also depend on something else than
+    the tables, such as today's date, add it to the key with `key_extra`.
+
+        @cached_result("books")
+        def get_book_availability_summary(self, db: Session, include_books: bool = False):
+    """
+    def decorator(func: F) -> F:
+        name = func.__qualname__
+
+        @wraps(func)
+        def wrapper(self, db: Session, *args, **kwargs):
+            if result_cache is None:
+                return func(self, db, *args, **kwargs)
+
+            key = (name, args, tuple(sorted(kwargs.items())), key_extra() if key_extra else None)
+            # Read the versions first: a write committed while computing makes the result stale
+            versions = table_versions.get(tables)
+            entry = result_cache.get(key)
+            if entry is not MISSING:
+                entry_versions, value = entry
+                if entry_versions == versions:
+                    result_cache_requests_total.inc((name, "hit"))
+                    return value
+                if settings.RESULT_CACHE_STALE_WHILE_REVALIDATE:
+                    result_cache_requests_total.inc((name, "stale"))
+                    _schedule_refresh(key, tables, lambda session: func(self, session, *args, **kwargs))
+                    return value
+
+            result_cache_requests_total.inc((name, "miss"))
+            value = func(self, db, *args, **kwargs)
+            result_cache.set(key, (versions, value), settings.RESULT_CACHE_TTL)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def _schedule_refresh(key: Hashable, tables: Tuple[str, ...], compute: Callable[[Session], Any]) -> None:
+    """
+    Recompute a stale result in the background, once at a time per key
+    """
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    _refresh_executor.submit(_refresh, key, tables, compute)
+
+
+def _refresh(key: Hashable, tables: Tuple[str, ...], compute: Callable[[Session], Any]) -> None:
+    from app.db.session import engine
+
+    try:
+        versions = table_versions.get(tables)
+        with Session(engine) as session:
+            value = compute(session)
+        result_cache.set(key, (versions, value), settings.RESULT_CACHE_TTL)
+    except Exception as e:
+        # E.g. the entity was deleted: the next call computes (and fails) in the request
+        logger.warning("Cannot refresh cached result of %s: %s", key[0], e)
+        result_cache.delete(key)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
@@ -0,0 +1,467 @@
+import re
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from heapq import merge, nsmallest
+from itertools import islice
+from threading import Lock
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy import func
+from sqlmodel import Session, select
+from app.core.logging import get_logger
+from app.models.author import Author
+from app.models.book import Book
+from app.models.loan import Loan
+
+logger = get_logger(__name__)
+
+# Largest number of suggestions returned for a prefix
+SUGGEST_MAX_LIMIT = 20
+
+# Prefixes of more words than this (the first letters typed) keep their top
+# suggestions instead of merging the entries of every word on each keystroke
+SUGGEST_MERGE_LIMIT = 32
+
+# A query of several terms walks this many entries of its most selective one
+# before intersecting the entries of its terms instead, when they have at most
+# SUGGEST_INTERSECT_LIMIT entries together. Queries matching up to
+# SUGGEST_CACHED_MATCHES entries keep them (SUGGEST_MATCH_CACHE_SIZE queries
+# at most), so the next keystrokes only filter them.
+SUGGEST_WALK_LIMIT = 1_000
+SUGGEST_INTERSECT_LIMIT = 100_000
+SUGGEST_CACHED_MATCHES = 1_000
+SUGGEST_MATCH_CACHE_SIZE = 1_024
+
+BOOK, AUTHOR = 0, 1
+KINDS = ("book", "author")
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """
+    Lower case words of `text` without accents, separated by single spaces
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return " ".join(_WORD.findall(folded))
+
+
+class SuggestIndex:
+    """
+    In-process prefix index over the book titles and author names
+
+    Entries live in parallel arrays indexed by slot. Every distinct word of
+    an entry's normalized text maps to the slots containing it, and the words
+    are kept sorted, so the words starting with a prefix are a contiguous
+    range found by bisection. A query matches the entries having, for each
+    of its words, a word starting with it.
+
+    Entries are ranked by loan count (ties go to the lowest slot), and every
+    word keeps its slots in rank order, so a query walks the entries of its
+    most selective word best first and stops after `limit` matches. Prefixes
+    of more than SUGGEST_MERGE_LIMIT words cache their SUGGEST_MAX_LIMIT best
+    entries, kept up to date as entries are added or gain loans, and dropped
+    (recomputed on the next query) when one of them is removed or loses loans.
+    Queries of several words whose words rarely come together cache the
+    entries matching them, which the next keystrokes filter; adding, renaming
+    or removing an entry clears them (loans do not change which entries match).
+
+    The services update it after committing their changes; each worker
+    process has its own index, built at startup, and does not see the writes
+    made through the others until it restarts.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.ready = False
+        self._reset()
+
+    def _reset(self) -> None:
+        # Ids are kept as ints and bytes (16 per slot) rather than UUID objects,
+        # which the garbage collector would track: a full collection would
+        # then walk every entry
+        self.slots: Dict[int, int] = {}
+        self.ids = bytearray()
+        self.labels: List[Optional[str]] = []
+        # Normalized label after a space, so " term" finds the words starting with term
+        self.texts: List[Optional[str]] = []
+        self.kinds = bytearray()
+        # Lower is better: slot - (loans << 32)
+        self.ranks = array("q")
+        # Slot of the author of each book, -1 for authors
+        self.parents = array("q")
+        self.free: List[int] = []
+        # Sorted distinct words, and the slots of the entries containing each, best first
+        self.words: List[str] = []
+        self.postings: Dict[str, array] = {}
+        # Best slots of the prefixes of many words
+        self.top: Dict[str, List[int]] = {}
+        # Slots matching recent queries of several terms, in no particular order
+        self.matches: "OrderedDict[Tuple[str, ...], array]" = OrderedDict()
+
+    def build(self, db: Session) -> None:
+        """
+        (Re)build the index from the database: authors, books and the loan
+        count of every book (an author's is the sum over their books)
+        """
+        loans = dict(db.exec(select(Loan.book_id, func.count()).group_by(Loan.book_id)).all())
+        authors = db.exec(select(Author.id, Author.name)).all()
+        books = db.exec(select(Book.id, Book.title, Book.author_id).execution_options(yield_per=10_000))
+
+        with self.lock:
+            self.ready = False
+            self._reset()
+            for author_id, name in authors:
+                self._add(AUTHOR, author_id, name, -1, 0)
+            for book_id, title, author_id in books:
+                parent = self.slots.get(author_id.int, -1)
+                count = loans.get(book_id, 0)
+                self._add(BOOK, book_id, title, parent, count)
+                if parent >= 0:
+                    self.ranks[parent] -= count << 32
+            self.words.sort()
+            for word, posting in self.postings.items():
+                self.postings[word] = array("I", sorted(posting, key=self.ranks.__getitem__))
+            self.ready = True
+        logger.info("Suggest index built with %s authors and %s books", len(authors), len(self.slots) - len(authors))
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[dict]:
+        """
+        Entries matching `prefix`, most loaned first
+        """
+        terms = tuple(dict.fromkeys(normalize(prefix).split()))
+        if not terms:
+            return []
+        limit = min(limit, SUGGEST_MAX_LIMIT)
+        with self.lock:
+            return [self._suggestion(slot) for slot in self._search(terms, limit)]
+
+    def put_author(self, author: Author) -> None:
+        with self.lock:
+            if self.ready:
+                self._put(AUTHOR, author.id, author.name, -1)
+
+    def put_book(self, book: Book) -> None:
+        with self.lock:
+            if self.ready:
+                self._put(BOOK, book.id, book.title, self.slots.get(book.author_id.int, -1))
+
+    def put_many(self, authors: Iterable[dict], books: Iterable[dict]) -> None:
+        """
+        Add the rows of a bulk insert, authors first (id and name; id, title and author_id)
+        """
+        with self.lock:
+            if not self.ready:
+                return
+            for author in authors:
+                self._put(AUTHOR, author["id"], author["name"], -1)
+            for book in books:
+                self._put(BOOK, book["id"], book["title"], self.slots.get(book["author_id"].int, -1))
+
+    def remove(self, id: UUID) -> None:
+        """
+        Remove a book or an author; a book's loans are taken from its author
+        """
+        with self.lock:
+            slot = self.slots.get(id.int)
+            if not self.ready or slot is None:
+                return
+            if self.parents[slot] >= 0:
+                self._add_loans(self.parents[slot], -self._loans(slot))
+            self._unindex(slot)
+            del self.slots[id.int]
+            self.labels[slot] = self.texts[slot] = None
+            self.free.append(slot)
+
+    def add_loans(self, counts: Dict[UUID, int]) -> None:
+        """
+        Count loans created (or deleted, with negative counts) per book id
+        """
+        with self.lock:
+            if not self.ready:
+                return
+            for book_id, count in counts.items():
+                slot = self.slots.get(book_id.int)
+                if slot is None or not count:
+                    continue
+                self._add_loans(slot, count)
+                if self.parents[slot] >= 0:
+                    self._add_loans(self.parents[slot], count)
+
+    def memory_usage(self) -> dict:
+        """
+        Entry counts and approximate memory footprint in bytes of the index
+        """
+        with self.lock:
+            containers = (self.slots, self.ids, self.labels, self.texts, self.kinds, self.ranks, self.parents, self.free)
+            entries = sum(map(sys.getsizeof, containers))
+            index = sys.getsizeof(self.words) + sys.getsizeof(self.postings)
+            cached = sys.getsizeof(self.top) + sys.getsizeof(self.matches)
+            # Copied under the lock, measured without holding it
+            labels, texts = list(self.labels), list(self.texts)
+            kinds, live = self.kinds[:], list(self.slots.values())
+            postings = [(word, self.postings[word]) for word in self.words]
+            queries = list(self.top.items()) + list(self.matches.items())
+            ready = self.ready
+
+        entries += sum(sys.getsizeof(label) for label in labels if label is not None)
+        entries += sum(sys.getsizeof(text) for text in texts if text is not None)
+        index += sum(sys.getsizeof(word) + sys.getsizeof(posting) for word, posting in postings)
+        cached += sum(sys.getsizeof(query) + sys.getsizeof(slots) for query, slots in queries)
+        books = sum(1 for slot in live if kinds[slot] == BOOK)
+        return {
+            "ready": ready,
+            "books": books,
+            "authors": len(live) - books,
+            "words": len(postings),
+            "cached_queries": len(queries),
+            "bytes": {"entries": entries, "index": index, "cached_queries": cached, "total": entries + index + cached},
+        }
+
+    # The methods below are called with the lock held
+
+    def _loans(self, slot: int) -> int:
+        return (slot - self.ranks[slot]) >> 32
+
+    def _suggestion(self, slot: int) -> dict:
+        return {"type": KINDS[self.kinds[slot]], "id": UUID(bytes=bytes(self.ids[slot * 16:slot * 16 + 16])), "text": self.labels[slot], "loan_count": self._loans(slot)}
+
+    def _range(self, term: str) -> Tuple[int, int]:
+        """
+        Range of `words` starting with `term`
+        """
+        start = bisect_left(self.words, term)
+        return start, bisect_left(self.words, term + "\U0010ffff", start)
+
+    def _search(self, terms: Tuple[str, ...], limit: int) -> List[int]:
+        """
+        Best `limit` slots matching every term
+        """
+        if len(terms) > 1:
+            matches = self._cached_matches(terms)
+            if matches is not None:
+                return nsmallest(limit, matches, key=self.ranks.__getitem__)
+
+        ranges = {term: self._range(term) for term in terms}
+        counts = {term: self._count(*ranges[term]) for term in terms}
+        # Walk the entries of the term with the fewest, filtering them with the others
+        term = min(terms, key=counts.__getitem__)
+        needles = [" " + other for other in terms if other != term]
+        if not needles:
+            return list(islice(self._ranked(term, *ranges[term]), limit))
+
+        narrow = [other for other in terms if ranges[other][1] - ranges[other][0] <= SUGGEST_MERGE_LIMIT]
+        intersect = len(narrow) > 1 and sum(counts[other] for other in narrow) <= SUGGEST_INTERSECT_LIMIT
+        budget = SUGGEST_WALK_LIMIT if intersect else -1
+        texts = self.texts
+        slots = []
+        for walked, slot in enumerate(self._ranked(term, *ranges[term])):
+            if walked == budget:
+                # Few entries have all the terms: intersect the entries of the narrow ones instead
+                matches = self._slots(*ranges[term])
+                for other in narrow:
+                    if other != term:
+                        matches &= self._slots(*ranges[other])
+                needles = [" " + other for other in terms if other not in narrow]
+                matches = array("I", self._filter(matches, needles))
+                self._cache_matches(terms, matches)
+                return nsmallest(limit, matches, key=self.ranks.__getitem__)
+            if all(map(texts[slot].__contains__, needles)):
+                slots.append(slot)
+                if len(slots) == limit:
+                    break
+        else:
+            # Every entry of the term was walked: these are all the matches
+            self._cache_matches(terms, array("I", slots))
+        return slots
+
+    def _cached_matches(self, terms: Tuple[str, ...]) -> Optional[array]:
+        """
+        Slots matching `terms`, filtered from the cached matches of the query
+        typed before (a shorter last term, or no last term), if any
+        """
+        if terms in self.matches:
+            self.matches.move_to_end(terms)
+            return self.matches[terms]
+        *head, last = terms
+        previous = [tuple(head) + (last[:end],) for end in range(len(last) - 1, 0, -1)]
+        if len(head) > 1:
+            previous.append(tuple(head))
+        for query in previous:
+            matches = self.matches.get(query)
+            if matches is not None:
+                matches = array("I", self._filter(matches, [" " + term for term in terms]))
+                self._cache_matches(terms, matches)
+                return matches
+        return None
+
+    def _cache_matches(self, terms: Tuple[str, ...], matches: array) -> None:
+        if len(matches) <= SUGGEST_CACHED_MATCHES:
+            self.matches[terms] = matches
+            while len(self.matches) > SUGGEST_MATCH_CACHE_SIZE:
+                self.matches.popitem(last=False)
+
+    def _filter(self, slots: Iterable[int], needles: List[str]) -> Iterator[int]:
+        texts = self.texts
+        return (slot for slot in slots if all(map(texts[slot].__contains__, needles)))
+
+    def _slots(self, start: int, stop: int) -> Set[int]:
+        slots = set()
+        for word in self.words[start:stop]:
+            slots.update(self.postings[word])
+        return slots
+
+    def _count(self, start: int, stop: int) -> int:
+        """
+        Number of entries of the words in a range (those in several words
+        count more than once), only added up for narrow ranges
+        """
+        if stop - start > SUGGEST_MERGE_LIMIT:
+            return sys.maxsize - (stop - start)
+        return sum(len(self.postings[word]) for word in self.words[start:stop])
+
+    def _ranked(self, term: str, start: int, stop: int) -> Iterator[int]:
+        """
+        Slots of the entries having a word starting with `term`, best first
+        """
+        if stop - start == 1:
+            return iter(self.postings[self.words[start]])
+        if stop - start <= SUGGEST_MERGE_LIMIT:
+            return self._merge(start, stop)
+        best = self.top.get(term)
+        if best is None:
+            best = self.top[term] = list(islice(self._merge(start, stop), SUGGEST_MAX_LIMIT))
+        if len(best) < SUGGEST_MAX_LIMIT:
+            return iter(best)
+        # The cached slots are the first ones of the merge, which only runs when they are not enough
+        return (slot for slots in (best, islice(self._merge(start, stop), len(best), None)) for slot in slots)
+
+    def _merge(self, start: int, stop: int) -> Iterator[int]:
+        """
+        Merge the slots of the words in a range, best first and once each
+        (ranks are distinct, so an entry's occurrences come out in a row)
+        """
+        previous = None
+        for slot in merge(*(self.postings[word] for word in self.words[start:stop]), key=self.ranks.__getitem__):
+            if slot != previous:
+                previous = slot
+                yield slot
+
+    def _prefixes(self, slot: int) -> Set[str]:
+        return {word[:end] for word in self.texts[slot].split() for end in range(1, len(word) + 1)}
+
+    def _add(self, kind: int, id: UUID, label: str, parent: int, loans: int) -> int:
+        """
+        Store a new entry and index its words (when building, `words` and the
+        postings are sorted afterwards)
+        """
+        text = " " + normalize(label)
+        if self.free:
+            slot = self.free.pop()
+            self.ids[slot * 16:slot * 16 + 16] = id.bytes
+            self.labels[slot], self.texts[slot] = label, text
+            self.kinds[slot], self.ranks[slot], self.parents[slot] = kind, slot - (loans << 32), parent
+        else:
+            slot = len(self.labels)
+            self.ids += id.bytes
+            self.labels.append(label)
+            self.texts.append(text)
+            self.kinds.append(kind)
+            self.ranks.append(slot - (loans << 32))
+            self.parents.append(parent)
+        self.slots[id.int] = slot
+        self._index(slot)
+        return slot
+
+    def _put(self, kind: int, id: UUID, label: str, parent: int) -> None:
+        """
+        Add an entry, or update the label and author of an existing one
+        """
+        slot = self.slots.get(id.int)
+        if slot is None:
+            self._add(kind, id, label, parent, 0)
+            return
+        if label != self.labels[slot]:
+            self._unindex(slot)
+            self.labels[slot], self.texts[slot] = label, " " + normalize(label)
+            self._index(slot)
+        if parent != self.parents[slot]:
+            loans = self._loans(slot)
+            if self.parents[slot] >= 0:
+                self._add_loans(self.parents[slot], -loans)
+            self.parents[slot] = parent
+            if parent >= 0:
+                self._add_loans(parent, loans)
+
+    def _index(self, slot: int) -> None:
+        self.matches.clear()
+        for word in set(self.texts[slot].split()):
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = array("I")
+                if self.ready:
+                    insort(self.words, word)
+                else:
+                    self.words.append(word)
+            if self.ready:
+                insort(posting, slot, key=self.ranks.__getitem__)
+            else:
+                posting.append(slot)
+        if self.top:
+            self._promote(slot)
+
+    def _unindex(self, slot: int) -> None:
+        self.matches.clear()
+        self._forget(slot)
+        for word in set(self.texts[slot].split()):
+            posting = self.postings[word]
+            del posting[bisect_left(posting, self.ranks[slot], key=self.ranks.__getitem__)]
+            if not posting:
+                del self.postings[word]
+                del self.words[bisect_left(self.words, word)]
+
+    def _add_loans(self, slot: int, count: int) -> None:
+        """
+        Change the loan count of an entry, moving it in the postings of its words
+        """
+        if not count:
+            return
+        if count < 0:
+            self._forget(slot)
+        words = set(self.texts[slot].split())
+        for word in words:
+            posting = self.postings[word]
+            del posting[bisect_left(posting, self.ranks[slot], key=self.ranks.__getitem__)]
+        self.ranks[slot] -= count << 32
+        for word in words:
+            insort(self.postings[word], slot, key=self.ranks.__getitem__)
+        if count > 0:
+            self._promote(slot)
+
+    def _promote(self, slot: int) -> None:
+        """
+        Rank an entry that was added or gained loans in the cached top lists
+        """
+        rank = self.ranks[slot]
+        for prefix in self._prefixes(slot) & self.top.keys():
+            best = self.top[prefix]
+            if slot in best:
+                best.sort(key=self.ranks.__getitem__)
+            elif len(best) < SUGGEST_MAX_LIMIT or rank < self.ranks[best[-1]]:
+                insort(best, slot, key=self.ranks.__getitem__)
+                del best[SUGGEST_MAX_LIMIT:]
+
+    def _forget(self, slot: int) -> None:
+        """
+        Drop the cached top lists an entry may fall out of
+        """
+        for prefix in self._prefixes(slot) & self.top.keys():
+            if slot in self.top[prefix]:
+                del self.top[prefix]
+
+
+# Index of the /suggest endpoint, built at startup
+suggest_index = SuggestIndex()
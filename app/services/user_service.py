@@ -1,15 +1,20 @@
 from typing import List, Optional
 from uuid import UUID
+from sqlalchemy import exists
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 from app.models.user import User
 from app.models.loan import Loan
 from app.schemas.user import UserCreate, UserUpdate
-from app.services.base_service import BaseService
+from app.services.base_service import AsyncBaseService, BaseService
+from app.services.result_cache import cached_result
 
 class UserService(BaseService[User, UserCreate, UserUpdate]):
     """
     Service for User operations with custom business logic
     """
+    includable = ("loans",)
+    
     def __init__(self):
         super().__init__(User)
     
@@ -18,29 +23,29 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         """
         Get a user with their loan history
         """
-        user = self.get_by_id(db, user_id)
+        user = self.get_by_id(db, user_id, options=[selectinload(User.loans)])
         return user
     
     # Get users with active loans
-    def get_users_with_active_loans(self, db: Session, skip: int = 0, limit: int = 100):
+    def get_users_with_active_loans(self, db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include: Optional[str] = None):
         """
         Get users who have active loans
         Business transformation: filter users based on related records
         """
-        # First get all active loans
-        statement = select(Loan).where(Loan.is_returned == False)
-        loans = db.exec(statement).all()
-        
-        # Extract unique user IDs from active loans
-        user_ids = set(loan.user_id for loan in loans)
+        # Walk users in page order and keep those with at least one active loan,
+        # so the database can stop as soon as the page is full
+        has_active_loan = exists().where(Loan.user_id == User.id, Loan.is_returned == False)
         
-        # Get users with those IDs
-        statement = select(User).where(User.id.in_(user_ids)).offset(skip).limit(limit)
+        statement = self.paginate(
+            select(User).where(has_active_loan),
+            skip=skip, limit=limit, cursor=cursor, include=include
+        )
         results = db.exec(statement).all()
         
         return results
     
     # Business transformation - Create user activity summary
+    @cached_result("users", "loans")
     def get_user_activity_summary(self, db: Session, user_id: UUID):
         """
         Get a summary of a user's library activity
@@ -76,4 +81,5 @@ class UserService(BaseService[User, UserCreate, UserUpdate]):
         return summary
 
 # Create a singleton instance
-user_service = UserService() 
\ No newline at end of file
+user_service = UserService()
+async_user_service = AsyncBaseService(user_service)
@@ -0,0 +1,96 @@
+"""
+Compare request throughput with the sync and the asyncio database layers.
+
+    python -m benchmarks.async_engine [requests] [concurrency]
+
+Each mode runs in its own process (DB_ASYNC is read when the app is imported)
+against the same seeded database. Requests go through the ASGI app in process,
+so the numbers measure the app and the database driver, not the network.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Endpoints hit round-robin by the clients
+PATHS = [
+    "/api/v1/books/?limit=20",
+    "/api/v1/books/available?limit=20",
+    "/api/v1/users/with-active-loans?limit=20",
+    "/api/v1/loans/overdue?limit=20",
+    "/api/v1/loans/statistics",
+]
+
+
+async def run_clients(requests: int, concurrency: int) -> float:
+    """
+    Send `requests` GETs from `concurrency` clients and return the wall time
+    """
+    import httpx
+    from app.main import app
+    from app.db.session import close_db
+
+    transport = httpx.ASGITransport(app=app)
+    counter = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in counter:
+                response = await client.get(PATHS[i % len(PATHS)])
+                assert response.status_code == 200, response.text
+
+        # Warm up the connection pools before timing
+        await asyncio.gather(*(client.get(path) for path in PATHS))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    await close_db()
+    return elapsed
+
+
+def child(requests: int, concurrency: int) -> None:
+    elapsed = asyncio.run(run_clients(requests, concurrency))
+    mode = "async" if os.environ["DB_ASYNC"] == "1" else "sync"
+    print(f"{mode:>5}: {requests} requests in {elapsed:.3f}s ({requests / elapsed:,.0f} req/s)")
+
+
+def seed(database_url: str) -> None:
+    from sqlmodel import create_engine
+    from app.db.migrate import run_migrations
+    from benchmarks.common import seed_authors, seed_books, seed_loans, seed_users
+
+    engine = create_engine(database_url)
+    run_migrations(engine)
+    book_ids = seed_books(engine, 10_000, seed_authors(engine, 500))
+    seed_loans(engine, 20_000, book_ids, seed_users(engine, 1_000))
+    engine.dispose()
+
+
+def main(requests: int = 2000, concurrency: int = 32):
+    path = os.path.join(tempfile.mkdtemp(prefix="library-bench-"), "bench.db")
+    database_url = f"sqlite:///{path}"
+    seed(database_url)
+
+    for flag in ("0", "1"):
+        env = dict(
+            os.environ,
+            DATABASE_URL=database_url,
+            DB_ASYNC=flag,
+            ENVIRONMENT="testing",
+            QUERY_PLAN_CHECK="false",
+        )
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.async_engine", "--child", str(requests), str(concurrency)],
+            env=env,
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(*[int(arg) for arg in sys.argv[2:]])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
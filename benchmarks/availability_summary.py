@@ -0,0 +1,66 @@
+"""
+Compare the in-memory availability summary with the GROUP BY implementation.
+
+    python -m benchmarks.availability_summary [sizes...]
+
+Defaults to 10k, 100k and 1M books.
+"""
+import sys
+
+from sqlmodel import Session, select
+
+from app.models.book import Book
+from app.services.book_service import book_service
+from benchmarks.common import measure, parse_sizes, seed_authors, seed_books, temp_engine
+
+
+def legacy_summary(db: Session):
+    """
+    Previous implementation: load every book and group them in python
+    """
+    books = db.exec(select(Book)).all()
+    genres = {}
+    for book in books:
+        genre_name = book.genre or "Uncategorized"
+        if genre_name not in genres:
+            genres[genre_name] = {"total": 0, "available": 0, "books": []}
+        genres[genre_name]["total"] += 1
+        genres[genre_name]["available"] += book.available_copies
+        genres[genre_name]["books"].append({
+            "id": str(book.id),
+            "title": book.title,
+            "available_copies": book.available_copies
+        })
+    return genres
+
+
+def main(sizes):
+    print(f"{'books':>10} {'variant':<22} {'time (s)':>10} {'peak (MB)':>10}")
+    for size in sizes:
+        engine = temp_engine()
+        seed_books(engine, size, seed_authors(engine, max(size // 50, 1)))
+
+        variants = {
+            "legacy (python)": lambda db: legacy_summary(db),
+            "group by": lambda db: book_service.get_book_availability_summary(db),
+            "group by + books": lambda db: book_service.get_book_availability_summary(db, include_books=True),
+        }
+        results = {}
+        for name, variant in variants.items():
+            def run():
+                with Session(engine) as db:
+                    return variant(db)
+            elapsed, peak = measure(run, repeat=1 if size >= 1_000_000 else 3)
+            results[name] = run()
+            print(f"{size:>10} {name:<22} {elapsed:>10.3f} {peak / 2**20:>10.1f}")
+
+        legacy = results["legacy (python)"]
+        for name in ("group by", "group by + books"):
+            for genre, summary in results[name].items():
+                assert summary["total"] == legacy[genre]["total"], (name, genre)
+                assert summary["available"] == legacy[genre]["available"], (name, genre)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main(parse_sizes(sys.argv[1:], [10_000, 100_000, 1_000_000]))
@@ -0,0 +1,151 @@
+"""
+Measure the latency of the full-text book search.
+
+    python -m benchmarks.book_search [sizes...]
+
+Defaults to 100k and 1M books. Titles, descriptions and author names are
+drawn from a synthetic vocabulary with a Zipf distribution, so there are
+rare, common and very common words. Books are inserted through the
+migrated schema, so the triggers index them as the catalog import would.
+For each query the median latency of the first page, and of the tenth page
+reached through the cursor, is compared with finding the books containing
+its first word with LIKE '%word%' (a full scan, whatever the word).
+"""
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+# Searches measured, `{rare}`... are filled with words of the vocabulary
+QUERIES = ["{rare}", "{common}", "{frequent}", "{common} {rare}", "{prefix}*", "{author}"]
+
+VOCABULARY_SIZE = 20_000
+PAGE_SIZE = 20
+RUNS = 20
+
+
+def vocabulary(rng: random.Random):
+    """
+    Distinct pronounceable words, most frequent first, with their cumulative Zipf weights
+    """
+    syllables = [c + v for c in "bdfgklmnprstvz" for v in "aeiou"]
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choices(syllables, k=rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words, list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+
+def seed(engine, count: int, first: int, author_ids, words, weights, rng: random.Random) -> None:
+    from sqlalchemy import insert
+    from app.models.book import Book
+
+    start = datetime.utcnow() - timedelta(days=365)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(first, first + count):
+            batch.append({
+                "id": uuid4(),
+                "created_at": start + timedelta(seconds=i),
+                "title": " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(2, 5))).capitalize(),
+                "isbn": f"{i:013d}",
+                "description": " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(8, 20))).capitalize() + ".",
+                "available_copies": 1,
+                "author_id": rng.choice(author_ids),
+            })
+            if len(batch) >= 10_000:
+                conn.execute(insert(Book.__table__), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Book.__table__), batch)
+
+
+def median_ms(fn) -> float:
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main(sizes):
+    path = os.path.join(tempfile.mkdtemp(prefix="library-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("ENVIRONMENT", "production")
+
+    from sqlalchemy import func, insert, literal_column, or_
+    from sqlmodel import Session, create_engine, select
+    from app.db.migrate import run_migrations
+    from app.db.search_index import books_fts, build_match_query, rebuild_search_index
+    from app.models.author import Author
+    from app.models.book import Book
+    from app.services.book_service import book_service
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    run_migrations(engine)
+
+    rng = random.Random(42)
+    words, weights = vocabulary(rng)
+    authors = [{"id": uuid4(), "created_at": datetime.utcnow(), "name": f"{a.capitalize()} {b.capitalize()}"}
+               for a, b in zip(rng.sample(words, 10_000), rng.sample(words, 10_000))]
+    with engine.begin() as conn:
+        conn.execute(insert(Author.__table__), authors)
+    author_ids = [author["id"] for author in authors]
+
+    fill = {
+        "rare": words[5_000], "common": words[100], "frequent": words[0],
+        "prefix": words[50][:3], "author": authors[0]["name"],
+    }
+    queries = [query.format(**fill) for query in QUERIES]
+
+    seeded = 0
+    for size in sizes:
+        start = time.perf_counter()
+        seed(engine, size - seeded, seeded, author_ids, words, weights, rng)
+        print(f"\n{size:,} books (inserted and indexed {size - seeded:,} in {time.perf_counter() - start:.1f}s)")
+        seeded = size
+
+        print(f"{'query':<24} {'matches':>9} {'page 1 (ms)':>12} {'page 10 (ms)':>13} {'LIKE (ms)':>10}")
+        with Session(engine) as db:
+            for q in queries:
+                def first_page():
+                    return book_service.search(db, q, limit=PAGE_SIZE)
+
+                tenth_page = None
+                for _ in range(9):
+                    _, tenth_page = book_service.search(db, q, limit=PAGE_SIZE, cursor=tenth_page)
+                    if tenth_page is None:
+                        break
+
+                def deep_page():
+                    return book_service.search(db, q, limit=PAGE_SIZE, cursor=tenth_page)
+
+                word = q.split()[0].rstrip("*")
+
+                def like_scan():
+                    return db.exec(
+                        select(Book.id).where(or_(Book.title.contains(word), Book.description.contains(word)))
+                    ).all()
+
+                matches = db.exec(
+                    select(func.count()).select_from(books_fts).where(literal_column(books_fts.name).match(build_match_query(q)))
+                ).one()
+                deep = f"{median_ms(deep_page):>13.2f}" if tenth_page else f"{'-':>13}"
+                print(f"{q:<24} {matches:>9,} {median_ms(first_page):>12.2f} {deep} {median_ms(like_scan):>10.2f}")
+
+    start = time.perf_counter()
+    rebuild_search_index(engine)
+    print(f"\nRebuilt the index of {seeded:,} books in {time.perf_counter() - start:.1f}s")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    # Not benchmarks.common.parse_sizes: importing it would load the settings before DATABASE_URL is set
+    main([int(arg.replace("_", "")) for arg in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,71 @@
+"""
+Time bulk checkouts and returns against one request per loan.
+
+    python -m benchmarks.bulk_loans [loans]
+
+Defaults to 1,000 loans spread over 200 books.
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlmodel import Session
+
+from app.schemas.loan import LoanCreate
+from app.services.loan_service import loan_service
+from benchmarks.common import seed_authors, seed_books, seed_users, temp_engine
+
+
+def main(count: int = 1000):
+    due_date = date.today() + timedelta(days=14)
+
+    def dataset():
+        rng = random.Random(42)
+        engine = temp_engine()
+        book_ids = seed_books(engine, max(count // 5, 1), seed_authors(engine, 10), copies=10)
+        user_ids = seed_users(engine, 100)
+        items = [
+            LoanCreate(book_id=rng.choice(book_ids), user_id=rng.choice(user_ids), due_date=due_date)
+            for _ in range(count)
+        ]
+        return engine, items
+
+    # One transaction per loan, as with POST /loans and POST /loans/{id}/return
+    engine, items = dataset()
+    loan_ids = []
+    start = time.perf_counter()
+    for item in items:
+        with Session(engine) as db:
+            try:
+                loan_ids.append(loan_service.create(db, obj_in=item).id)
+            except Exception:
+                pass
+    single_create = time.perf_counter() - start
+    start = time.perf_counter()
+    for loan_id in loan_ids:
+        with Session(engine) as db:
+            loan_service.return_book(db, loan_id)
+    single_return = time.perf_counter() - start
+    print(f"single:  {len(loan_ids)} created in {single_create:.3f}s, returned in {single_return:.3f}s")
+
+    # POST /loans/bulk and POST /loans/bulk-return
+    engine, items = dataset()
+    start = time.perf_counter()
+    with Session(engine) as db:
+        created = loan_service.bulk_create(db, items=items)
+    bulk_create = time.perf_counter() - start
+    loan_ids = [result["loan"]["id"] for result in created["results"] if "loan" in result]
+    start = time.perf_counter()
+    with Session(engine) as db:
+        returned = loan_service.bulk_return(db, loan_ids=loan_ids)
+    bulk_return = time.perf_counter() - start
+    print(
+        f"bulk:    {created['succeeded']} created in {bulk_create:.3f}s, "
+        f"{returned['succeeded']} returned in {bulk_return:.3f}s"
+    )
+    assert returned["succeeded"] == created["succeeded"]
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,168 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database so they never touch the
+application database. Run them from the project root, e.g.:
+
+    python -m benchmarks.availability_summary
+"""
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+from sqlmodel import SQLModel, create_engine
+
+from app.db.session import install_sqlite_pragmas
+from app.models import Author, Book, Loan, User
+
+GENRES = [
+    "Fantasy", "Science Fiction", "Mystery", "Romance", "Horror", "Dystopian",
+    "Historical", "Biography", "Poetry", "Political Satire", None
+]
+
+# Rows inserted per executemany call while seeding
+SEED_BATCH_SIZE = 10_000
+
+
+def temp_engine(name: str = "bench.db", pragmas: Optional[Dict[str, Any]] = None, **kwargs) -> Engine:
+    """
+    Create an engine on a fresh SQLite file with all tables created
+
+    `pragmas` are applied to every connection, as the application engine does
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="library-bench-"), name)
+    kwargs.setdefault("connect_args", {"check_same_thread": False})
+    engine = create_engine(f"sqlite:///{path}", **kwargs)
+    if pragmas:
+        install_sqlite_pragmas(engine, pragmas)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def _insert_batches(engine: Engine, table, rows: Iterable[dict]) -> None:
+    batch = []
+    with engine.begin() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= SEED_BATCH_SIZE:
+                conn.execute(insert(table), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(table), batch)
+
+
+def seed_authors(engine: Engine, count: int) -> List:
+    """
+    Insert `count` authors and return their ids
+    """
+    ids = [uuid4() for _ in range(count)]
+    now = datetime.utcnow()
+    _insert_batches(engine, Author.__table__, (
+        {"id": author_id, "created_at": now, "name": f"Author {i}", "birth_year": 1900 + i % 100}
+        for i, author_id in enumerate(ids)
+    ))
+    return ids
+
+
+def seed_books(engine: Engine, count: int, author_ids: List, copies: int = 3, seed: int = 42) -> List:
+    """
+    Insert `count` books spread over the given authors and return their ids
+    """
+    rng = random.Random(seed)
+    ids = [uuid4() for _ in range(count)]
+    start = datetime.utcnow() - timedelta(days=365)
+    _insert_batches(engine, Book.__table__, (
+        {
+            "id": book_id,
+            "created_at": start + timedelta(seconds=i),
+            "title": f"Book {i}",
+            "isbn": f"{i:013d}",
+            "publication_year": rng.randint(1850, 2024),
+            "genre": rng.choice(GENRES),
+            "description": f"Description of book {i}",
+            "available_copies": rng.randint(0, copies),
+            "author_id": rng.choice(author_ids),
+        }
+        for i, book_id in enumerate(ids)
+    ))
+    return ids
+
+
+def seed_users(engine: Engine, count: int) -> List:
+    """
+    Insert `count` users and return their ids
+    """
+    ids = [uuid4() for _ in range(count)]
+    now = datetime.utcnow()
+    _insert_batches(engine, User.__table__, (
+        {
+            "id": user_id,
+            "created_at": now,
+            "username": f"user{i}",
+            "email": f"user{i}@example.com",
+            "full_name": f"User {i}",
+            "is_active": True,
+        }
+        for i, user_id in enumerate(ids)
+    ))
+    return ids
+
+
+def seed_loans(engine: Engine, count: int, book_ids: List, user_ids: List, seed: int = 42) -> None:
+    """
+    Insert `count` loans, roughly half of them returned and some overdue
+    """
+    rng = random.Random(seed)
+    today = datetime.utcnow().date()
+    start = datetime.utcnow() - timedelta(days=365)
+
+    def rows():
+        for i in range(count):
+            loan_date = today - timedelta(days=rng.randint(0, 365))
+            returned = rng.random() < 0.5
+            yield {
+                "id": uuid4(),
+                "created_at": start + timedelta(seconds=i),
+                "loan_date": loan_date,
+                "due_date": loan_date + timedelta(days=14),
+                "return_date": loan_date + timedelta(days=rng.randint(1, 30)) if returned else None,
+                "is_returned": returned,
+                "book_id": rng.choice(book_ids),
+                "user_id": rng.choice(user_ids),
+            }
+
+    _insert_batches(engine, Loan.__table__, rows())
+
+
+def measure(fn: Callable[[], object], repeat: int = 3) -> Tuple[float, int]:
+    """
+    Return the best wall time (seconds) over `repeat` runs and the peak
+    memory allocated by python (bytes) during one extra traced run
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def parse_sizes(argv: List[str], default: List[int]) -> List[int]:
+    """
+    Read dataset sizes from the command line, e.g. `10000 100000`
+    """
+    return [int(arg.replace("_", "")) for arg in argv] or default
@@ -0,0 +1,65 @@
+"""
+Measure the streaming export of the loans table.
+
+    python -m benchmarks.export_streaming [sizes...]
+
+Defaults to 100k and 1M loans. The loans are added to the same database
+between sizes, and every format is fully consumed through the export service.
+The peak memory allocated by python during an export and the peak RSS of the
+process stay flat as the table grows, since rows are encoded batch by batch.
+SQLITE_MMAP_SIZE defaults to 0 here: mapped database pages would otherwise
+count in the RSS, up to the mmap size, whatever the export does.
+"""
+import os
+import resource
+import sys
+import tempfile
+
+FORMATS = [("ndjson", False), ("csv", False), ("ndjson", True)]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(sizes):
+    path = os.path.join(tempfile.mkdtemp(prefix="library-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("ENVIRONMENT", "production")
+    os.environ.setdefault("SQLITE_MMAP_SIZE", "0")
+
+    from sqlmodel import create_engine
+    from app.db.migrate import run_migrations
+    from app.models.loan import Loan
+    from app.services.export_service import export_service
+    from benchmarks.common import measure, seed_authors, seed_books, seed_loans, seed_users
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    run_migrations(engine)
+    book_ids = seed_books(engine, 1_000, seed_authors(engine, 100))
+    user_ids = seed_users(engine, 1_000)
+
+    print(f"{'loans':>10} {'format':<13} {'time (s)':>9} {'rows/s':>9} {'output (MB)':>12} {'peak (MB)':>10} {'peak RSS (MB)':>14}")
+    seeded = 0
+    for size in sizes:
+        seed_loans(engine, size - seeded, book_ids, user_ids, seed=size)
+        seeded = size
+        for format, gzip in FORMATS:
+            output = []
+
+            def run():
+                output[:] = [sum(len(chunk) for chunk in export_service.export(Loan, format, gzip=gzip))]
+
+            elapsed, peak = measure(run, repeat=1)
+            name = format + (" + gzip" if gzip else "")
+            print(
+                f"{size:>10,} {name:<13} {elapsed:>9.2f} {size / elapsed:>9,.0f} {output[0] / 2**20:>12.1f} "
+                f"{peak / 2**20:>10.1f} {peak_rss_mb():>14.1f}"
+            )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    # Not benchmarks.common.parse_sizes: importing it would load the settings before DATABASE_URL is set
+    main([int(arg.replace("_", "")) for arg in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,147 @@
+"""
+Compare the ways of rendering a 1,000 book page of /api/v1/books.
+
+    python -m benchmarks.json_rendering [requests] [concurrency]
+
+Three variants of the same listing are served in process through httpx's
+ASGI transport:
+
+- response_model + json: rows validated into BookWithIncludes by FastAPI
+  and encoded with the stdlib json module (the previous behaviour)
+- response_model + orjson: the same with the orjson default response class
+- RowSerializer + orjson: the /api/v1/books route, which encodes the column
+  values of the rows without building schema instances
+
+The rendering step alone is also timed on the loaded rows.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+# Page size of the measured requests
+LIMIT = 1000
+
+
+def add_response_model_routes(app) -> List[str]:
+    """
+    Add the listing as it was before RowSerializer, with each response class
+    """
+    from fastapi import Depends, Request, Response
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from app.api.dependencies import DBSession, get_db
+    from app.core.conditional import conditional_response
+    from app.core.pagination import set_next_cursor
+    from app.schemas.book import BookWithIncludes
+    from app.services.book_service import async_book_service
+
+    paths = []
+    for name, response_class in (("json", JSONResponse), ("orjson", ORJSONResponse)):
+        path = f"/bench/books-{name}"
+
+        @app.get(path, response_model=List[BookWithIncludes], response_model_exclude_unset=True, response_class=response_class)
+        async def get_books(
+            request: Request,
+            response: Response,
+            limit: int = 100,
+            include: Optional[str] = None,
+            db: DBSession = Depends(get_db)
+        ):
+            results = await async_book_service.get_all(db, limit=limit, include=include)
+            set_next_cursor(response, results, limit)
+            return conditional_response(request, response, results)
+
+        paths.append(path)
+    return paths
+
+
+async def throughput(app, path: str, requests: int, concurrency: int) -> float:
+    """
+    Requests per second sending `requests` GETs to `path` from `concurrency` clients
+    """
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(requests))
+
+        async def worker():
+            for _ in counter:
+                response = await client.get(path)
+                assert response.status_code == 200, response.text
+
+        # Warm up before timing
+        for _ in range(10):
+            await client.get(path)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+def render_times(engine) -> dict:
+    """
+    Time spent turning one loaded page into JSON bytes, per variant
+    """
+    import json
+    import orjson
+    from pydantic import TypeAdapter
+    from sqlmodel import Session
+    from app.api.routes.books import book_list
+    from app.schemas.book import BookWithIncludes
+    from app.services.book_service import book_service
+    from benchmarks.common import measure
+
+    adapter = TypeAdapter(List[BookWithIncludes])
+
+    def response_model(dumps):
+        def render():
+            data = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json", exclude_unset=True)
+            return dumps(data)
+        return render
+
+    with Session(engine) as db:
+        rows = book_service.get_all(db, limit=LIMIT, include="author")
+        variants = {
+            "response_model + json": response_model(lambda data: json.dumps(data).encode()),
+            "response_model + orjson": response_model(orjson.dumps),
+            "RowSerializer + orjson": lambda: book_list.render(rows),
+        }
+        return {name: measure(render, repeat=20)[0] for name, render in variants.items()}
+
+
+def main(requests: int = 100, concurrency: int = 4):
+    path = os.path.join(tempfile.mkdtemp(prefix="library-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("ENVIRONMENT", "production")
+    os.environ.setdefault("QUERY_PLAN_CHECK", "false")
+
+    from sqlmodel import create_engine
+    from app.db.migrate import run_migrations
+    from benchmarks.common import seed_authors, seed_books
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    run_migrations(engine)
+    seed_books(engine, 5_000, seed_authors(engine, 100))
+
+    from app.main import app
+
+    json_path, orjson_path = add_response_model_routes(app)
+    variants = {
+        "response_model + json": json_path,
+        "response_model + orjson": orjson_path,
+        "RowSerializer + orjson": "/api/v1/books/",
+    }
+    renders = render_times(engine)
+    engine.dispose()
+
+    print(f"{'':>25} {'render (ms)':>12} {'limit=' + str(LIMIT):>14} {'include=author':>16}")
+    for name, path in variants.items():
+        plain = asyncio.run(throughput(app, f"{path}?limit={LIMIT}", requests, concurrency))
+        included = asyncio.run(throughput(app, f"{path}?limit={LIMIT}&include=author", requests, concurrency))
+        print(f"{name:>25} {renders[name] * 1000:>12.2f} {plain:>8,.0f} req/s {included:>10,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,119 @@
+"""
+Concurrency stress test for checkouts and returns of a single popular book.
+
+    python -m benchmarks.loan_contention [threads] [copies] [attempts_per_thread]
+
+Many threads hammer the same book through LoanService.create and then return
+every loan through LoanService.return_book. The script asserts that no copy is
+oversold or lost and reports the throughput of both phases.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, func, select
+
+from app.models import Book, Loan
+from app.schemas.loan import LoanCreate
+from app.services.loan_service import loan_service
+from benchmarks.common import seed_authors, seed_books, seed_users, temp_engine
+
+
+def hammer(threads: int, worker) -> Counter:
+    """
+    Run `worker(index, outcomes)` on `threads` threads started together
+    """
+    outcomes = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def run(index):
+        local = Counter()
+        barrier.wait()
+        worker(index, local)
+        with lock:
+            outcomes.update(local)
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return outcomes
+
+
+def main(threads: int = 16, copies: int = 200, attempts: int = 25):
+    engine = temp_engine(connect_args={"check_same_thread": False, "timeout": 30})
+    book_id = seed_books(engine, 1, seed_authors(engine, 1))[0]
+    user_ids = seed_users(engine, threads)
+    with Session(engine) as db:
+        book = db.get(Book, book_id)
+        book.available_copies = copies
+        db.add(book)
+        db.commit()
+
+    due_date = date.today() + timedelta(days=14)
+    loan_ids = []
+    loan_ids_lock = threading.Lock()
+
+    def checkout(index, outcomes):
+        for _ in range(attempts):
+            with Session(engine) as db:
+                try:
+                    loan = loan_service.create(db, obj_in=LoanCreate(
+                        book_id=book_id, user_id=user_ids[index], due_date=due_date
+                    ))
+                    with loan_ids_lock:
+                        loan_ids.append(loan.id)
+                    outcomes["created"] += 1
+                except HTTPException:
+                    outcomes["sold_out"] += 1
+                except OperationalError:
+                    outcomes["locked"] += 1
+
+    start = time.perf_counter()
+    outcomes = hammer(threads, checkout)
+    elapsed = time.perf_counter() - start
+    total = sum(outcomes.values())
+    print(f"checkouts: {dict(outcomes)} in {elapsed:.2f}s ({total / elapsed:.0f} ops/s)")
+
+    with Session(engine) as db:
+        available = db.get(Book, book_id).available_copies
+        loans = db.exec(select(func.count()).select_from(Loan)).one()
+    assert outcomes["created"] == loans == len(loan_ids), (outcomes, loans)
+    assert available == copies - loans >= 0, (available, loans)
+
+    # Every loan is returned twice concurrently: exactly one return may win
+    chunks = [loan_ids[i::threads] for i in range(threads)]
+
+    def give_back(index, outcomes):
+        for loan_id in chunks[index] + chunks[(index + 1) % threads]:
+            with Session(engine) as db:
+                try:
+                    loan_service.return_book(db, loan_id)
+                    outcomes["returned"] += 1
+                except HTTPException:
+                    outcomes["already_returned"] += 1
+                except OperationalError:
+                    outcomes["locked"] += 1
+
+    start = time.perf_counter()
+    outcomes = hammer(threads, give_back)
+    elapsed = time.perf_counter() - start
+    total = sum(outcomes.values())
+    print(f"returns:   {dict(outcomes)} in {elapsed:.2f}s ({total / elapsed:.0f} ops/s)")
+
+    with Session(engine) as db:
+        available = db.get(Book, book_id).available_copies
+        returned = db.exec(select(func.count()).select_from(Loan).where(Loan.is_returned == True)).one()
+    assert outcomes["returned"] == returned, (outcomes, returned)
+    assert available == copies - loans + returned, (available, loans, returned)
+    print(f"final available copies: {available} (expected {copies - loans + returned})")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,159 @@
+"""
+Compare request throughput with the previous BaseHTTPMiddleware stack and
+the pure ASGI RequestContextMiddleware.
+
+    python -m benchmarks.middleware_overhead [requests] [concurrency]
+
+The application is served in process through httpx's ASGI transport, once
+with each middleware stack, on /health (middleware overhead only) and on
+/api/v1/books/{id} (one database query). ENVIRONMENT defaults to production
+so request logging is off, as it would be in a deployment.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# Endpoints measured, {book_id} is filled with a seeded book
+PATHS = ["/health", "/api/v1/books/{book_id}"]
+
+
+def legacy_middleware():
+    """
+    CorrelationIdMiddleware and TimingMiddleware as they were before being
+    merged into RequestContextMiddleware
+    """
+    from fastapi import HTTPException, Request
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from app.core.config import settings
+    from app.core.errors import http_exception_handler
+    from app.core.metrics import http_request_duration_seconds, http_requests_in_flight
+    from app.core.middleware import UNMATCHED_ROUTE, logger, request_id_ctx_var
+    from app.db.instrumentation import (
+        DB_QUERIES_HEADER, DB_TIME_HEADER, QueryStats, get_query_budget, query_stats_ctx_var
+    )
+
+    class CorrelationIdMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            correlation_id = request.headers.get("X-Correlation-ID")
+            try:
+                if correlation_id is None or str(uuid.UUID(correlation_id)) != correlation_id:
+                    correlation_id = str(uuid.uuid4())
+            except ValueError:
+                correlation_id = str(uuid.uuid4())
+            request.state.correlation_id = correlation_id
+            token = request_id_ctx_var.set(correlation_id)
+            stats = QueryStats()
+            stats_token = query_stats_ctx_var.set(stats)
+            logger.info(f"Request started | Correlation ID: {correlation_id} | {request.method} {request.url.path}")
+            start_time = time.time()
+            try:
+                response = await call_next(request)
+                budget = get_query_budget(request.scope.get("endpoint"))
+                if budget is not None and stats.queries > budget:
+                    message = f"Query budget exceeded: {stats.queries} queries, budget is {budget}"
+                    logger.warning(message)
+                    if settings.QUERY_BUDGET_ENFORCE:
+                        response = http_exception_handler(request, HTTPException(status_code=500, detail=message))
+                response.headers["X-Correlation-ID"] = correlation_id
+                response.headers[DB_QUERIES_HEADER] = str(stats.queries)
+                response.headers[DB_TIME_HEADER] = f"{stats.time_ms:.1f}"
+                logger.info(
+                    f"Request completed | Correlation ID: {correlation_id} | "
+                    f"{request.method} {request.url.path} | "
+                    f"Status: {response.status_code} | Time: {time.time() - start_time:.3f}s | "
+                    f"DB: {stats.queries} queries in {stats.time_ms:.1f}ms"
+                )
+                return response
+            finally:
+                query_stats_ctx_var.reset(stats_token)
+                request_id_ctx_var.reset(token)
+
+    class TimingMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request: Request, call_next):
+            start_time = time.perf_counter()
+            http_requests_in_flight.inc()
+            status_code = 500
+            try:
+                response = await call_next(request)
+                status_code = response.status_code
+            finally:
+                process_time = time.perf_counter() - start_time
+                http_requests_in_flight.dec()
+                route = request.scope.get("route")
+                labels = (request.method, route.path if route is not None else UNMATCHED_ROUTE, str(status_code))
+                http_request_duration_seconds.observe(process_time, labels)
+            response.headers["X-Process-Time-Ms"] = str(int(process_time * 1000))
+            return response
+
+    return [CorrelationIdMiddleware, TimingMiddleware]
+
+
+def use_middleware(app, classes) -> None:
+    """
+    Replace the request context middleware of the app with `classes` (outermost last)
+    """
+    from starlette.middleware import Middleware
+    from app.core.middleware import RequestContextMiddleware
+
+    index = next(i for i, m in enumerate(app.user_middleware) if m.cls is RequestContextMiddleware)
+    app.user_middleware[index:index + 1] = [Middleware(cls) for cls in reversed(classes)]
+    app.middleware_stack = app.build_middleware_stack()
+
+
+async def throughput(app, path: str, requests: int, concurrency: int) -> float:
+    """
+    Requests per second sending `requests` GETs to `path` from `concurrency` clients
+    """
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        counter = iter(range(requests))
+
+        async def worker():
+            for _ in counter:
+                response = await client.get(path)
+                assert response.status_code == 200, response.text
+
+        # Warm up before timing
+        for _ in range(50):
+            await client.get(path)
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+def main(requests: int = 5000, concurrency: int = 8):
+    path = os.path.join(tempfile.mkdtemp(prefix="library-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("ENVIRONMENT", "production")
+    os.environ.setdefault("QUERY_PLAN_CHECK", "false")
+
+    from sqlmodel import create_engine
+    from app.db.migrate import run_migrations
+    from benchmarks.common import seed_authors, seed_books
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    run_migrations(engine)
+    book_id = seed_books(engine, 1_000, seed_authors(engine, 100))[0]
+    engine.dispose()
+
+    from app.main import app
+
+    paths = [p.format(book_id=book_id) for p in PATHS]
+    results = {}
+    for name, classes in (("pure ASGI", None), ("BaseHTTPMiddleware", legacy_middleware())):
+        if classes is not None:
+            use_middleware(app, classes)
+        results[name] = [asyncio.run(throughput(app, p, requests, concurrency)) for p in paths]
+
+    print(f"{'':>20}" + "".join(f"{p:>28}" for p in PATHS))
+    for name, rates in results.items():
+        print(f"{name:>20}" + "".join(f"{rate:>22,.0f} req/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
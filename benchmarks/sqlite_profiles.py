@@ -0,0 +1,116 @@
+"""
+Write-heavy load against SQLite with different connection profiles.
+
+    python -m benchmarks.sqlite_profiles [writers] [readers] [seconds]
+
+Writer threads check out and return books through LoanService while reader
+threads list overdue loans, for a fixed time per profile:
+
+- legacy:   the previous engine (rollback journal, default pragmas, no retries)
+- wal-full: WAL with synchronous=FULL, busy timeout and lock retries
+- tuned:    the application defaults from Settings (WAL, synchronous=NORMAL, ...)
+
+Reports the throughput of both kinds of requests and the writes that still
+failed with "database is locked".
+"""
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.session import get_sqlite_pragmas
+from app.schemas.loan import LoanCreate
+from app.services.loan_service import loan_service
+from benchmarks.common import seed_authors, seed_books, seed_loans, seed_users, temp_engine
+
+PROFILES = {
+    "legacy": {"pragmas": {}, "retries": 0, "engine": {}},
+    "wal-full": {
+        "pragmas": {**get_sqlite_pragmas(), "synchronous": "FULL"},
+        "retries": settings.DB_LOCK_RETRIES,
+        "engine": {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW},
+    },
+    "tuned": {
+        "pragmas": get_sqlite_pragmas(),
+        "retries": settings.DB_LOCK_RETRIES,
+        "engine": {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW},
+    },
+}
+
+
+def run_profile(name: str, writers: int, readers: int, seconds: float) -> None:
+    profile = PROFILES[name]
+    settings.DB_LOCK_RETRIES = profile["retries"]
+    engine = temp_engine(pragmas=profile["pragmas"], **profile["engine"])
+    book_ids = seed_books(engine, 200, seed_authors(engine, 20), copies=50)
+    user_ids = seed_users(engine, 500)
+    seed_loans(engine, 20_000, book_ids, user_ids)
+
+    due_date = date.today() + timedelta(days=14)
+    outcomes = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def writer(seed):
+        rng = random.Random(seed)
+        local = Counter()
+        while time.perf_counter() < deadline:
+            with Session(engine) as db:
+                try:
+                    loan = loan_service.create(db, obj_in=LoanCreate(
+                        book_id=rng.choice(book_ids), user_id=rng.choice(user_ids), due_date=due_date
+                    ))
+                    loan_service.return_book(db, loan.id)
+                    local["writes"] += 2
+                except HTTPException:
+                    local["rejected"] += 1
+                except OperationalError:
+                    db.rollback()
+                    local["locked"] += 1
+        with lock:
+            outcomes.update(local)
+
+    def reader(seed):
+        local = Counter()
+        while time.perf_counter() < deadline:
+            with Session(engine) as db:
+                try:
+                    loan_service.get_overdue_loans(db, limit=50)
+                    local["reads"] += 1
+                except OperationalError:
+                    local["read_locked"] += 1
+        with lock:
+            outcomes.update(local)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    print(
+        f"{name:>8}: {outcomes['writes'] / seconds:7.0f} writes/s, {outcomes['reads'] / seconds:7.0f} reads/s, "
+        f"{outcomes['locked']} locked writes, {outcomes['read_locked']} locked reads"
+    )
+
+
+def main(writers: int = 8, readers: int = 4, seconds: float = 5):
+    retries = settings.DB_LOCK_RETRIES
+    try:
+        for name in PROFILES:
+            run_profile(name, writers, readers, float(seconds))
+    finally:
+        settings.DB_LOCK_RETRIES = retries
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
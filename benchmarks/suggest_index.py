@@ -0,0 +1,151 @@
+"""
+Measure the latency and memory of the /suggest prefix index.
+
+    python -m benchmarks.suggest_index [sizes...]
+
+Defaults to 100k and 1M books (with one author per 10 books, and as many
+loans as books). Titles and names come from the Zipf vocabulary of
+benchmarks.book_search. The keystrokes of 1,000 titles and author names,
+typed one character at a time, are sent to the index in typing order,
+twice: the first pass computes the top suggestions of the broad prefixes
+and the matches of the narrow queries, the second one reads them. Index
+updates (new book, loan, rename) and a full garbage collection with the
+index in memory are timed too.
+"""
+import gc
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from benchmarks.book_search import vocabulary
+
+# Characters typed per title or name
+TYPED = 15
+TYPED_ENTRIES = 1_000
+LIMIT = 10
+
+
+def seed(engine, count: int, rng: random.Random):
+    from sqlalchemy import insert
+    from app.models.author import Author
+    from app.models.book import Book
+    from benchmarks.common import seed_loans, seed_users
+
+    words, weights = vocabulary(rng)
+    now = datetime.utcnow()
+    authors = [
+        {"id": uuid4(), "created_at": now, "name": " ".join(rng.choices(words, k=2)).title()}
+        for _ in range(max(1, count // 10))
+    ]
+    books = [
+        {
+            "id": uuid4(),
+            "created_at": now - timedelta(seconds=i),
+            "title": " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(2, 5))).capitalize(),
+            "isbn": f"{i:013d}",
+            "available_copies": 1,
+            "author_id": rng.choice(authors)["id"],
+        }
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(Author.__table__), authors)
+        for start in range(0, count, 10_000):
+            conn.execute(insert(Book.__table__), books[start:start + 10_000])
+    seed_loans(engine, count, [book["id"] for book in books], seed_users(engine, 1_000))
+    return authors, books
+
+
+def percentiles(times):
+    times = sorted(times)
+    return (
+        statistics.median(times) * 1000,
+        times[int(len(times) * 0.99)] * 1000,
+        times[-1] * 1000,
+    )
+
+
+def full_collection():
+    gc.collect()
+    start = time.perf_counter()
+    gc.collect()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(sizes):
+    directory = tempfile.mkdtemp(prefix="library-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'unused.db')}"
+    os.environ.setdefault("ENVIRONMENT", "production")
+
+    from sqlmodel import Session, create_engine
+    from app.db.migrate import run_migrations
+    from app.services.suggest_index import SuggestIndex
+
+    print(f"{'books':>10} {'build (s)':>10} {'index (MB)':>11} {'RSS +MB':>8} {'gc +ms':>8}  {'pass':<6} {'keystrokes':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}")
+    for size in sizes:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, f'bench-{size}.db')}")
+        run_migrations(engine)
+        rng = random.Random(size)
+        authors, books = seed(engine, size, rng)
+
+        index = SuggestIndex()
+        baseline = full_collection()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        with Session(engine) as db:
+            index.build(db)
+        build = time.perf_counter() - start
+        rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss) / 1024
+        # Time the index adds to every full garbage collection
+        collection = full_collection() - baseline
+        footprint = index.memory_usage()["bytes"]["total"] / 2**20
+
+        typed = [book["title"] for book in rng.sample(books, TYPED_ENTRIES // 2)]
+        typed += [author["name"] for author in rng.sample(authors, TYPED_ENTRIES // 2)]
+        keystrokes = [text[:end] for text in typed for end in range(1, min(len(text), TYPED) + 1) if not text[end - 1].isspace()]
+
+        first = True
+        for name in ("cold", "warm"):
+            times = []
+            for prefix in keystrokes:
+                start = time.perf_counter()
+                index.suggest(prefix, LIMIT)
+                times.append(time.perf_counter() - start)
+            p50, p99, worst = percentiles(times)
+            head = f"{size:>10,} {build:>10.1f} {footprint:>11.1f} {rss:>8.0f} {collection:>8.1f}" if first else " " * 51
+            print(f"{head}  {name:<6} {len(keystrokes):>10,} {p50:>9.3f} {p99:>9.3f} {worst:>9.3f}")
+            first = False
+
+        # Updates made by the services after their commits
+        class Row:
+            def __init__(self, **values):
+                self.__dict__.update(values)
+
+        updates = {"new book": [], "loan": [], "rename": []}
+        for i in range(1_000):
+            book = Row(id=uuid4(), title=rng.choice(typed), author_id=rng.choice(authors)["id"])
+            start = time.perf_counter()
+            index.put_book(book)
+            updates["new book"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            index.add_loans({rng.choice(books)["id"]: 1})
+            updates["loan"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            book.title = rng.choice(typed)
+            index.put_book(book)
+            updates["rename"].append(time.perf_counter() - start)
+        print(" " * 51 + "  " + ", ".join(
+            f"{name} p99 {percentiles(times)[1]:.3f} ms" for name, times in updates.items()
+        ))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    # Not benchmarks.common.parse_sizes: importing it would load the settings before DATABASE_URL is set
+    main([int(arg.replace("_", "")) for arg in sys.argv[1:]] or [100_000, 1_000_000])
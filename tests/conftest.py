@@ -0,0 +1,101 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from uuid import uuid4
+
+# Settings are read when app modules are imported: point them at a scratch database first
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='library-tests-'), 'test.db')}"
+os.environ["ENVIRONMENT"] = "testing"
+os.environ["LOG_DIR"] = ""
+os.environ["SQL_LOG_STATEMENTS"] = "false"
+
+import pytest
+from sqlmodel import Session
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from app.db.session import engine, init_db
+
+    init_db()
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # Runs the startup handlers (suggest index, query plan report)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def cold_caches():
+    """
+    Empty the entity and result caches, so requests run all their queries
+    """
+    from app.core.cache import entity_cache
+    from app.services.result_cache import result_cache
+
+    def clear():
+        for cache in (entity_cache, result_cache):
+            if cache is not None:
+                cache.clear()
+
+    clear()
+    return clear
+
+
+@pytest.fixture
+def make_author(client):
+    def make(**fields):
+        response = client.post("/api/v1/authors/", json={"name": "Test Author", **fields})
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make
+
+
+@pytest.fixture
+def make_book(client, make_author):
+    def make(author=None, **fields):
+        author = author or make_author()
+        body = {"title": "Test Book", "isbn": uuid4().hex[:13], "author_id": author["id"], **fields}
+        response = client.post("/api/v1/books/", json=body)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make
+
+
+@pytest.fixture
+def make_user(client):
+    def make(**fields):
+        name = uuid4().hex[:12]
+        body = {"username": name, "email": f"{name}@example.com", "full_name": "Test User", **fields}
+        response = client.post("/api/v1/users/", json=body)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make
+
+
+@pytest.fixture
+def make_loan(client, make_book, make_user):
+    def make(book=None, user=None, **fields):
+        book = book or make_book()
+        user = user or make_user()
+        body = {"book_id": book["id"], "user_id": user["id"], "due_date": (date.today() + timedelta(days=14)).isoformat(), **fields}
+        response = client.post("/api/v1/loans/", json=body)
+        assert response.status_code == 201, response.text
+        return response.json()
+
+    return make
@@ -0,0 +1,62 @@
+import asyncio
+from uuid import UUID
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.services import async_author_service, author_service
+
+
+def test_service_methods_are_awaitable(engine, make_author):
+    author = make_author(name="Awaited Author")
+    assert async_author_service.get_author_with_books.__name__ == "get_author_with_books"
+
+    async def read():
+        with Session(engine) as db:
+            return (await async_author_service.get_author_with_books(db, UUID(author["id"]))).name
+
+    assert asyncio.run(read()) == "Awaited Author"
+
+
+def test_unknown_method():
+    with pytest.raises(AttributeError):
+        async_author_service.no_such_method
+    assert async_author_service.model is author_service.model
+
+
+def test_responses_do_not_query_the_database_on_the_event_loop(client, engine, cold_caches, make_loan):
+    loan = make_loan()
+    book_id, user_id = loan["book_id"], loan["user_id"]
+    author_id = client.get(f"/api/v1/books/{book_id}").json()["author_id"]
+
+    # The service calls run in the threadpool: a statement run on the event
+    # loop thread comes from serializing the response (a lazy load)
+    on_event_loop = []
+
+    def check_thread(conn, cursor, statement, *args):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        on_event_loop.append(statement)
+
+    event.listen(engine, "before_cursor_execute", check_thread)
+    try:
+        for path in [
+            f"/api/v1/authors/{author_id}",
+            f"/api/v1/authors/{author_id}/books",
+            f"/api/v1/books/{book_id}/with-author",
+            f"/api/v1/loans/{loan['id']}/details",
+            f"/api/v1/users/{user_id}/loans",
+            "/api/v1/authors/?include=books",
+            "/api/v1/books/?include=author",
+            "/api/v1/loans/?include=book,user",
+            "/api/v1/users/?include=loans",
+        ]:
+            cold_caches()
+            response = client.get(path)
+            assert response.status_code == 200, (path, response.text)
+    finally:
+        event.remove(engine, "before_cursor_execute", check_thread)
+    assert on_event_loop == []
@@ -0,0 +1,58 @@
+from uuid import uuid4
+
+
+def test_stats_of_many_authors(client, cold_caches, make_author, make_book):
+    prolific, quiet, unpublished = make_author(name="Prolific"), make_author(name="Quiet"), make_author(name="Unpublished")
+    make_book(prolific, publication_year=1990, genre="Poetry")
+    make_book(prolific, publication_year=2000, genre="Essay")
+    make_book(prolific, publication_year=2020, genre="Poetry")
+    make_book(prolific)
+    make_book(quiet)
+
+    cold_caches()
+    ids = ",".join([quiet["id"], str(uuid4()), prolific["id"], unpublished["id"]])
+    response = client.get("/api/v1/authors/stats", params={"ids": ids})
+    assert response.status_code == 200, response.text
+    assert response.headers["X-DB-Queries"] == "2"
+    assert response.json() == [
+        {
+            "author_id": quiet["id"], "author_name": "Quiet", "book_count": 1, "average_publication_year": None,
+            "first_publication_year": None, "last_publication_year": None, "genres": []
+        },
+        {
+            "author_id": prolific["id"], "author_name": "Prolific", "book_count": 4, "average_publication_year": 2003.3333333333333,
+            "first_publication_year": 1990, "last_publication_year": 2020, "genres": ["Essay", "Poetry"]
+        },
+        {
+            "author_id": unpublished["id"], "author_name": "Unpublished", "book_count": 0, "average_publication_year": None,
+            "first_publication_year": None, "last_publication_year": None, "genres": []
+        },
+    ]
+
+
+def test_single_author_routes_share_the_aggregate(client, make_author, make_book):
+    author = make_author(name="Single")
+    make_book(author, publication_year=2001, genre="Drama")
+    make_book(author, publication_year=2004, genre="Drama")
+
+    stats = client.get(f"/api/v1/authors/{author['id']}/stats").json()
+    assert (stats["book_count"], stats["average_publication_year"]) == (2, 2002.5)
+    assert stats["name"] == "Single"
+
+
+def test_stats_pages(client, make_author):
+    for _ in range(3):
+        make_author()
+    response = client.get("/api/v1/authors/stats", params={"limit": 2})
+    assert len(response.json()) == 2
+    cursor = response.headers["X-Next-Cursor"]
+
+    next_page = client.get("/api/v1/authors/stats", params={"limit": 2, "cursor": cursor}).json()
+    assert next_page
+    assert not {entry["author_id"] for entry in next_page} & {entry["author_id"] for entry in response.json()}
+
+
+def test_invalid_ids(client):
+    assert client.get("/api/v1/authors/stats", params={"ids": "not-an-id"}).status_code == 400
+    too_many = ",".join(str(uuid4()) for _ in range(501))
+    assert client.get("/api/v1/authors/stats", params={"ids": too_many}).status_code == 400
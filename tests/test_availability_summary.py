@@ -0,0 +1,47 @@
+from uuid import UUID, uuid4
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.models import Book
+from app.services.book_service import book_service
+
+
+def test_totals_match_the_books_listed(client, cold_caches, make_author, make_book):
+    author = make_author()
+    genre = f"Summary {uuid4().hex}"
+    make_book(author, genre=genre, available_copies=2)
+    make_book(author, genre=genre, available_copies=0)
+
+    response = client.get("/api/v1/books/availability-summary", params={"include_books": "true"})
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary[genre]["total"] == 2
+    assert summary[genre]["available"] == 2
+    for totals in summary.values():
+        assert totals["total"] == len(totals["books"])
+        assert totals["available"] == sum(book["available_copies"] for book in totals["books"])
+
+    plain = client.get("/api/v1/books/availability-summary").json()
+    assert plain[genre] == {"total": 2, "available": 2}
+    assert list(plain) == list(summary)
+
+
+def test_book_created_in_a_new_genre_during_the_summary(engine, cold_caches, make_author):
+    author_id = UUID(make_author()["id"])
+    genre = f"Racing {uuid4().hex}"
+
+    # Another request commits a book in a genre the summary has not seen yet, right after its first query ran
+    def concurrent_create(conn, cursor, statement, parameters, context, executemany):
+        with Session(engine) as other:
+            other.add(Book(title="Racing", isbn=uuid4().hex[:13], genre=genre, author_id=author_id))
+            other.commit()
+
+    event.listen(engine, "after_cursor_execute", concurrent_create, once=True)
+    try:
+        with Session(engine) as db:
+            summary = book_service.get_book_availability_summary(db, include_books=True)
+    finally:
+        event.remove(engine, "after_cursor_execute", concurrent_create)
+    for totals in summary.values():
+        assert totals["total"] == len(totals["books"])
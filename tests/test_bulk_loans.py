@@ -0,0 +1,59 @@
+from datetime import date, timedelta
+from uuid import uuid4
+
+
+def item(book, user):
+    return {"book_id": book["id"], "user_id": user["id"], "due_date": (date.today() + timedelta(days=14)).isoformat()}
+
+
+def available_copies(client, book):
+    return client.get(f"/api/v1/books/{book['id']}").json()["available_copies"]
+
+
+def test_bulk_checkout_reports_each_item(client, make_book, make_user):
+    two_copies, sold_out = make_book(available_copies=2), make_book(available_copies=0)
+    user = make_user()
+    missing = {"id": str(uuid4())}
+
+    response = client.post("/api/v1/loans/bulk", json={"items": [
+        item(two_copies, user), item(sold_out, user), item(two_copies, user), item(missing, user), item(two_copies, user)
+    ]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+
+    assert [entry["status"] for entry in result["results"]] == [201, 400, 201, 404, 400]
+    assert [entry["index"] for entry in result["results"]] == [0, 1, 2, 3, 4]
+    assert (result["succeeded"], result["failed"]) == (2, 3)
+    assert result["results"][0]["loan"]["book_id"] == two_copies["id"]
+    assert result["results"][1]["loan"] is None and result["results"][1]["error"]
+    assert available_copies(client, two_copies) == 0
+    assert available_copies(client, sold_out) == 0
+
+
+def test_bulk_return(client, make_book, make_loan):
+    book = make_book(available_copies=2)
+    first, second = make_loan(book), make_loan(book)
+    client.post(f"/api/v1/loans/{second['id']}/return")
+
+    response = client.post("/api/v1/loans/bulk-return", json={"loan_ids": [first["id"], second["id"], str(uuid4()), first["id"]]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+
+    assert [entry["status"] for entry in result["results"]] == [200, 400, 404, 400]
+    assert result["results"][0]["loan"]["is_returned"] is True
+    assert (result["succeeded"], result["failed"]) == (1, 3)
+    assert available_copies(client, book) == 2
+
+
+def test_bulk_requests_are_bounded(client):
+    assert client.post("/api/v1/loans/bulk", json={"items": []}).status_code == 422
+    assert client.post("/api/v1/loans/bulk-return", json={"loan_ids": []}).status_code == 422
+
+
+def test_bulk_checkout_of_many_loans(client, make_book, make_user):
+    book = make_book(available_copies=300)
+    user = make_user()
+    response = client.post("/api/v1/loans/bulk", json={"items": [item(book, user)] * 300})
+    assert response.json()["succeeded"] == 300
+    assert int(response.headers["X-DB-Queries"]) < 10
+    assert available_copies(client, book) == 0
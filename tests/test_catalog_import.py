@@ -0,0 +1,75 @@
+import json
+import sys
+from uuid import uuid4
+
+from sqlmodel import select
+
+from app.models import Author
+from app.services.import_service import import_service
+
+# The package exports the service singleton under the module's name
+service_module = sys.modules["app.services.import_service"]
+
+
+def upload(client, content: bytes, filename: str = "catalog.ndjson"):
+    return client.post("/api/v1/import/catalog", files={"file": (filename, content)})
+
+
+def ndjson(*records) -> bytes:
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+def test_csv_and_ndjson_catalogs(client):
+    isbn = uuid4().hex[:13]
+    csv = f"author_name,title,isbn,publication_year,available_copies\nCSV Author,CSV Book,{isbn},1999,3\nCSV Author,Repeated,{isbn},,\n"
+    report = upload(client, csv.encode(), "catalog.csv").json()
+    assert (report["rows"], report["books_created"], report["conflicts"], report["invalid"]) == (2, 1, 1, 0)
+
+    report = upload(client, ndjson(
+        {"author_name": "NDJSON Author", "title": "NDJSON Book", "isbn": uuid4().hex[:13]},
+        {"author_name": "Only An Author"},
+    )).json()
+    assert (report["rows"], report["authors_created"], report["books_created"]) == (2, 2, 1)
+
+
+def test_invalid_records_are_reported(client):
+    records = [
+        {"author_name": ["A list"], "title": "List", "isbn": uuid4().hex[:13]},
+        {"author_name": {"name": "An object"}, "title": "Object", "isbn": uuid4().hex[:13]},
+        {"author_name": "Negative", "title": "Negative", "isbn": uuid4().hex[:13], "available_copies": -2},
+        {"author_name": "Not a year", "title": "Year", "isbn": uuid4().hex[:13], "publication_year": "soon"},
+        {"author_name": "No ISBN", "title": "No ISBN"},
+        {"title": "No author", "isbn": uuid4().hex[:13]},
+        {"author_name": "Valid", "title": "Valid", "isbn": uuid4().hex[:13]},
+    ]
+    response = upload(client, ndjson(*records) + b"not json\n[1, 2]\n")
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["rows"] == 7
+    assert report["invalid"] == 8
+    assert report["books_created"] == 1
+    errors = {issue["line"]: issue["error"] for issue in report["issues"]}
+    assert errors[1] == errors[2] == "'author_name' must be a string"
+    assert errors[3] == "'available_copies' must not be negative"
+
+
+def test_invalid_utf8_is_rejected_before_importing(client, db):
+    name = f"Encoding {uuid4().hex}"
+    content = ndjson({"author_name": name}) + b'{"author_name": "\xff"}\n'
+    response = upload(client, content)
+    assert response.status_code == 400
+    position = content.index(b"\xff")
+    assert f"at byte {position}" in response.json()["detail"]
+    assert db.exec(select(Author).where(Author.name == name)).first() is None
+
+
+def test_invalid_utf8_after_the_first_chunk(client, db, monkeypatch):
+    # Checked in blocks of a few bytes, imported one record per chunk
+    monkeypatch.setattr(service_module, "IMPORT_READ_SIZE", 7)
+    monkeypatch.setattr(import_service, "chunk_size", 1)
+    name = f"Chunked {uuid4().hex}"
+    content = ndjson({"author_name": name}) * 3 + "é".encode()[:1] + b"\n"
+    response = upload(client, content)
+    assert response.status_code == 400
+    assert f"at byte {len(content) - 2}" in response.json()["detail"]
+    assert db.exec(select(Author).where(Author.name == name)).first() is None
@@ -0,0 +1,57 @@
+import time
+
+
+def test_resource_etag_and_304(client, make_book):
+    book = make_book(title="Conditional")
+    path = f"/api/v1/books/{book['id']}"
+
+    response = client.get(path)
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+    assert etag.startswith('W/"')
+
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert "X-Correlation-ID" in response.headers
+
+    # Strong and weak forms match, as does any of a list of tags
+    assert client.get(path, headers={"If-None-Match": f'"other", {etag.removeprefix("W/")}'}).status_code == 304
+    assert client.get(path, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    # updated_at has a resolution of a second in Last-Modified
+    time.sleep(1)
+    client.patch(path, json={"title": "Conditional, revised"})
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Conditional, revised"
+    assert response.headers["ETag"] != etag
+    assert client.get(path, headers={"If-Modified-Since": last_modified}).status_code == 200
+
+
+def test_page_etag_changes_with_its_rows(client, make_author, make_book):
+    author = make_author()
+    make_book(author)
+    path = f"/api/v1/books/by-author/{author['id']}"
+
+    response = client.get(path)
+    etag = response.headers["ETag"]
+    assert "Last-Modified" not in response.headers
+    assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+    make_book(author)
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_nested_resource_etag_covers_the_related_rows(client, make_loan):
+    loan = make_loan()
+    path = f"/api/v1/users/{loan['user_id']}/loans"
+    etag = client.get(path).headers["ETag"]
+
+    client.post(f"/api/v1/loans/{loan['id']}/return")
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["loans"][0]["is_returned"] is True
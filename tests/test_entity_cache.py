@@ -0,0 +1,93 @@
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, insert, update
+from sqlmodel import Session
+
+from app.core.cache import MISSING, entity_cache
+from app.core.config import settings
+from app.models.author import Author
+from app.schemas.author import AuthorCreate, AuthorUpdate
+from app.services.author_service import author_service
+
+
+def create_author(engine, name: str):
+    with Session(engine) as db:
+        return author_service.create(db, obj_in=AuthorCreate(name=name)).id
+
+
+def test_miss_then_hit(engine):
+    author_id = create_author(engine, "Cached Author")
+    key = author_service.cache_key(author_id)
+
+    with Session(engine) as db:
+        assert author_service.get_by_id(db, author_id).name == "Cached Author"
+    assert entity_cache.get(key)["name"] == "Cached Author"
+
+    # Served from the cache: no statement runs
+    with Session(engine) as db:
+        statements = []
+        event.listen(db, "do_orm_execute", statements.append)
+        assert author_service.get_by_id(db, author_id).name == "Cached Author"
+        assert statements == []
+
+
+def test_missing_id_is_not_cached(engine):
+    missing = uuid4()
+    with Session(engine) as db:
+        assert author_service._get_cached(db, missing) is None
+    assert entity_cache.get(author_service.cache_key(missing)) is MISSING
+
+
+def test_writes_made_by_another_worker(engine, monkeypatch):
+    # A separate engine stands in for another worker: its writes do not
+    # invalidate this process's cache
+    monkeypatch.setattr(settings, "ENTITY_CACHE_TTL", 0.2)
+    other_worker = create_engine(engine.url)
+    author_id = uuid4()
+
+    with Session(engine) as db:
+        with pytest.raises(HTTPException):
+            author_service.get_by_id(db, author_id)
+    with other_worker.begin() as connection:
+        connection.execute(insert(Author.__table__).values(id=author_id, name="Created elsewhere", created_at=datetime.utcnow()))
+    with Session(engine) as db:
+        assert author_service.get_by_id(db, author_id).name == "Created elsewhere"
+
+    with other_worker.begin() as connection:
+        connection.execute(update(Author.__table__).where(Author.id == author_id).values(name="Renamed elsewhere"))
+    time.sleep(0.25)
+    with Session(engine) as db:
+        assert author_service.get_by_id(db, author_id).name == "Renamed elsewhere"
+    other_worker.dispose()
+
+
+def test_update_invalidates(engine):
+    author_id = create_author(engine, "Before")
+    with Session(engine) as db:
+        author_service.get_by_id(db, author_id)
+    with Session(engine) as db:
+        author = author_service.get_by_id(db, author_id)
+        author_service.update(db, db_obj=author, obj_in=AuthorUpdate(name="After"))
+    assert entity_cache.get(author_service.cache_key(author_id)) is MISSING
+
+    with Session(engine) as db:
+        assert author_service.get_by_id(db, author_id).name == "After"
+
+
+def test_write_committed_during_the_read_is_not_cached(engine):
+    author_id = create_author(engine, "Racing")
+    key = author_service.cache_key(author_id)
+    entity_cache.delete(key)
+
+    with Session(engine) as db:
+        # Another request commits a change to the author while this one reads it
+        @event.listens_for(db, "do_orm_execute")
+        def concurrent_write(state):
+            author_service.invalidate(author_id)
+
+        assert author_service.get_by_id(db, author_id).name == "Racing"
+    assert entity_cache.get(key) is MISSING
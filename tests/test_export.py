@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app.services.export_service import accepts_gzip, export_service
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(export_service, "batch_size", 2)
+
+
+def export(client, table, **params):
+    response = client.get(f"/api/v1/{table}/export", params=params, headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_ndjson_export(client, small_batches, make_author):
+    since = datetime.utcnow()
+    authors = [make_author(name=f"Exported {number}") for number in range(5)]
+
+    response = export(client, "authors", updated_since=since.isoformat())
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="authors.ndjson"'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == [author["name"] for author in authors]
+    assert {"id", "created_at", "updated_at", "biography", "birth_year"} <= rows[0].keys()
+
+    everything = export(client, "authors").text.splitlines()
+    assert len(everything) >= 5
+
+
+def test_csv_export(client, small_batches, make_loan):
+    since = datetime.utcnow()
+    loans = [make_loan() for _ in range(3)]
+
+    response = export(client, "loans", format="csv", updated_since=since.isoformat())
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["id"].replace("-", "") for row in rows] == [loan["id"].replace("-", "") for loan in loans]
+    assert rows[0]["is_returned"] == "false"
+    assert rows[0]["return_date"] == ""
+
+    # Only the header when nothing matches
+    response = export(client, "users", format="csv", updated_since="2999-01-01T00:00:00")
+    assert len(response.text.splitlines()) == 1
+    assert "username" in response.text
+
+
+def test_gzip_export(client, make_book):
+    book = make_book(title="Compressed")
+    response = client.get("/api/v1/books/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    # The client decodes the body
+    assert any(json.loads(line)["title"] == "Compressed" for line in response.text.splitlines())
+    assert book["isbn"] in response.text
+
+
+def test_unsupported_format(client):
+    assert client.get("/api/v1/books/export", params={"format": "xml"}).status_code == 400
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("identity", False),
+    ("gzip", True),
+    ("br, gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("*", True),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
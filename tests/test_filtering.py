@@ -0,0 +1,54 @@
+import pytest
+
+from app.services.book_service import book_service
+from app.services.loan_service import loan_service
+
+VALUES = {
+    "genre": "Fantasy",
+    "author_id": "00000000-0000-0000-0000-000000000000",
+    "publication_year": "1950",
+    "available": "true",
+    "is_returned": "false",
+}
+
+
+@pytest.mark.parametrize("service", [book_service, loan_service], ids=["books", "loans"])
+def test_every_allowed_operator_works_in_the_default_order(db, service):
+    for name, field in service.filterable.items():
+        for op in field.operators:
+            param = name if op == "eq" else f"{name}[{op}]"
+            value = f"{VALUES[name]},{VALUES[name]}" if op == "in" else VALUES[name]
+            # Raises a 400 error when no index serves the filter in the (created_at, id) order
+            service.get_all(db, filters=[(param, value)])
+            service.get_all(db, filters=[(param, value)], sort="-created_at")
+
+
+@pytest.mark.parametrize("query", [
+    # The example of the request
+    "genre=Fantasy&publication_year[gte]=1950&available=true&sort=-publication_year",
+    "genre=Fantasy&sort=publication_year",
+    "genre=Fantasy&publication_year=1954&sort=-publication_year",
+    "genre=Fantasy&available=true",
+    "author_id=00000000-0000-0000-0000-000000000000&available=true&sort=-created_at",
+])
+def test_combined_filters_and_sorts(client, query):
+    response = client.get(f"/api/v1/books/?{query}")
+    assert response.status_code == 200, response.text
+
+
+def test_request_example_returns_the_matching_books_in_order(client, make_author, make_book):
+    author = make_author()
+    genre = f"Genre {author['id']}"
+    older = make_book(author, genre=genre, publication_year=1954)
+    newer = make_book(author, genre=genre, publication_year=2001)
+    make_book(author, genre=genre, publication_year=1930)
+    make_book(author, genre=genre, publication_year=1990, available_copies=0)
+    make_book(author, genre=genre)
+    make_book(author, genre="Other", publication_year=1960)
+
+    response = client.get(
+        "/api/v1/books/",
+        params={"genre": genre, "publication_year[gte]": "1950", "available": "true", "sort": "-publication_year"}
+    )
+    assert response.status_code == 200, response.text
+    assert [book["id"] for book in response.json()] == [newer["id"], older["id"]]
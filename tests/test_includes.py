@@ -0,0 +1,65 @@
+def get(client, path, **params):
+    response = client.get(path, params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_listing_includes_the_requested_relationships(client, cold_caches, make_author, make_book):
+    author = make_author(name="Included Author")
+    for title in ("First", "Second", "Third"):
+        make_book(author, title=title)
+
+    cold_caches()
+    response = get(client, f"/api/v1/books/by-author/{author['id']}", include="author")
+    assert response.headers["X-DB-Queries"] == "2"
+    books = response.json()
+    assert len(books) == 3
+    assert all(book["author"] == {"id": author["id"], "name": "Included Author"} for book in books)
+
+    # Relationships that were not asked for are left out of the response
+    books = get(client, f"/api/v1/books/by-author/{author['id']}").json()
+    assert all("author" not in book for book in books)
+
+    authors = get(client, "/api/v1/authors/", include="books", limit=100).json()
+    included = next(entry for entry in authors if entry["id"] == author["id"])
+    assert sorted(book["title"] for book in included["books"]) == ["First", "Second", "Third"]
+
+
+def test_included_relationships_cost_one_query_each(client, cold_caches, make_loan):
+    for _ in range(3):
+        make_loan()
+
+    cold_caches()
+    response = get(client, "/api/v1/books/", include="author", limit=100)
+    assert len(response.json()) > 3
+    assert response.headers["X-DB-Queries"] == "2"
+
+    cold_caches()
+    response = get(client, "/api/v1/loans/", include="book,user", limit=100)
+    assert all(loan["book"]["id"] == loan["book_id"] and loan["user"]["id"] == loan["user_id"] for loan in response.json())
+    assert response.headers["X-DB-Queries"] == "3"
+
+    cold_caches()
+    response = get(client, "/api/v1/users/", include="loans", limit=100)
+    assert any(user["loans"] for user in response.json())
+    assert response.headers["X-DB-Queries"] == "2"
+
+
+def test_unknown_relationship(client):
+    response = client.get("/api/v1/books/", params={"include": "author,publisher"})
+    assert response.status_code == 400
+    assert "publisher" in response.json()["detail"]
+
+
+def test_nested_responses_load_their_relationships_up_front(client, cold_caches, make_loan):
+    loan = make_loan()
+    author_id = get(client, f"/api/v1/books/{loan['book_id']}").json()["author_id"]
+
+    for path, queries in [
+        (f"/api/v1/loans/{loan['id']}/details", 1),
+        (f"/api/v1/books/{loan['book_id']}/with-author", 1),
+        (f"/api/v1/authors/{author_id}/books", 2),
+        (f"/api/v1/users/{loan['user_id']}/loans", 2),
+    ]:
+        cold_caches()
+        assert get(client, path).headers["X-DB-Queries"] == str(queries), path
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+
+def checkout(client, book, user):
+    body = {"book_id": book["id"], "user_id": user["id"], "due_date": (date.today() + timedelta(days=14)).isoformat()}
+    return client.post("/api/v1/loans/", json=body)
+
+
+def available_copies(client, book):
+    return client.get(f"/api/v1/books/{book['id']}").json()["available_copies"]
+
+
+def test_concurrent_checkouts_never_oversell(client, make_book, make_user):
+    book = make_book(available_copies=5)
+    users = [make_user() for _ in range(20)]
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        responses = list(executor.map(lambda user: checkout(client, book, user), users))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201] * 5 + [400] * 15
+    assert available_copies(client, book) == 0
+    loan_ids = {response.json()["id"] for response in responses if response.status_code == 201}
+    assert all(client.get(f"/api/v1/loans/{loan_id}").json()["book_id"] == book["id"] for loan_id in loan_ids)
+    assert len(loan_ids) == 5
+
+
+def test_concurrent_returns_give_the_copy_back_once(client, make_book, make_loan):
+    book = make_book(available_copies=1)
+    loan = make_loan(book)
+    assert available_copies(client, book) == 0
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(lambda _: client.post(f"/api/v1/loans/{loan['id']}/return"), range(8)))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] + [400] * 7
+    assert available_copies(client, book) == 1
+
+
+def test_checkout_errors(client, make_book, make_user):
+    book = make_book(available_copies=0)
+    user = make_user()
+    response = checkout(client, book, user)
+    assert response.status_code == 400
+    assert "no available copies" in response.json()["detail"]
+
+    response = checkout(client, {"id": "00000000-0000-0000-0000-000000000000"}, user)
+    assert response.status_code == 404
@@ -0,0 +1,50 @@
+def statistics(client, **params):
+    response = client.get("/api/v1/loans/statistics", params=params)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_statistics_of_a_date_window(client, cold_caches, make_loan):
+    # Loans made in March 1990, out of reach of the other tests
+    for loan_date, due_date, return_date in [
+        ("1990-03-01", "1990-03-15", "1990-03-11"),
+        ("1990-03-05", "1990-03-19", "1990-03-25"),
+        ("1990-03-10", "1990-03-24", None),
+        ("1990-04-02", "1990-04-16", None),
+    ]:
+        loan = make_loan(loan_date=loan_date, due_date=due_date)
+        if return_date:
+            response = client.patch(f"/api/v1/loans/{loan['id']}", json={"is_returned": True, "return_date": return_date})
+            assert response.status_code == 200, response.text
+
+    cold_caches()
+    response = statistics(client, **{"from": "1990-03-01", "to": "1990-03-31"})
+    assert response.headers["X-DB-Queries"] == "1"
+    assert response.json() == {
+        "total_loans": 3,
+        "active_loans": 1,
+        "completed_loans": 2,
+        "overdue_loans": 1,
+        "average_loan_duration_days": 15.0,
+        "on_time_return_rate": 50.0
+    }
+
+    stats = statistics(client, **{"from": "1990-03-01"}).json()
+    assert stats["total_loans"] >= 4
+    assert stats["active_loans"] >= 2
+
+
+def test_empty_window(client):
+    assert statistics(client, **{"from": "1900-01-01", "to": "1900-12-31"}).json() == {
+        "total_loans": 0,
+        "active_loans": 0,
+        "completed_loans": 0,
+        "overdue_loans": 0,
+        "average_loan_duration_days": 0,
+        "on_time_return_rate": 0
+    }
+
+
+def test_window_must_be_ordered(client):
+    response = client.get("/api/v1/loans/statistics", params={"from": "2020-02-01", "to": "2020-01-01"})
+    assert response.status_code == 400
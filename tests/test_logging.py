@@ -0,0 +1,76 @@
+import logging
+import queue
+
+from app.core import logging as app_logging
+from app.core.config import settings
+from app.core.logging import DroppingQueueHandler, LogListener, get_handlers
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def make_logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger("tests.logging")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_full_queue_drops_records_without_blocking():
+    log_queue = queue.Queue(maxsize=2)
+    logger = make_logger(DroppingQueueHandler(log_queue))
+
+    for number in range(5):
+        logger.info("record %s", number)
+    assert log_queue.qsize() == 2
+    assert logger.handlers[0].dropped == 3
+
+    # The drops are reported as soon as there is room again
+    records = [log_queue.get_nowait(), log_queue.get_nowait()]
+    logger.info("record %s", 5)
+    records += [log_queue.get_nowait(), log_queue.get_nowait()]
+    assert [record.getMessage() for record in records] == [
+        "record 0", "record 1", "Log queue full, 3 records dropped", "record 5"
+    ]
+    assert logger.handlers[0].dropped == 0
+
+
+def test_pending_records_are_written_on_stop():
+    log_queue = queue.Queue(maxsize=100)
+    output = CollectingHandler()
+    listener = LogListener(log_queue, output)
+    logger = make_logger(DroppingQueueHandler(log_queue))
+
+    for number in range(50):
+        logger.info("record %s", number)
+    listener.start()
+    listener.stop()
+    assert output.messages == [f"record {number}" for number in range(50)]
+
+
+def test_log_file_is_opened_on_the_first_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_DIR", str(tmp_path))
+    handlers = get_handlers()
+    try:
+        assert list(tmp_path.iterdir()) == []
+
+        file_handler = handlers[-1]
+        file_handler.handle(logging.makeLogRecord({"msg": "written", "levelno": logging.INFO, "levelname": "INFO"}))
+        assert [path.name for path in tmp_path.iterdir()] == ["app.log"]
+        assert "written" in (tmp_path / "app.log").read_text()
+    finally:
+        for handler in handlers[1:]:
+            handler.close()
+
+
+def test_app_loggers_go_through_the_queue():
+    logger = app_logging.get_logger("app.tests.logging")
+    assert logger.handlers == [app_logging.queue_handler]
+    assert not logger.propagate
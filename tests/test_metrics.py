@@ -0,0 +1,68 @@
+import json
+import re
+
+from app.core.metrics import MetricsRegistry
+
+
+def sample(text: str, name: str, **labels) -> float:
+    """
+    Value of the series of `name` having (at least) the given labels
+    """
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        if not match or match.group(1) != name:
+            continue
+        series = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(series.get(key) == value for key, value in labels.items()):
+            return float(match.group(3))
+    return 0.0
+
+
+def test_requests_are_counted_by_route_template(client, make_book):
+    book = make_book()
+    labels = {"method": "GET", "route": "/api/v1/books/{book_id}"}
+    before = client.get("/metrics").text
+
+    client.get(f"/api/v1/books/{book['id']}")
+    client.get(f"/api/v1/books/{book['id']}")
+    client.get("/api/v1/books/00000000-0000-0000-0000-000000000000")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = response.text
+    count = lambda text, status: sample(text, "http_request_duration_seconds_count", status=status, **labels)
+    assert count(after, "200") - count(before, "200") == 2
+    assert count(after, "404") - count(before, "404") == 1
+    assert book["id"] not in after
+
+    assert "# TYPE http_request_duration_seconds histogram" in after
+    assert sample(after, "http_request_duration_seconds_bucket", status="200", le="+Inf", **labels) == count(after, "200")
+    # /metrics itself is being served
+    assert sample(after, "http_requests_in_flight") == 1
+    assert sample(after, "db_pool_checkouts_total", engine="sync") > 0
+
+
+def test_metrics_of_every_worker_are_summed(tmp_path):
+    def worker():
+        registry = MetricsRegistry(str(tmp_path))
+        requests = registry.counter("requests_total", "Requests", ("route",))
+        latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        return registry, requests, latency
+
+    this, requests, latency = worker()
+    requests.inc(("/books",), 2)
+    latency.observe(0.05, ("/books",))
+
+    other, other_requests, other_latency = worker()
+    other_requests.inc(("/books",), 3)
+    other_requests.inc(("/users",))
+    other_latency.observe(0.5, ("/books",))
+    (tmp_path / "metrics-999999999.json").write_text(json.dumps(other.snapshot()))
+
+    text = this.render()
+    assert sample(text, "requests_total", route="/books") == 5
+    assert sample(text, "requests_total", route="/users") == 1
+    assert sample(text, "latency_seconds_bucket", route="/books", le="0.1") == 1
+    assert sample(text, "latency_seconds_bucket", route="/books", le="1.0") == 2
+    assert sample(text, "latency_seconds_count", route="/books") == 2
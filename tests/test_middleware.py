@@ -0,0 +1,39 @@
+from uuid import UUID, uuid4
+
+from app.core.middleware import get_request_id
+
+
+def test_correlation_id_is_returned(client):
+    correlation_id = str(uuid4())
+    response = client.get("/health", headers={"X-Correlation-ID": correlation_id})
+    assert response.headers["X-Correlation-ID"] == correlation_id
+
+    # Missing or malformed ids are replaced by a new one
+    for headers in ({}, {"X-Correlation-ID": "not-a-uuid"}):
+        generated = client.get("/health", headers=headers).headers["X-Correlation-ID"]
+        assert generated != "not-a-uuid"
+        UUID(generated)
+
+
+def test_request_headers(client, make_book):
+    book = make_book()
+    for path in ("/health", f"/api/v1/books/{book['id']}", "/api/v1/no-such-route"):
+        headers = client.get(path).headers
+        assert int(headers["X-Process-Time-Ms"]) >= 0
+        assert int(headers["X-DB-Queries"]) >= 0
+        assert float(headers["X-DB-Time-Ms"]) >= 0
+        assert "X-Correlation-ID" in headers
+
+
+def test_streamed_response_passes_through(client, make_author):
+    make_author(name="Streamed Author")
+    correlation_id = str(uuid4())
+    with client.stream("GET", "/api/v1/authors/export", headers={"X-Correlation-ID": correlation_id}) as response:
+        assert response.headers["X-Correlation-ID"] == correlation_id
+        body = b"".join(response.iter_bytes())
+    assert b"Streamed Author" in body
+
+
+def test_correlation_id_is_reset_after_the_request(client):
+    client.get("/health", headers={"X-Correlation-ID": str(uuid4())})
+    assert get_request_id() == ""
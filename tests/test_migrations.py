@@ -0,0 +1,42 @@
+from alembic import command
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from app.db.migrate import BASELINE_REVISION, get_alembic_config, run_migrations
+from app.db.query_plan import find_full_scans
+
+
+def head_revision():
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+
+def current_revision(engine):
+    with engine.connect() as connection:
+        return connection.execute(text("SELECT version_num FROM alembic_version")).scalar_one()
+
+
+def test_hot_queries_are_served_by_indexes(engine):
+    assert current_revision(engine) == head_revision()
+    assert find_full_scans(engine) == {}
+
+
+def test_database_created_before_migrations_is_upgraded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    # The schema create_all used to produce, without any migration history
+    config = get_alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, BASELINE_REVISION)
+        connection.execute(text("DROP TABLE alembic_version"))
+    indexes = {index["name"] for index in inspect(engine).get_indexes("loans")}
+    assert find_full_scans(engine)
+
+    run_migrations(engine)
+    assert current_revision(engine) == head_revision()
+    assert {index["name"] for index in inspect(engine).get_indexes("loans")} > indexes
+    assert find_full_scans(engine) == {}
+
+    # Running them again (e.g. another worker starting) changes nothing
+    run_migrations(engine)
+    assert current_revision(engine) == head_revision()
+    engine.dispose()
@@ -0,0 +1,67 @@
+import base64
+import json
+
+import pytest
+
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+
+def raw_cursor(payload: str) -> str:
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+MALFORMED_CURSORS = [
+    "not a cursor",
+    "%%%",
+    raw_cursor("not json"),
+    raw_cursor('{"created_at": "2020-01-01T00:00:00"}'),
+    raw_cursor('["2020-01-01T00:00:00"]'),
+    raw_cursor('["2020-01-01T00:00:00", 5]'),
+    raw_cursor('[5, "00000000000000000000000000000000"]'),
+    raw_cursor('["yesterday", "00000000000000000000000000000000"]'),
+    raw_cursor('["2020-01-01T00:00:00", "not a uuid"]'),
+    raw_cursor('[["2020-01-01T00:00:00"], {"id": 1}]'),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+]
+
+
+@pytest.mark.parametrize("cursor", MALFORMED_CURSORS)
+@pytest.mark.parametrize("path", ["/api/v1/authors/", "/api/v1/books/", "/api/v1/loans/overdue"])
+def test_malformed_cursors_are_rejected(client, path, cursor):
+    response = client.get(path, params={"cursor": cursor})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+
+@pytest.mark.parametrize("values", [
+    ["1950", "2020-01-01T00:00:00", "00000000000000000000000000000000"],
+    [True, "2020-01-01T00:00:00", "00000000000000000000000000000000"],
+    [1.5, "2020-01-01T00:00:00", "00000000000000000000000000000000"],
+    [2 ** 63, "2020-01-01T00:00:00", "00000000000000000000000000000000"],
+])
+def test_malformed_integer_keys_are_rejected(client, values):
+    response = client.get("/api/v1/books/", params={"sort": "publication_year", "cursor": raw_cursor(json.dumps(values))})
+    assert response.status_code == 400, response.text
+
+
+def test_cursors_walk_every_row_once(client, make_author):
+    created = {make_author(name=f"Paged {index}")["id"] for index in range(5)}
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/v1/authors/", params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [author["id"] for author in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen))
+    assert created <= set(seen)
+
+
+def test_cursor_of_the_publication_year_sort(client, make_book):
+    book = make_book(publication_year=1900)
+    cursor = encode_cursor([book["publication_year"], book["created_at"], book["id"]])
+    response = client.get("/api/v1/books/", params={"sort": "publication_year", "cursor": cursor})
+    assert response.status_code == 200
+    assert book["id"] not in [row["id"] for row in response.json()]
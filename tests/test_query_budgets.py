@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.main import app
+
+
+def test_budget_is_enforced_in_testing():
+    assert settings.QUERY_BUDGET_ENFORCE
+
+
+def test_every_route_runs_within_its_query_budget(client, cold_caches, make_author, make_book, make_user, make_loan):
+    author = make_author()
+    book = make_book(author, genre="Fantasy", publication_year=1954, available_copies=10)
+    user = make_user()
+    loan = make_loan(book, user)
+    # Overdue, so /loans/overdue has a page to eager load
+    make_loan(book, user, loan_date=(date.today() - timedelta(days=30)).isoformat(), due_date=(date.today() - timedelta(days=1)).isoformat())
+    due = (date.today() + timedelta(days=14)).isoformat()
+
+    # Entities each write route can consume
+    doomed_author = make_author()
+    doomed_book = make_book(author)
+    doomed_user = make_user()
+    doomed_loan = make_loan(book)
+    returned_loan = make_loan(book)
+    bulk_returned_loan = make_loan(book)
+
+    calls = [
+        ("GET", "/health"),
+        ("GET", "/version"),
+        ("GET", "/metrics"),
+        ("GET", "/api/v1/authors/?include=books"),
+        ("GET", f"/api/v1/authors/stats?ids={author['id']}"),
+        ("GET", "/api/v1/authors/export"),
+        ("GET", f"/api/v1/authors/{author['id']}"),
+        ("GET", f"/api/v1/authors/{author['id']}/books"),
+        ("GET", f"/api/v1/authors/{author['id']}/stats"),
+        ("POST", "/api/v1/authors/", {"name": "New Author"}),
+        ("PATCH", f"/api/v1/authors/{author['id']}", {"biography": "Updated"}),
+        ("DELETE", f"/api/v1/authors/{doomed_author['id']}"),
+        ("GET", "/api/v1/books/?include=author&publication_year[gte]=1950&sort=-publication_year"),
+        ("GET", "/api/v1/books/available?include=author"),
+        ("GET", f"/api/v1/books/by-author/{author['id']}?include=author"),
+        ("GET", "/api/v1/books/by-genre/Fantasy?include=author"),
+        ("GET", "/api/v1/books/search?q=test&include=author"),
+        ("GET", "/api/v1/books/availability-summary?include_books=true"),
+        ("GET", "/api/v1/books/export"),
+        ("GET", f"/api/v1/books/{book['id']}"),
+        ("GET", f"/api/v1/books/{book['id']}/with-author"),
+        ("POST", "/api/v1/books/", {"title": "New Book", "isbn": "budget-0001", "author_id": author["id"]}),
+        ("PATCH", f"/api/v1/books/{book['id']}", {"description": "Updated"}),
+        ("DELETE", f"/api/v1/books/{doomed_book['id']}"),
+        ("GET", "/api/v1/users/?include=loans"),
+        ("GET", "/api/v1/users/with-active-loans?include=loans"),
+        ("GET", "/api/v1/users/export"),
+        ("GET", f"/api/v1/users/{user['id']}"),
+        ("GET", f"/api/v1/users/{user['id']}/loans"),
+        ("GET", f"/api/v1/users/{user['id']}/activity"),
+        ("POST", "/api/v1/users/", {"username": "budget", "email": "budget@example.com", "full_name": "Budget"}),
+        ("PATCH", f"/api/v1/users/{user['id']}", {"full_name": "Updated"}),
+        ("DELETE", f"/api/v1/users/{doomed_user['id']}"),
+        ("GET", "/api/v1/loans/?include=book,user&is_returned=false"),
+        ("GET", "/api/v1/loans/overdue?include=book,user"),
+        ("GET", "/api/v1/loans/statistics"),
+        ("GET", "/api/v1/loans/export"),
+        ("GET", f"/api/v1/loans/{loan['id']}"),
+        ("GET", f"/api/v1/loans/{loan['id']}/details"),
+        ("POST", "/api/v1/loans/", {"book_id": book["id"], "user_id": user["id"], "due_date": due}),
+        ("POST", "/api/v1/loans/bulk", {"items": [{"book_id": book["id"], "user_id": user["id"], "due_date": due}]}),
+        ("POST", "/api/v1/loans/bulk-return", {"loan_ids": [bulk_returned_loan["id"]]}),
+        ("POST", f"/api/v1/loans/{returned_loan['id']}/return"),
+        ("PATCH", f"/api/v1/loans/{loan['id']}", {"due_date": due}),
+        ("DELETE", f"/api/v1/loans/{doomed_loan['id']}"),
+        ("GET", "/api/v1/suggest?prefix=te"),
+        ("GET", "/api/v1/admin/suggest-index"),
+    ]
+
+    called, failures = set(), []
+    for method, url, *body in calls:
+        # The cold path: every read goes to the database
+        cold_caches()
+        response = client.request(method, url, json=body[0] if body else None)
+        if response.status_code >= 400:
+            failures.append(f"{method} {url}: {response.status_code} {response.text}")
+        called.add((method, _route_of(method, url)))
+    assert not failures, "\n".join(failures)
+
+    files = {"file": ("catalog.ndjson", b'{"author_name": "Imported", "title": "Imported", "isbn": "budget-0002"}\n')}
+    response = client.post("/api/v1/import/catalog", files=files)
+    assert response.status_code == 200, response.text
+    called.add(("POST", "/api/v1/import/catalog"))
+
+    routes = {
+        (method, route.path)
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    assert routes - called == set()
+
+
+def _route_of(method: str, url: str) -> str:
+    path = url.split("?")[0]
+    for route in app.routes:
+        if isinstance(route, APIRoute) and method in route.methods and route.path_regex.match(path):
+            return route.path
+    raise AssertionError(f"No route serves {method} {url}")
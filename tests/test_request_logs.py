@@ -0,0 +1,94 @@
+import json
+import logging
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core import middleware
+from app.core.config import settings
+from app.core.logging import JsonFormatter
+from app.core.middleware import RequestContextMiddleware, RequestLogFilter, log_sampled_ctx_var
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    records = []
+    monkeypatch.setattr(middleware.logger, "log", lambda level, msg, *args, **kwargs: records.append((level, kwargs.get("extra"))))
+    return records
+
+
+def make_client(monkeypatch, sample_rates):
+    monkeypatch.setattr(settings, "LOG_REQUEST_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "LOG_REQUEST_SAMPLE_RATES", sample_rates)
+    monkeypatch.setattr(settings, "LOG_SLOW_REQUEST_MS", 50)
+
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=503, detail="Unavailable")
+        if item_id == 1:
+            time.sleep(0.06)
+        return {"id": item_id}
+
+    @app.get("/other")
+    def other():
+        return {}
+
+    app.add_middleware(RequestContextMiddleware)
+    return TestClient(app)
+
+
+def test_successful_requests_are_sampled_per_route(monkeypatch, logged):
+    client = make_client(monkeypatch, {"/items/{item_id}": 0.0})
+
+    client.get("/items/7")
+    assert logged == []
+
+    client.get("/other")
+    (level, fields), = logged
+    assert level == logging.INFO
+    assert fields["route"] == "/other" and fields["status"] == 200
+
+
+def test_failed_and_slow_requests_are_always_logged(monkeypatch, logged):
+    client = make_client(monkeypatch, {"/items/{item_id}": 0.0})
+
+    client.get("/items/0")
+    client.get("/items/1")
+    assert [(level, fields["status"]) for level, fields in logged] == [(logging.WARNING, 503), (logging.WARNING, 200)]
+    assert logged[1][1]["duration_ms"] >= 50
+    assert logged[0][1]["route"] == "/items/{item_id}"
+    assert {"method", "path", "db_queries", "db_time_ms"} <= logged[0][1].keys()
+
+
+def test_service_logs_follow_the_request_sample():
+    log_filter = RequestLogFilter()
+    info = logging.makeLogRecord({"levelno": logging.INFO})
+    warning = logging.makeLogRecord({"levelno": logging.WARNING})
+
+    token = log_sampled_ctx_var.set(False)
+    try:
+        assert not log_filter.filter(info)
+        assert log_filter.filter(warning)
+    finally:
+        log_sampled_ctx_var.reset(token)
+    assert log_filter.filter(info)
+
+
+def test_json_format():
+    record = logging.makeLogRecord({
+        "name": "app.core.middleware", "levelno": logging.INFO, "levelname": "INFO",
+        "msg": "Request completed | %s", "args": ("GET /health",),
+        "correlation_id": "abc", "status": 200, "route": None
+    })
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Request completed | GET /health"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.core.middleware"
+    assert entry["correlation_id"] == "abc" and entry["status"] == 200
+    assert "route" not in entry
+    assert entry["timestamp"].endswith("+00:00")
@@ -0,0 +1,32 @@
+import orjson
+import pytest
+from sqlmodel import Session
+
+from app.core.responses import RowSerializer
+from app.schemas.author import AuthorWithIncludes
+from app.schemas.book import BookWithIncludes
+from app.schemas.loan import LoanWithIncludes
+from app.schemas.user import UserWithIncludes
+from app.services import author_service, book_service, loan_service, user_service
+
+
+@pytest.mark.parametrize("service, schema, include", [
+    (author_service, AuthorWithIncludes, None),
+    (author_service, AuthorWithIncludes, "books"),
+    (book_service, BookWithIncludes, "author"),
+    (loan_service, LoanWithIncludes, "book,user"),
+    (user_service, UserWithIncludes, "loans"),
+])
+def test_rows_render_like_the_response_model(engine, make_loan, service, schema, include):
+    make_loan()
+    with Session(engine) as db:
+        rows = service.get_all(db, limit=50, include=include)
+        expected = [schema.model_validate(row).model_dump(mode="json", exclude_unset=True) for row in rows]
+        assert orjson.loads(RowSerializer(schema).render(rows)) == expected
+
+
+def test_listing_matches_the_single_resource(client, make_book):
+    book = make_book(title="Rendered", description="Fast", publication_year=1999, genre="Essay")
+    response = client.get(f"/api/v1/books/by-author/{book['author_id']}")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [client.get(f"/api/v1/books/{book['id']}").json()]
@@ -0,0 +1,50 @@
+import sys
+import time
+from datetime import date
+from uuid import UUID, uuid4
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import Settings, settings
+from app.services.book_service import book_service
+from app.services.loan_service import loan_service
+
+# The package exports the service singleton under the module's name
+loan_service_module = sys.modules["app.services.loan_service"]
+
+
+class Tomorrow(date):
+    @classmethod
+    def today(cls):
+        return date.fromordinal(date.today().toordinal() + 1)
+
+
+def test_loan_statistics_are_recomputed_the_next_day(db, monkeypatch):
+    first = loan_service.get_loan_statistics(db)
+    assert loan_service.get_loan_statistics(db) is first
+
+    # No write to the loans, but the day changed
+    monkeypatch.setattr(loan_service_module, "date", Tomorrow)
+    assert loan_service.get_loan_statistics(db) is not first
+
+
+def test_write_made_by_another_worker_is_seen_after_the_ttl(engine, db, cold_caches, make_book, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_CACHE_TTL", 0.2)
+    book = make_book(genre=f"Worker {uuid4().hex}", available_copies=1)
+    before = book_service.get_book_availability_summary(db)
+    assert before[book["genre"]]["available"] == 1
+
+    # Another worker takes the copy: this process's table versions do not move
+    other = create_engine(engine.url)
+    with other.begin() as conn:
+        conn.execute(text("UPDATE books SET available_copies = 0 WHERE id = :id"), {"id": UUID(book["id"]).hex})
+    other.dispose()
+    assert book_service.get_book_availability_summary(db) is before
+
+    time.sleep(0.25)
+    assert book_service.get_book_availability_summary(db)[book["genre"]]["available"] == 0
+
+
+def test_default_ttl_is_short():
+    # It bounds how stale the aggregates served by the other workers are
+    assert Settings().RESULT_CACHE_TTL <= 10
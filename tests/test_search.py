@@ -0,0 +1,79 @@
+from uuid import uuid4
+
+from app.db.search_index import rebuild_search_index
+
+
+def word() -> str:
+    # A word no other book contains
+    return "zq" + uuid4().hex[:10]
+
+
+def search(client, q, **params):
+    response = client.get("/api/v1/books/search", params={"q": q, **params})
+    assert response.status_code == 200, response.text
+    return response
+
+
+def titles(client, q, **params):
+    return [book["title"] for book in search(client, q, **params).json()]
+
+
+def test_search_follows_inserts_updates_and_deletes(client, make_book):
+    before, after = word(), word()
+    book = make_book(title=f"The {before} Affair")
+    assert titles(client, before) == [book["title"]]
+
+    client.patch(f"/api/v1/books/{book['id']}", json={"title": f"The {after} Affair"})
+    assert titles(client, before) == []
+    assert titles(client, after) == [f"The {after} Affair"]
+
+    client.delete(f"/api/v1/books/{book['id']}")
+    assert titles(client, after) == []
+
+
+def test_search_follows_author_renames(client, make_author, make_book):
+    before, after = word(), word()
+    author = make_author(name=f"Ann {before}")
+    book = make_book(author, title="Collected Letters")
+    assert titles(client, before) == [book["title"]]
+
+    client.patch(f"/api/v1/authors/{author['id']}", json={"name": f"Ann {after}"})
+    assert titles(client, before) == []
+    assert titles(client, f"{after} letters") == [book["title"]]
+
+
+def test_ranking_prefixes_and_pages(client, make_book):
+    term = word()
+    make_book(title="Minor mention", description=f"Mentions {term} once")
+    make_book(title=f"{term} in the title")
+    make_book(title=f"{term}s everywhere", description=f"{term}s and more {term}s")
+
+    assert titles(client, term) == [f"{term} in the title", "Minor mention"]
+    assert titles(client, f"{term}*")[-1] == "Minor mention"
+    assert len(titles(client, f"{term}*")) == 3
+
+    first = search(client, f"{term}*", limit=2)
+    assert len(first.json()) == 2
+    rest = search(client, f"{term}*", limit=2, cursor=first.headers["X-Next-Cursor"])
+    assert "X-Next-Cursor" not in rest.headers
+    assert [book["title"] for book in first.json() + rest.json()] == titles(client, f"{term}*")
+
+
+def test_search_syntax_is_never_an_error(client, make_book):
+    term = word()
+    make_book(title=f"{term} (revised)")
+    for q in (f'"{term}', f"{term} -", f"title:{term}", f"({term}) AND NOT"):
+        search(client, q)
+    assert titles(client, f"({term}) revised") == [f"{term} (revised)"]
+
+    response = client.get("/api/v1/books/search", params={"q": "* - ()"})
+    assert response.status_code == 400
+
+
+def test_rebuild(client, engine, make_book):
+    term = word()
+    make_book(title=term)
+    with engine.connect() as connection:
+        books = connection.exec_driver_sql("SELECT count(*) FROM books").scalar()
+    assert rebuild_search_index(engine) == books
+    assert titles(client, term) == [term]
@@ -0,0 +1,50 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.db import sql_logging
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    """
+    Statements logged by an in-memory engine, as (level, statement) pairs
+    """
+    records = []
+    monkeypatch.setattr(settings, "SQL_LOG_STATEMENTS", True)
+    monkeypatch.setattr(sql_logging.logger, "log", lambda level, message, *args: records.append((level, args[-2])))
+
+    def run(statements: int):
+        engine = create_engine("sqlite://")
+        sql_logging.install_sql_logging(engine)
+        with engine.connect() as conn:
+            for index in range(statements):
+                conn.execute(text(f"SELECT {index}"))
+        return records
+
+    return run
+
+
+def test_sampled_statements(logged, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_LOG_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "SQL_LOG_SLOW_MS", None)
+    records = logged(10)
+    assert [statement for _, statement in records] == [f"SELECT {index}" for index in range(10)]
+    assert {level for level, _ in records} == {logging.INFO}
+
+
+def test_every_slow_statement_is_logged_whatever_the_sample_rate(logged, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_LOG_SAMPLE_RATE", 0.01)
+    # Every statement takes at least 0 ms
+    monkeypatch.setattr(settings, "SQL_LOG_SLOW_MS", 0.0)
+    records = logged(50)
+    assert len(records) == 50
+    assert {level for level, _ in records} == {logging.WARNING}
+
+
+def test_fast_statements_are_not_logged_in_slow_mode(logged, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_LOG_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "SQL_LOG_SLOW_MS", 60_000.0)
+    assert logged(10) == []
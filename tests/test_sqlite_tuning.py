@@ -0,0 +1,82 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.db.retry import retry_on_lock
+
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FlakyService:
+    def __init__(self, failures, message="database is locked"):
+        self.failures = failures
+        self.message = message
+        self.calls = 0
+
+    @retry_on_lock
+    def write(self, db):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise OperationalError("UPDATE books", {}, sqlite3.OperationalError(self.message))
+        return "written"
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "DB_LOCK_RETRIES", 3)
+    monkeypatch.setattr(settings, "DB_LOCK_RETRY_BACKOFF", 0.001)
+
+
+def test_connections_get_the_configured_pragmas(engine):
+    with engine.connect() as connection:
+        pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1
+        assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT
+        assert pragma("cache_size") == settings.SQLITE_CACHE_SIZE
+        assert pragma("temp_store") == 2
+
+
+def test_lock_errors_are_retried(fast_retries):
+    service, db = FlakyService(failures=2), FakeSession()
+    assert service.write(db) == "written"
+    assert (service.calls, db.rollbacks) == (3, 2)
+    assert db.info == {}
+
+
+def test_retries_are_bounded(fast_retries):
+    service = FlakyService(failures=10)
+    with pytest.raises(OperationalError):
+        service.write(FakeSession())
+    assert service.calls == 4
+
+
+def test_other_errors_are_not_retried(fast_retries):
+    service = FlakyService(failures=1, message="no such table: books")
+    with pytest.raises(OperationalError):
+        service.write(FakeSession())
+    assert service.calls == 1
+
+
+def test_write_waits_for_another_writer(client, engine):
+    # Another process holds the write lock for a moment
+    other_writer = sqlite3.connect(engine.url.database, isolation_level=None, check_same_thread=False)
+    other_writer.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.3, other_writer.execute, ["COMMIT"])
+    release.start()
+    try:
+        response = client.post("/api/v1/authors/", json={"name": "Patient Author"})
+    finally:
+        release.join()
+        other_writer.close()
+    assert response.status_code == 201, response.text
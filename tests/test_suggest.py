@@ -0,0 +1,67 @@
+from uuid import uuid4
+
+
+def word() -> str:
+    # A word no other entry starts with
+    return "zq" + uuid4().hex[:10]
+
+
+def suggest(client, prefix: str):
+    response = client.get("/api/v1/suggest", params={"prefix": prefix})
+    assert response.status_code == 200, response.text
+    assert response.headers["X-DB-Queries"] == "0"
+    return response.json()
+
+
+def test_new_entries_are_suggested(client, make_author, make_book):
+    title, name = word(), word()
+    author = make_author(name=f"{name.capitalize()} Writer")
+    book = make_book(author, title=f"The {title.capitalize()} Chronicles")
+
+    assert suggest(client, f"{title[:6]} chron") == [
+        {"type": "book", "id": book["id"], "text": book["title"], "loan_count": 0}
+    ]
+    assert suggest(client, f"WRIT {name.upper()}") == [
+        {"type": "author", "id": author["id"], "text": author["name"], "loan_count": 0}
+    ]
+
+
+def test_loans_rank_the_suggestions(client, make_author, make_book, make_loan):
+    title = word()
+    author = make_author(name=word())
+    quiet = make_book(author, title=f"{title} quiet")
+    loaned = make_book(author, title=f"{title} loaned", available_copies=3)
+    make_loan(loaned)
+    make_loan(loaned)
+
+    suggestions = suggest(client, title)
+    assert [(entry["id"], entry["loan_count"]) for entry in suggestions] == [(loaned["id"], 2), (quiet["id"], 0)]
+    assert suggest(client, author["name"])[0]["loan_count"] == 2
+
+
+def test_renamed_and_deleted_entries(client, make_book):
+    before, after = word(), word()
+    book = make_book(title=before)
+
+    response = client.patch(f"/api/v1/books/{book['id']}", json={"title": after})
+    assert response.status_code == 200
+    assert suggest(client, before) == []
+    assert [entry["id"] for entry in suggest(client, after)] == [book["id"]]
+
+    response = client.delete(f"/api/v1/books/{book['id']}")
+    assert response.status_code == 200
+    assert suggest(client, after) == []
+
+
+def test_imported_books_are_suggested(client):
+    title = word()
+    content = f'{{"author_name": "Imported Author", "title": "{title}", "isbn": "{uuid4().hex[:13]}"}}\n'.encode()
+    response = client.post("/api/v1/import/catalog", files={"file": ("catalog.ndjson", content)})
+    assert response.json()["books_created"] == 1
+    assert [entry["text"] for entry in suggest(client, title)] == [title]
+
+
+def test_suggest_index_memory_usage(client):
+    usage = client.get("/api/v1/admin/suggest-index").json()
+    assert usage["ready"]
+    assert usage["bytes"]["total"] > 0